@@ -1,523 +1,523 @@
-# app.py
-# BabeliUM — Criador de Fichas de Exercícios
-# Interface Gráfica (Streamlit)
-
-import streamlit as st
-import copy
-import sys
-import os
-
-# --- GARANTIR QUE OS IMPORTS FUNCIONAM ---
-current_dir = os.path.dirname(os.path.abspath(__file__))
-if current_dir not in sys.path:
-    sys.path.insert(0, current_dir)
-
-try:
-    from models import TA, Question, ChoiceOption, Blank, MatchPair, QuestionMeta, new_id_default
-    from utils import new_id, count_gaps
-    from validators import validate_ficha, update_ficha_status
-    from export import build_moodle_xml_stub
-except ImportError as e:
-    st.error(f"Erro ao importar módulos: {e}")
-    st.stop()
-
-# --- CONFIGURAÇÃO DA PÁGINA ---
-st.set_page_config(
-    page_title="BabeliUM Editor",
-    page_icon="⚡",
-    layout="wide"
-)
-
-# --- CONSTANTES DE UI ---
-UI_TYPES = {
-    "Texto com lacunas (Escrever)": "cloze",
-    "Texto com lacunas (Menu/Seleção)": "cloze_mc", # NOVO
-    "Escolha múltipla (1 correta)": "multichoice_single",
-    "Escolha múltipla (várias corretas)": "multichoice_multi",
-    "Verdadeiro/Falso": "truefalse",
-    "Associação (Matching)": "matching",
-    "Resposta Curta": "shortanswer",
-    "Ensaio (Texto livre)": "essay",
-    "Texto de Apoio / Instrução (sem resposta)": "description" # NOVO
-}
-
-# Inverter o dicionário para lookups fáceis
-TYPE_TO_LABEL = {v: k for k, v in UI_TYPES.items()}
-
-# --- GESTÃO DE ESTADO (SESSION STATE) ---
-if "ta" not in st.session_state:
-    # Cria uma nova ficha vazia ao iniciar
-    st.session_state.ta = TA(ta_id=new_id("ta"))
-
-if "active_view" not in st.session_state:
-    st.session_state.active_view = "Editor de Ficha" # "Editor de Ficha" | "Editor de Questão"
-
-if "active_qid" not in st.session_state:
-    st.session_state.active_qid = None # ID da questão a ser editada
-
-# Atalho para variáveis
-ta = st.session_state.ta
-
-# --- FUNÇÕES AUXILIARES DE UI ---
-def get_question_by_id(qid):
-    for q in ta.questions:
-        if q.qid == qid:
-            return q
-    return None
-
-def move_question(idx, direction):
-    # direction: -1 (cima), +1 (baixo)
-    new_idx = idx + direction
-    if 0 <= new_idx < len(ta.questions):
-        ta.questions[idx], ta.questions[new_idx] = ta.questions[new_idx], ta.questions[idx]
-
-def delete_question(idx):
-    ta.questions.pop(idx)
-
-# ==============================================================================
-# VIEW 1: EDITOR DE FICHA (DASHBOARD)
-# ==============================================================================
-def render_ficha_editor():
-    st.title("⚡ BabeliUM Editor")
-    
-    # 1. Cabeçalho da Ficha
-    with st.container():
-        c1, c2, c3 = st.columns([3, 2, 2])
-        ta.ta_name = c1.text_input("Nome da Ficha", value=ta.ta_name)
-        ta.course = c2.text_input("Curso / Nível", value=ta.course)
-        
-        with c3:
-            st.write(" ") 
-            if st.button("➕ Nova Questão", use_container_width=True, type="primary"):
-                st.session_state.active_qid = None # None significa "criar nova"
-                st.session_state.active_view = "Editor de Questão"
-                st.rerun()
-
-    st.divider()
-
-    # 2. Barra de Ferramentas da Lista
-    col_info, col_view = st.columns([3, 1])
-    with col_info:
-        st.caption(f"Total: **{len(ta.questions)}** itens na ficha.")
-    with col_view:
-        view_mode = st.radio("Ver como:", ["Lista Compacta", "Cartões Abertos"], horizontal=True, label_visibility="collapsed")
-
-    # 3. Listagem das Questões
-    if not ta.questions:
-        st.info("A ficha está vazia. Clique em 'Nova Questão' para começar.")
-    else:
-        for idx, q in enumerate(ta.questions):
-            
-            # Ícones Visuais
-            icon = "❓"
-            if q.moodle_type == "cloze": icon = "📝"
-            elif q.moodle_type == "cloze_mc": icon = "🔽"
-            elif q.moodle_type.startswith("multichoice"): icon = "🔘"
-            elif q.moodle_type == "truefalse": icon = "⚖️"
-            elif q.moodle_type == "matching": icon = "🔗"
-            elif q.moodle_type == "description": icon = "📄"
-            elif q.moodle_type == "essay": icon = "✍️"
-
-            titulo = q.title if q.title.strip() else f"(Sem título - {idx+1})"
-            pontos = f"{q.meta.points} pts" if q.moodle_type != "description" else "Info"
-
-            # --- MODO LISTA COMPACTA (ACORDEÃO) ---
-            if view_mode == "Lista Compacta":
-                with st.expander(f"{idx+1}. {icon} {titulo}  —  {pontos}", expanded=False):
-                    c_prev, c_acts = st.columns([4, 1])
-                    with c_prev:
-                        st.caption(f"**Tipo:** {TYPE_TO_LABEL.get(q.ui_type, q.ui_type)} | **Secção:** {q.section}")
-                        clean_text = q.prompt.replace("\n", " ")
-                        st.markdown(f"_{clean_text[:150] + '...' if len(clean_text)>150 else clean_text}_")
-                    
-                    with c_acts:
-                        if st.button("✏️ Editar", key=f"ed_c_{q.qid}", use_container_width=True):
-                            st.session_state.active_qid = q.qid
-                            st.session_state.active_view = "Editor de Questão"
-                            st.rerun()
-                        if st.button("🗑️ Apagar", key=f"del_c_{q.qid}", use_container_width=True):
-                            delete_question(idx)
-                            st.rerun()
-                        # Setas
-                        c_up, c_down = st.columns(2)
-                        with c_up:
-                            if idx > 0 and st.button("⬆️", key=f"up_{q.qid}"):
-                                move_question(idx, -1)
-                                st.rerun()
-                        with c_down:
-                            if idx < len(ta.questions)-1 and st.button("⬇️", key=f"dw_{q.qid}"):
-                                move_question(idx, 1)
-                                st.rerun()
-
-            # --- MODO CARTÕES ABERTOS ---
-            else:
-                with st.container(border=True):
-                    st.markdown(f"### {idx+1}. {icon} {titulo}")
-                    st.markdown(q.prompt, unsafe_allow_html=True)
-                    b1, b2 = st.columns([1, 4])
-                    if b1.button("Editar", key=f"ed_d_{q.qid}"):
-                        st.session_state.active_qid = q.qid
-                        st.session_state.active_view = "Editor de Questão"
-                        st.rerun()
-    
-    st.divider()
-    
-    # 4. Botão de Exportação
-    if st.button("📦 Gerar MoodleXML Final", use_container_width=True, type="secondary"):
-        st.session_state.active_view = "Exportar"
-        st.rerun()
-
-
-# ==============================================================================
-# VIEW 2: EDITOR DE QUESTÃO (CORRIGIDO E LIMPO)
-# ==============================================================================
-def render_question_editor():
-    # 1. Carregar ou Criar Questão
-    if "draft_q" not in st.session_state:
-        if st.session_state.active_qid:
-            original = get_question_by_id(st.session_state.active_qid)
-            st.session_state.draft_q = copy.deepcopy(original)
-        else:
-            st.session_state.draft_q = Question(
-                qid=new_id("q"), ui_type="Escolha múltipla (1 correta)",
-                moodle_type="multichoice_single", prompt=""
-            )
-    
-    q = st.session_state.draft_q
-
-    # --- CABEÇALHO ---
-    c_back, c_title = st.columns([1, 5])
-    if c_back.button("🔙 Voltar"):
-        del st.session_state.draft_q
-        st.session_state.active_view = "Editor de Ficha"
-        st.rerun()
-    c_title.subheader("Editar Questão")
-
-    # --- BLOCO 1: CONFIGURAÇÕES ---
-    with st.container(border=True):
-        c1, c2, c3 = st.columns([2, 1, 1])
-        
-        # Tipo de Pergunta
-        new_ui_type = c1.selectbox("Tipo de Pergunta", options=list(UI_TYPES.keys()), 
-                                   index=list(UI_TYPES.keys()).index(q.ui_type) if q.ui_type in UI_TYPES else 0)
-        
-        if new_ui_type != q.ui_type:
-            q.ui_type = new_ui_type
-            q.moodle_type = UI_TYPES[new_ui_type]
-            # Resets de segurança
-            if q.moodle_type == "truefalse":
-                q.options = [ChoiceOption(new_id("o"), "Verdadeiro", True), ChoiceOption(new_id("o"), "Falso", False)]
-            elif "multichoice" in q.moodle_type:
-                q.options = [ChoiceOption(new_id("o"), ""), ChoiceOption(new_id("o"), "")]
-            elif q.moodle_type == "matching":
-                q.pairs = [MatchPair(new_id("p"), "", "")]
-            st.rerun()
-
-        # Pontos
-        if q.moodle_type == "description":
-            c2.text_input("Pontos", value="0.0", disabled=True)
-        else:
-            q.meta.points = c2.number_input("Pontos", value=q.meta.points, min_value=0.1, step=0.5)
-
-        # Secção
-        q.section = c3.text_input("Secção", value=q.section, placeholder="Ex: Gramática")
-        q.title = st.text_input("Título Interno (Opcional)", value=q.title, placeholder="Ex: Q1 - Passado Perfeito")
-
-    mt = q.moodle_type
-
-    # --- BLOCO 2: ENUNCIADO (EM CIMA) ---
-    st.markdown("### 1. Enunciado")
-    
-    # AJUDA E EXEMPLOS (Só para Cloze)
-    if mt in ["cloze", "cloze_mc"]:
-        col_btn, col_help = st.columns([1, 3])
-        # Botão de inserir lacuna
-        if col_btn.button("➕ Inserir [ ]", help="Adiciona uma lacuna ao fim do texto", use_container_width=True):
-            q.prompt += " [ ] "
-            st.rerun()
-            
-        # Menu de Exemplos
-        with col_help.expander("Ver exemplos prontos"):
-            # --- A LINHA ABAIXO É A EXPLICAÇÃO QUE QUERIAS ---
-            st.info("Clique num dos botões abaixo para preencher a caixa de texto com um modelo pronto:")
-            
-            ce1, ce2 = st.columns(2)
-            if ce1.button("📝 Gramática (Verbos)"):
-                q.prompt = "Ontem, o gato [ ] (beber) leite."
-                st.rerun()
-            if ce2.button("🌍 Vocabulário"):
-                q.prompt = "O céu é [ ] (azul/verde)."
-                st.rerun()
-
-    # Área de Texto
-    placeholders = {
-        "cloze": "Ex: O gato [ ] (beber) leite ontem.",
-        "multichoice_single": "Ex: Define ",
-        "truefalse": "Ex: Classifique as afirmações sobre o texto:",
-        "matching": "Ex: Associe os países às capitais:",
-        "essay": "Ex: Escreva um texto sobre as suas férias."
-    }
-    
-    q.prompt = st.text_area(
-        "Escreva a pergunta aqui:", 
-        value=q.prompt, 
-        height=150, 
-        placeholder=placeholders.get(mt, ""),
-        label_visibility="collapsed"
-    )
-
-    # --- BLOCO 3: RESPOSTAS (EM BAIXO) ---
-    st.markdown("### 2. Definição das Respostas")
-    
-    # A. CLOZE
-    if mt in ["cloze", "cloze_mc"]:
-        n_gaps = count_gaps(q.prompt)
-        if n_gaps == 0:
-            st.warning("⚠️ O texto não tem lacunas. Use o botão **Inserir [ ]** ou escreva parêntesis retos.")
-        else:
-            while len(q.blanks) < n_gaps:
-                q.blanks.append(Blank(new_id("b"), f"L{len(q.blanks)+1}", [""], []))
-            q.blanks = q.blanks[:n_gaps]
-
-            is_mc = (mt == "cloze_mc")
-            cols = st.columns(2 if is_mc else 3)
-            
-            for i, b in enumerate(q.blanks):
-                with cols[i % len(cols)]:
-                    with st.container(border=True):
-                        st.markdown(f"**Lacuna {i+1}**")
-                        b.answers[0] = st.text_input("Correta", value=b.answers[0] if b.answers else "", key=f"ans_{b.bid}")
-                        if is_mc:
-                            dist_str = "; ".join(b.distractors)
-                            dists = st.text_input("Erradas (sep. por ';')", value=dist_str, key=f"dist_{b.bid}", placeholder="Ex: op1; op2")
-                            b.distractors = [d.strip() for d in dists.split(";") if d.strip()]
-
-    # B. ESCOLHA MÚLTIPLA (Lógica Corrigida)
-    elif mt.startswith("multichoice"):
-        for i, opt in enumerate(q.options):
-            c1, c2, c3 = st.columns([0.5, 4, 1])
-            
-            # Botão Apagar
-            if c1.button("🗑️", key=f"d_mc_{opt.oid}"):
-                q.options.pop(i)
-                st.rerun()
-            
-            # Texto da Opção
-            opt.text = c2.text_input(f"Opção {i+1}", value=opt.text, label_visibility="collapsed", key=f"t_mc_{opt.oid}")
-            
-            # Checkbox de Correção
-            # Nota: Usamos o session_state diretamente para forçar a atualização visual se necessário
-            chk_key = f"c_mc_{opt.oid}"
-            is_chk = c3.checkbox("Correta", value=opt.is_correct, key=chk_key)
-            
-            if mt == "multichoice_single":
-                # Lógica Exclusiva (Só uma pode ser verdadeira)
-                if is_chk and not opt.is_correct:
-                    # O utilizador acabou de marcar esta caixa.
-                    # 1. Marca esta como verdadeira
-                    opt.is_correct = True
-                    # 2. Desmarca TODAS as outras (no Modelo e na Visualização)
-                    for o in q.options:
-                        if o.oid != opt.oid:
-                            o.is_correct = False
-                            # Forçar o visual a desmarcar
-                            if f"c_mc_{o.oid}" in st.session_state:
-                                st.session_state[f"c_mc_{o.oid}"] = False
-                    st.rerun()
-                elif not is_chk and opt.is_correct:
-                    # O utilizador desmarcou a opção ativa
-                    opt.is_correct = False
-            else:
-                # Lógica Simples (Várias podem ser verdadeiras)
-                opt.is_correct = is_chk
-        
-        if st.button("➕ Adicionar Opção"):
-            q.options.append(ChoiceOption(new_id("o"), ""))
-            st.rerun()
-
-    # C. VERDADEIRO / FALSO
-    elif mt == "truefalse":
-        q.tf_require_correction = st.toggle("Pedir correção das Falsas?", value=q.tf_require_correction)
-        for i, opt in enumerate(q.options):
-            with st.container(border=True):
-                c1, c2, c3 = st.columns([0.5, 4, 2])
-                if c1.button("🗑️", key=f"d_vf_{opt.oid}"):
-                    q.options.pop(i)
-                    st.rerun()
-                opt.text = c2.text_input("Frase", value=opt.text, label_visibility="collapsed", key=f"t_vf_{opt.oid}")
-                sel = c3.radio("Gabarito", ["V", "F"], index=0 if opt.is_correct else 1, horizontal=True, label_visibility="collapsed", key=f"r_vf_{opt.oid}")
-                opt.is_correct = (sel == "V")
-        if st.button("➕ Adicionar Frase"):
-            q.options.append(ChoiceOption(new_id("o"), "", True))
-            st.rerun()
-
-    # D. MATCHING
-    elif mt == "matching":
-        for i, p in enumerate(q.pairs):
-            c1, c2, c3 = st.columns([0.5, 2.5, 2.5])
-            if c1.button("🗑️", key=f"d_mat_{p.pid}"):
-                q.pairs.pop(i)
-                st.rerun()
-            p.left = c2.text_input("A", value=p.left, label_visibility="collapsed", key=f"pl_{p.pid}", placeholder="Pergunta")
-            p.right = c3.text_input("B", value=p.right, label_visibility="collapsed", key=f"pr_{p.pid}", placeholder="Resposta")
-        if st.button("➕ Adicionar Par"):
-            q.pairs.append(MatchPair(new_id("p"), "", ""))
-            st.rerun()
-
-    elif mt == "shortanswer":
-        st.info("Insira as respostas aceites (ex: 'Lisboa', 'lisboa').")
-        current = "; ".join(q.accepted_answers)
-        new_val = st.text_area("Respostas (separar por ;)", value=current)
-        q.accepted_answers = [x.strip() for x in new_val.split(";") if x.strip()]
-
-    # --- BLOCO 4: PRÉ-VISUALIZAÇÃO (CLEAN) ---
-    st.divider()
-    st.subheader("Pré-visualização")
-    
-    # Container com borda para simular "papel" branco
-    with st.container(border=True):
-        tab1, tab2 = st.tabs(["Vista do Aluno", "Vista do Professor"])
-        
-        with tab1:
-            if mt == "cloze":
-                preview_text = q.prompt.replace("[ ]", " `[ ________ ]` ")
-                st.markdown(preview_text)
-            elif mt == "cloze_mc":
-                preview_text = q.prompt.replace("[ ]", " `[ Selecionar... 🔽 ]` ")
-                st.markdown(preview_text)
-            elif "multichoice" in mt:
-                st.markdown(q.prompt)
-                for o in q.options:
-                    st.markdown(f"- ⚪ {o.text}")
-            elif mt == "truefalse":
-                st.markdown(q.prompt)
-                st.write("---")
-                for o in q.options:
-                    st.markdown(f"- {o.text} **(V / F)**")
-            elif mt == "matching":
-                st.markdown(q.prompt)
-                st.write("---")
-                c_a, c_b = st.columns(2)
-                with c_a: 
-                    for p in q.pairs: st.markdown(f"- {p.left}")
-                with c_b:
-                    st.markdown("*(Menu de opções)*")
-            else:
-                st.markdown(q.prompt)
-
-        with tab2:
-            if mt in ["cloze", "cloze_mc"]:
-                st.markdown("**Soluções:**")
-                for i, b in enumerate(q.blanks):
-                    st.markdown(f"{i+1}. **{b.answers[0] if b.answers else '?'}**")
-            elif "multichoice" in mt:
-                for o in q.options:
-                    mark = "✅" if o.is_correct else "❌"
-                    st.markdown(f"{mark} {o.text}")
-            elif mt == "truefalse":
-                for o in q.options:
-                    ans = "VERDADEIRO" if o.is_correct else "FALSO"
-                    st.markdown(f"- {o.text} -> **{ans}**")
-            elif mt == "matching":
-                for p in q.pairs:
-                    st.markdown(f"- {p.left} 🔗 **{p.right}**")
-
-    # --- AÇÕES FINAIS ---
-    st.divider()
-    col_save, col_next = st.columns(2)
-    
-    # 1. Guardar e Sair
-    if col_save.button("💾 Guardar e Sair", type="primary", use_container_width=True):
-        # LÓGICA INTEGRADA (SEM FUNÇÃO EXTERNA)
-        if st.session_state.active_qid:
-            for i, existing_q in enumerate(st.session_state.ta.questions):
-                if existing_q.qid == st.session_state.active_qid:
-                    st.session_state.ta.questions[i] = copy.deepcopy(q)
-                    break
-        else:
-            st.session_state.ta.questions.append(copy.deepcopy(q))
-            
-        del st.session_state.draft_q
-        st.session_state.active_view = "Editor de Ficha"
-        st.session_state.active_qid = None
-        st.rerun()
-
-    # 2. Guardar e Criar Seguinte
-    if col_next.button("⏩ Guardar e Criar Seguinte", help="Guarda e abre nova do mesmo tipo", use_container_width=True):
-        # LÓGICA INTEGRADA (SEM FUNÇÃO EXTERNA)
-        if st.session_state.active_qid:
-            for i, existing_q in enumerate(st.session_state.ta.questions):
-                if existing_q.qid == st.session_state.active_qid:
-                    st.session_state.ta.questions[i] = copy.deepcopy(q)
-                    break
-        else:
-            st.session_state.ta.questions.append(copy.deepcopy(q))
-
-        # PREPARAR A PRÓXIMA
-        next_q = Question(
-            qid=new_id("q"), ui_type=q.ui_type, moodle_type=q.moodle_type,
-            prompt="", section=q.section, meta=copy.deepcopy(q.meta)
-        )
-        if "multichoice" in q.moodle_type:
-            next_q.options = [ChoiceOption(new_id("o"), ""), ChoiceOption(new_id("o"), "")]
-        elif q.moodle_type == "truefalse":
-            next_q.options = [ChoiceOption(new_id("o"), "Verdadeiro", True), ChoiceOption(new_id("o"), "Falso", False)]
-        elif q.moodle_type == "matching":
-            next_q.pairs = [MatchPair(new_id("p"), "", "")]
-            
-        st.session_state.draft_q = next_q
-        st.session_state.active_qid = None 
-        st.rerun()
-
-
-# ==============================================================================
-# VIEW 3: EXPORTAR E VALIDAR
-# ==============================================================================
-def render_export_view():
-    st.title("📦 Exportar para Moodle")
-    if st.button("🔙 Voltar ao Editor"):
-        st.session_state.active_view = "Editor de Ficha"
-        st.rerun()
-    
-    st.divider()
-    
-    # 1. Validar
-    issues = validate_ficha(ta)
-    update_ficha_status(ta, issues)
-    
-    has_errors = any(i.level == "ERRO" for i in issues)
-    
-    if has_errors:
-        st.error("⚠️ Foram encontrados erros que impedem a exportação correta.")
-    else:
-        st.success("✅ A ficha está válida e pronta a exportar!")
-
-    # Mostrar relatório
-    for i in issues:
-        color = "red" if i.level == "ERRO" else "orange"
-        st.markdown(f":{color}[**{i.level}**] em _{i.where}_: {i.message}")
-
-    # 2. Gerar XML
-    xml_output = build_moodle_xml_stub(ta)
-    
-    st.subheader("Pré-visualização do XML")
-    with st.expander("Ver código XML"):
-        st.code(xml_output, language="xml")
-
-    # 3. Download
-    st.download_button(
-        label="📥 Descarregar Ficheiro (.xml)",
-        data=xml_output,
-        file_name=f"ficha_{ta.ta_name.replace(' ', '_')}.xml",
-        mime="application/xml"
-    )
-
-# ==============================================================================
-# CONTROLADOR PRINCIPAL
-# ==============================================================================
-if st.session_state.active_view == "Editor de Ficha":
-    render_ficha_editor()
-elif st.session_state.active_view == "Editor de Questão":
-    render_question_editor()
-elif st.session_state.active_view == "Exportar":
-    render_export_view()
\ No newline at end of file
+# app.py
+# BabeliUM — Criador de Fichas de Exercícios
+# Interface Gráfica (Streamlit)
+
+import streamlit as st
+import cProfile
+import sys
+import os
+
+# --- GARANTIR QUE OS IMPORTS FUNCIONAM ---
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
+
+try:
+    from models import TA, QuestionMeta, new_id_default, TYPE_TO_LABEL
+    from utils import new_id
+    from validators import iter_validation, has_blocking_errors, update_ficha_status
+    from exporters import EXPORTERS, get_exporter, cached_export, new_export_cache
+    from duplicates import DuplicateIndex, duplicate_issues, index_in_background
+    from storage import EXTENSION, list_fichas, load_ta
+    from shared_bank import SharedTA, load_shared_ta, session_ta
+    from journal import Journal, snapshot_path
+    from listing import ListFilter, PAGE_SIZES, STATUS_FILTERS, filter_positions, list_facets, page_of
+    from question_editor import render_question_editor
+    from profiling import LatencyStats, profile_report, record_rerun, span, timed
+except ImportError as e:
+    st.error(f"Erro ao importar módulos: {e}")
+    st.stop()
+
+# --- CONFIGURAÇÃO DA PÁGINA ---
+st.set_page_config(
+    page_title="BabeliUM Editor",
+    page_icon="⚡",
+    layout="wide"
+)
+
+# Máximo de problemas de validação listados na vista de exportação
+MAX_REPORT_ISSUES = 200
+# Linhas por página na pré-visualização do ficheiro exportado
+PREVIEW_LINES = 300
+
+# Critérios de ordenação da ficha (botão "Ordenar" do editor de ficha)
+SORT_KEYS = {
+    "Secção": lambda q: q.section,
+    "Tipo": lambda q: q.ui_type,
+    "Título": lambda q: q.title.casefold(),
+    "Pontos": lambda q: q.meta.points,
+}
+
+# Pasta onde as fichas são guardadas (formato .babta, ver storage.py)
+DATA_DIR = os.environ.get("BABELIUM_DATA_DIR", os.path.join(current_dir, "fichas"))
+
+# Banco de referência comum a todos os professores (ver shared_bank.py)
+REFERENCE_BANK = os.environ.get("BABELIUM_REFERENCE_BANK", os.path.join(current_dir, f"banco_referencia{EXTENSION}"))
+
+# Registo dos tempos por fase (uma linha JSON por rerun, só com o painel "Desempenho" ligado)
+PERF_LOG = os.environ.get("BABELIUM_PERF_LOG", os.path.join(DATA_DIR, "tempos.jsonl"))
+
+
+@st.cache_resource(show_spinner="A carregar o banco de referência...")
+def get_reference_bank(path: str, mtime_ns: int) -> SharedTA:
+    # Uma só cópia por processo, partilhada por todas as sessões (só de leitura).
+    # mtime_ns entra na chave: se o ficheiro for substituído, o banco é lido de novo.
+    return load_shared_ta(path)
+
+@st.cache_resource(show_spinner=False)
+def get_duplicate_base(bank_path: str, bank_mtime_ns: int):
+    # Índice de duplicados do banco de referência e das fichas gravadas, um por processo e
+    # construído numa thread: devolve logo um Future e nenhum rerun espera pela construção.
+    # As fichas gravadas depois do arranque entram pelo índice da sessão que as tiver abertas.
+    bank = get_reference_bank(bank_path, bank_mtime_ns) if bank_mtime_ns else None
+
+    def load_fichas():
+        if bank is not None:
+            # As mesmas questões que as sessões sobre o banco leem: reconhecidas por identidade
+            yield TA(**bank.info, questions=list(bank.questions))
+        for path, header in list_fichas(DATA_DIR):
+            # As sessões gravadas sobre o banco só têm a camada (as suas questões têm qids do banco)
+            if "bank" not in header.get("extra", {}):
+                yield load_ta(path)
+
+    return index_in_background(load_fichas)
+
+def session_dup_index():
+    # Índice de duplicados da sessão sobre o índice do processo; None enquanto este é construído
+    bank_mtime_ns = os.stat(REFERENCE_BANK).st_mtime_ns if os.path.exists(REFERENCE_BANK) else 0
+    future = get_duplicate_base(REFERENCE_BANK, bank_mtime_ns)
+    if not future.done():
+        return None
+    base = None if future.exception() is not None else future.result()
+    index = st.session_state.get("dup_index")
+    if index is None or index.base is not base:
+        index = st.session_state.dup_index = DuplicateIndex(base=base)
+    return index
+
+def load_bank(path: str) -> SharedTA:
+    # As sessões gravadas sobre um banco são repostas sobre a cópia partilhada do processo
+    return get_reference_bank(path, os.stat(path).st_mtime_ns)
+
+# --- GESTÃO DE ESTADO (SESSION STATE) ---
+if "ta" not in st.session_state:
+    # Sessão nova: se o URL indicar uma ficha com gravação automática, recupera-a
+    # (fotografia + diário); caso contrário cria uma nova ficha vazia
+    ficha_id = st.query_params.get("ficha")
+    journal = None
+    if ficha_id:
+        try:
+            journal = Journal.recover(snapshot_path(DATA_DIR, ficha_id), load_bank=load_bank)
+        except (OSError, ValueError) as e:
+            # Inclui JournalError (diário com registos que não se podem repetir)
+            st.error(f"Não foi possível recuperar a ficha '{ficha_id}': {e}")
+            journal = None
+    if journal is not None:
+        st.session_state.ta = journal.ta
+        st.session_state.journal = journal
+    else:
+        st.session_state.ta = TA(ta_id=new_id("ta"))
+
+if "active_view" not in st.session_state:
+    st.session_state.active_view = "Editor de Ficha" # "Editor de Ficha" | "Editor de Questão"
+
+if "active_qid" not in st.session_state:
+    st.session_state.active_qid = None # ID da questão a ser editada
+
+if "export_cache" not in st.session_state:
+    # Ficheiros exportados da ficha atual (desta sessão: saem com ela)
+    st.session_state.export_cache = new_export_cache()
+
+# Atalho para variáveis
+ta = st.session_state.ta
+
+# Diário da ficha atual (gravação automática): refeito sempre que a ficha é substituída
+if st.session_state.get("journal") is None or st.session_state.journal.ta is not ta:
+    if st.session_state.get("journal") is not None:
+        st.session_state.journal.close()
+    st.session_state.journal = Journal.for_ta(DATA_DIR, ta)
+journal = st.session_state.journal
+if journal.started and st.query_params.get("ficha") != ta.ta_id:
+    # Permite reabrir a ficha depois de um recarregamento ou de uma falha
+    st.query_params["ficha"] = ta.ta_id
+
+# Índice de questões quase iguais: o do processo (banco e fichas gravadas) mais a ficha atual,
+# atualizado só nas questões que mudaram; as fichas abertas antes nesta sessão saem dele
+dup_index = session_dup_index()
+if dup_index is not None:
+    for other_id in dup_index.fichas() - {ta.ta_id}:
+        dup_index.drop_ficha(other_id)
+
+# --- FUNÇÕES AUXILIARES DE UI ---
+def get_question_by_id(qid):
+    return ta.questions.get(qid)
+
+def move_question(idx, direction):
+    # direction: -1 (cima), +1 (baixo)
+    new_idx = idx + direction
+    if 0 <= new_idx < len(ta.questions):
+        move_question_to(ta.questions[idx].qid, new_idx)
+
+def move_question_to(qid, pos):
+    pos = ta.questions.move(qid, pos)
+    journal.log_move(qid, pos)
+
+def sort_questions(key):
+    ta.questions.sort_by(key)
+    journal.log_reorder(ta.questions.qids())
+
+def n_questions_of(header):
+    # Uma sessão sobre o banco grava só a camada: o total está em extra["bank"]
+    return header.get("extra", {}).get("bank", {}).get("n_questions", header.get("n_questions", 0))
+
+def delete_question(idx):
+    q = ta.questions.pop(idx)
+    journal.log_delete(q.qid)
+
+# ==============================================================================
+# VIEW 1: EDITOR DE FICHA (DASHBOARD)
+# ==============================================================================
+@timed()
+def render_ficha_editor():
+    st.title("⚡ BabeliUM Editor")
+    
+    # 1. Cabeçalho da Ficha
+    with st.container():
+        c1, c2, c3 = st.columns([3, 2, 2])
+        ta.ta_name = c1.text_input("Nome da Ficha", value=ta.ta_name)
+        ta.course = c2.text_input("Curso / Nível", value=ta.course)
+        journal.log_header()
+        
+        with c3:
+            st.write(" ") 
+            if st.button("➕ Nova Questão", use_container_width=True, type="primary"):
+                st.session_state.active_qid = None # None significa "criar nova"
+                st.session_state.active_view = "Editor de Questão"
+                st.rerun()
+
+    st.divider()
+
+    # 2. Barra de Ferramentas da Lista (filtros e paginação)
+    col_info, col_filter, col_sort, col_view = st.columns([2, 1, 1, 1])
+    with col_view:
+        view_mode = st.radio("Ver como:", ["Lista Compacta", "Cartões Abertos"], horizontal=True, label_visibility="collapsed")
+    with col_sort.popover("↕️ Ordenar", use_container_width=True):
+        # Reordena a ficha inteira numa só operação (ordenação estável)
+        sort_label = st.selectbox("Ordenar por", list(SORT_KEYS), key="sort_by")
+        if st.button("Aplicar", use_container_width=True, disabled=len(ta.questions) < 2):
+            sort_questions(SORT_KEYS[sort_label])
+            st.rerun()
+
+    # Os filtros só percorrem a ficha quando estão visíveis
+    flt = ListFilter()
+    if col_filter.toggle("🔎 Filtros", key="show_filters"):
+        types, sections = list_facets(ta.questions)
+        f1, f2, f3, f4 = st.columns([2, 2, 2, 1])
+        flt = ListFilter(
+            types=tuple(f1.multiselect("Tipo", types, format_func=lambda t: TYPE_TO_LABEL.get(t, t), key="flt_types")),
+            sections=tuple(f2.multiselect("Secção", sections, key="flt_sections")),
+            text=f3.text_input("Pesquisar", placeholder="Título ou enunciado", key="flt_text"),
+            status=f4.selectbox("Estado", list(STATUS_FILTERS), key="flt_status"),
+        )
+
+    positions = filter_positions(ta.questions, flt)
+    # Filtros novos voltam à primeira página
+    if st.session_state.get("list_filter") != flt:
+        st.session_state.list_filter = flt
+        st.session_state.list_page = 0
+
+    with col_info:
+        if flt.active():
+            st.caption(f"**{len(positions)}** de **{len(ta.questions)}** itens na ficha.")
+        else:
+            st.caption(f"Total: **{len(ta.questions)}** itens na ficha.")
+
+    # 3. Listagem das Questões (só a página visível é desenhada)
+    if not ta.questions:
+        st.info("A ficha está vazia. Clique em 'Nova Questão' para começar.")
+    elif not positions:
+        st.info("Nenhuma questão corresponde aos filtros.")
+    else:
+        page_size = st.session_state.get("list_page_size", PAGE_SIZES[1])
+        visible, page, n_pages = page_of(positions, st.session_state.get("list_page", 0), page_size)
+        st.session_state.list_page = page
+
+        for idx in visible:
+            q = ta.questions[idx]
+            
+            # Ícones Visuais
+            icon = "❓"
+            if q.moodle_type == "cloze": icon = "📝"
+            elif q.moodle_type == "cloze_mc": icon = "🔽"
+            elif q.moodle_type.startswith("multichoice"): icon = "🔘"
+            elif q.moodle_type == "truefalse": icon = "⚖️"
+            elif q.moodle_type == "matching": icon = "🔗"
+            elif q.moodle_type == "description": icon = "📄"
+            elif q.moodle_type == "essay": icon = "✍️"
+
+            titulo = q.title if q.title.strip() else f"(Sem título - {idx+1})"
+            pontos = f"{q.meta.points} pts" if q.moodle_type != "description" else "Info"
+
+            # --- MODO LISTA COMPACTA (ACORDEÃO) ---
+            if view_mode == "Lista Compacta":
+                with st.expander(f"{idx+1}. {icon} {titulo}  —  {pontos}", expanded=False):
+                    c_prev, c_acts = st.columns([4, 1])
+                    with c_prev:
+                        st.caption(f"**Tipo:** {TYPE_TO_LABEL.get(q.ui_type, q.ui_type)} | **Secção:** {q.section}")
+                        clean_text = q.prompt.replace("\n", " ")
+                        st.markdown(f"_{clean_text[:150] + '...' if len(clean_text)>150 else clean_text}_")
+                    
+                    with c_acts:
+                        if st.button("✏️ Editar", key=f"ed_c_{q.qid}", use_container_width=True):
+                            st.session_state.active_qid = q.qid
+                            st.session_state.active_view = "Editor de Questão"
+                            st.rerun()
+                        if st.button("🗑️ Apagar", key=f"del_c_{q.qid}", use_container_width=True):
+                            delete_question(idx)
+                            st.rerun()
+                        # Setas
+                        c_up, c_down = st.columns(2)
+                        with c_up:
+                            if idx > 0 and st.button("⬆️", key=f"up_{q.qid}"):
+                                move_question(idx, -1)
+                                st.rerun()
+                        with c_down:
+                            if idx < len(ta.questions)-1 and st.button("⬇️", key=f"dw_{q.qid}"):
+                                move_question(idx, 1)
+                                st.rerun()
+                        # Mover diretamente para outra posição (a chave inclui a posição atual)
+                        new_pos = st.number_input("Posição", min_value=1, max_value=len(ta.questions), value=idx + 1,
+                                                  key=f"pos_{q.qid}_{idx}", label_visibility="collapsed")
+                        if new_pos != idx + 1:
+                            move_question_to(q.qid, new_pos - 1)
+                            st.rerun()
+
+            # --- MODO CARTÕES ABERTOS ---
+            else:
+                with st.container(border=True):
+                    st.markdown(f"### {idx+1}. {icon} {titulo}")
+                    st.markdown(q.prompt, unsafe_allow_html=True)
+                    b1, b2 = st.columns([1, 4])
+                    if b1.button("Editar", key=f"ed_d_{q.qid}"):
+                        st.session_state.active_qid = q.qid
+                        st.session_state.active_view = "Editor de Questão"
+                        st.rerun()
+
+        # Navegação entre páginas
+        p_prev, p_info, p_next, p_size = st.columns([1, 2, 1, 1])
+        if p_prev.button("◀ Anterior", disabled=page == 0, use_container_width=True):
+            st.session_state.list_page = page - 1
+            st.rerun()
+        p_info.caption(f"Página {page + 1} de {n_pages} (questões {page * page_size + 1}–{page * page_size + len(visible)} de {len(positions)})")
+        if p_next.button("Seguinte ▶", disabled=page >= n_pages - 1, use_container_width=True):
+            st.session_state.list_page = page + 1
+            st.rerun()
+        new_size = p_size.selectbox("Por página", PAGE_SIZES, index=PAGE_SIZES.index(page_size), label_visibility="collapsed")
+        if new_size != page_size:
+            # Mantém visível a primeira questão da página atual
+            st.session_state.list_page = (page * page_size) // new_size
+            st.session_state.list_page_size = new_size
+            st.rerun()
+    
+    st.divider()
+    
+    # 4. Botão de Exportação
+    if st.button("📦 Gerar MoodleXML Final", use_container_width=True, type="secondary"):
+        st.session_state.active_view = "Exportar"
+        st.rerun()
+
+
+# ==============================================================================
+# VIEW 2: EDITOR DE QUESTÃO -> question_editor.py (blocos em fragmentos)
+# ==============================================================================
+
+# ==============================================================================
+# VIEW 3: EXPORTAR E VALIDAR
+# ==============================================================================
+@timed()
+def render_export_view():
+    st.title("📦 Exportar para Moodle")
+    if st.button("🔙 Voltar ao Editor"):
+        st.session_state.active_view = "Editor de Ficha"
+        st.rerun()
+    
+    st.divider()
+    
+    # 1. Validar: o estado só precisa do primeiro ERRO; o relatório mostra no máximo
+    # MAX_REPORT_ISSUES problemas (em fichas enormes, desenhar milhares de linhas bloqueia a página)
+    with span("validação"):
+        has_errors = has_blocking_errors(ta)
+        issues = list(iter_validation(ta, max_issues=MAX_REPORT_ISSUES))
+        report_truncated = len(issues) == MAX_REPORT_ISSUES
+        dups = [] if dup_index is None else duplicate_issues(ta, dup_index, max_issues=MAX_REPORT_ISSUES)
+        dups_truncated = len(dups) == MAX_REPORT_ISSUES
+        issues += dups
+    update_ficha_status(ta, issues, has_errors=has_errors)
+    
+    if has_errors:
+        st.error("⚠️ Foram encontrados erros que impedem a exportação correta.")
+    else:
+        st.success("✅ A ficha está válida e pronta a exportar!")
+
+    # Mostrar relatório
+    for i in issues:
+        color = "red" if i.level == "ERRO" else "orange"
+        st.markdown(f":{color}[**{i.level}**] em _{i.where}_: {i.message}")
+    if report_truncated:
+        st.caption(f"Mostrados apenas os primeiros {MAX_REPORT_ISSUES} problemas de validação.")
+    if dups_truncated:
+        st.caption(f"Mostrados apenas os primeiros {MAX_REPORT_ISSUES} avisos de possíveis duplicados.")
+    if dup_index is None:
+        st.caption("O índice de duplicados do banco ainda está a ser preparado: os avisos de possíveis duplicados aparecem quando estiver pronto.")
+
+    # 2. Escolher formato e gerar
+    fmt = st.selectbox(
+        "Formato",
+        list(EXPORTERS),
+        format_func=lambda name: EXPORTERS[name].label,
+        key="export_format",
+    )
+    exporter = get_exporter(fmt)
+    # Gerado uma vez por versão da ficha; os reruns seguintes reutilizam os bytes
+    with span("exportação"):
+        result = cached_export(ta, fmt, cache=st.session_state.export_cache)
+
+    if result.skipped:
+        st.warning(f"{len(result.skipped)} questão(ões) não podem ser representadas em {exporter.label} e foram ignoradas.")
+        for i in result.skipped:
+            st.markdown(f":orange[**{i.level}**] em _{i.where}_: {i.message}")
+
+    # Pré-visualização só a pedido, uma página de linhas de cada vez
+    st.subheader(f"Pré-visualização ({exporter.label})")
+    if st.toggle("Ver código", key="export_preview"):
+        n_lines = result.n_lines
+        n_pages = max(1, -(-n_lines // PREVIEW_LINES))
+        page = 1
+        if n_pages > 1:
+            page = st.number_input(f"Página (de {n_pages})", min_value=1, max_value=n_pages, value=1, key="export_preview_page")
+        st.code(result.lines((page - 1) * PREVIEW_LINES, PREVIEW_LINES), language="xml" if fmt == "moodlexml" else "text")
+        st.caption(f"{n_lines} linhas, {len(result.data) / 1024:.0f} KB.")
+
+    # 3. Download (dos bytes em cache; opcionalmente comprimido)
+    file_name = f"ficha_{ta.ta_name.replace(' ', '_')}.{exporter.extension}"
+    if st.checkbox("Comprimir (.gz)", key="export_gzip", help="Ficheiro mais pequeno; o Moodle precisa do ficheiro descomprimido."):
+        data, file_name, mime = result.gzipped(), file_name + ".gz", "application/gzip"
+    else:
+        data, mime = result.data, exporter.mime
+    st.download_button(
+        label=f"📥 Descarregar Ficheiro (.{exporter.extension}{'.gz' if mime == 'application/gzip' else ''})",
+        data=data,
+        file_name=file_name,
+        mime=mime
+    )
+
+# ==============================================================================
+# BARRA LATERAL: GUARDAR / ABRIR FICHAS
+# ==============================================================================
+@timed()
+def render_storage_sidebar():
+    with st.sidebar:
+        if os.path.exists(REFERENCE_BANK):
+            st.header("📚 Banco de referência")
+            bank = get_reference_bank(REFERENCE_BANK, os.stat(REFERENCE_BANK).st_mtime_ns)
+            st.caption(f"{bank.info.get('ta_name', '')}: {len(bank)} questões")
+            if st.button("Abrir banco", use_container_width=True):
+                # A sessão só guarda as suas alterações; as questões são lidas do banco partilhado
+                st.session_state.ta = session_ta(bank)
+                st.session_state.active_view = "Editor de Ficha"
+                st.session_state.active_qid = None
+                st.session_state.pop("draft_q", None)
+                st.rerun()
+
+        st.header("💾 Fichas guardadas")
+        if st.button("Guardar ficha", use_container_width=True, type="primary"):
+            # Fotografia completa; o diário das edições fica vazio
+            journal.compact()
+            st.success(f"Ficha '{ta.ta_name}' guardada.")
+
+        # Só os cabeçalhos: as questões de cada ficha não são lidas para a listagem
+        saved = list_fichas(DATA_DIR)
+        if not saved:
+            st.caption("Ainda não há fichas guardadas.")
+            return
+        headers = dict(saved)
+        choice = st.selectbox(
+            "Abrir ficha",
+            list(headers),
+            format_func=lambda p: f"{headers[p]['ta'].get('ta_name', '?')} ({n_questions_of(headers[p])} questões)",
+        )
+        if st.button("📂 Abrir", use_container_width=True):
+            # As questões são descodificadas à medida que são usadas; as edições
+            # registadas no diário depois da última fotografia são repetidas
+            try:
+                recovered = Journal.recover(choice, load_bank=load_bank)
+            except (OSError, ValueError) as e:
+                # Inclui JournalError (diário com registos que não se podem repetir)
+                st.error(f"Não foi possível abrir '{os.path.basename(choice)}': {e}")
+                return
+            journal.close()
+            st.session_state.journal = recovered
+            st.session_state.ta = recovered.ta
+            st.session_state.active_view = "Editor de Ficha"
+            st.session_state.active_qid = None
+            st.session_state.pop("draft_q", None)
+            st.rerun()
+
+
+# ==============================================================================
+# BARRA LATERAL: DESEMPENHO (TEMPOS POR FASE, CPROFILE)
+# ==============================================================================
+def render_perf_panel():
+    with st.sidebar:
+        st.header("⏱️ Desempenho")
+        if not st.toggle("Medir tempos por fase", key="perf_panel",
+                         help=f"Percentis por fase dos últimos reruns desta sessão; cada rerun é acrescentado a {PERF_LOG}."):
+            return
+        stats = st.session_state.get("perf_stats")
+        if stats is None or not stats.reruns:
+            st.caption("Ainda não há reruns medidos: interaja com a aplicação.")
+        else:
+            st.dataframe(stats.rows(), hide_index=True, use_container_width=True)
+            st.caption(f"Últimos {min(stats.reruns, stats.maxlen)} reruns (a fase \"rerun\" é o rerun inteiro).")
+
+        c1, c2 = st.columns(2)
+        if c1.button("🧪 Perfilar", use_container_width=True, help="Corre a próxima interação sob cProfile"):
+            st.session_state.profile_next = True
+        if c2.button("Limpar", use_container_width=True):
+            if stats is not None:
+                stats.clear()
+            st.session_state.pop("profile_report", None)
+        if st.session_state.get("profile_next"):
+            st.caption("A próxima interação vai ser perfilada.")
+        report = st.session_state.get("profile_report")
+        if report:
+            with st.expander("cProfile do último rerun perfilado"):
+                st.code(report, language="text")
+
+
+# ==============================================================================
+# CONTROLADOR PRINCIPAL
+# ==============================================================================
+def render_view():
+    render_storage_sidebar()
+    if st.session_state.active_view == "Editor de Ficha":
+        render_ficha_editor()
+    elif st.session_state.active_view == "Editor de Questão":
+        render_question_editor(ta, journal)
+    elif st.session_state.active_view == "Exportar":
+        render_export_view()
+
+if st.session_state.get("perf_panel"):
+    # Painel "Desempenho" ligado: mede as fases deste rerun (e perfila-o, se foi pedido)
+    if "perf_stats" not in st.session_state:
+        st.session_state.perf_stats = LatencyStats()
+    profiler = cProfile.Profile() if st.session_state.pop("profile_next", False) else None
+    try:
+        with record_rerun(st.session_state.perf_stats, PERF_LOG, profiler,
+                          extra={"view": st.session_state.active_view, "n_questions": len(ta.questions)}):
+            render_view()
+    finally:
+        if profiler is not None:
+            st.session_state.profile_report = profile_report(profiler)
+else:
+    render_view()
+render_perf_panel()
\ No newline at end of file
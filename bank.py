@@ -0,0 +1,305 @@
+# bank.py
+# Banco de questões: todas as questões de todas as fichas, consultadas como uma só tabela.
+#
+# O índice é colunar: cada campo escalar (moodle_type, secção, nível, pontos, categoria, ficha)
+# é uma coluna codificada por dicionário (valor -> código, array de códigos por linha) e, para
+# cada valor, a lista das linhas que o têm. As consultas trabalham sobre máscaras: inteiros
+# Python usados como bitmaps (bit i = linha i), combinados com & e | em C, 64 linhas de cada vez.
+# Uma condição sobre uma coluna avalia-se nos valores distintos (poucos), não nas linhas:
+#   bank.where(moodle_type="cloze_mc", section="Gramática", difficulty="B1", points=lambda p: p >= 2)
+# As agregações contam bits (int.bit_count) e as questões (objetos Question) só são
+# lidas para as linhas do resultado, a partir da ficha em memória ou do ficheiro .babta.
+#
+# Uso (linha de comandos):
+#   python bank.py pasta_fichas/ [--type cloze_mc] [--section Gramática] [--level B1] [--min-points 2]
+import argparse
+import os
+import sys
+from array import array
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
+
+from models import TA, Question  # noqa: E402
+from storage import EXTENSION, StoredTA, open_ta  # noqa: E402
+
+# Colunas do índice (o nome é o usado em where, group_count e aggregate)
+COLUMNS = ("moodle_type", "section", "difficulty", "points", "category", "ta_id")
+
+# Condição sobre uma coluna: valor exato, conjunto de valores aceites ou função valor -> bool
+Condition = Union[Any, Tuple, List, set, frozenset, Callable[[Any], bool]]
+
+_BITS = bytes.maketrans(b"\x00\x01", b"01")
+
+
+def _rows_to_bitmap(rows: Iterable[int], n_rows: int) -> int:
+    # Uma passagem para marcar as linhas; a conversão para inteiro (base 2) é feita em C
+    marks = bytearray(n_rows)
+    for r in rows:
+        marks[r] = 1
+    return int(marks.translate(_BITS)[::-1] or b"0", 2)
+
+
+def iter_rows(mask: int) -> Iterator[int]:
+    """Linhas (bits a 1) de uma máscara, por ordem crescente."""
+    bits = bin(mask)[:1:-1]
+    i = bits.find("1")
+    while i >= 0:
+        yield i
+        i = bits.find("1", i + 1)
+
+
+class _Column:
+    """Coluna codificada por dicionário: códigos por linha + linhas de cada valor (e o bitmap, em cache)."""
+
+    __slots__ = ("values", "code_of", "codes", "postings", "_bitmaps")
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self.code_of: Dict[Any, int] = {}
+        self.codes = array("I")
+        self.postings: List[array] = []
+        self._bitmaps: Dict[int, int] = {}
+
+    def append(self, value: Any, row: int) -> None:
+        code = self.code_of.get(value)
+        if code is None:
+            code = self.code_of[value] = len(self.values)
+            self.values.append(value)
+            self.postings.append(array("I"))
+        self.codes.append(code)
+        self.postings[code].append(row)
+        self._bitmaps.pop(code, None)
+
+    def bitmap(self, code: int) -> int:
+        bm = self._bitmaps.get(code)
+        if bm is None:
+            bm = self._bitmaps[code] = _rows_to_bitmap(self.postings[code], len(self.codes))
+        return bm
+
+    def matching_codes(self, cond: Condition) -> List[int]:
+        if callable(cond):
+            return [c for c, v in enumerate(self.values) if v is not None and cond(v)]
+        if isinstance(cond, (tuple, list, set, frozenset)):
+            return [self.code_of[v] for v in cond if v in self.code_of]
+        code = self.code_of.get(cond)
+        return [] if code is None else [code]
+
+    def mask(self, cond: Condition) -> int:
+        m = 0
+        for code in self.matching_codes(cond):
+            m |= self.bitmap(code)
+        return m
+
+
+class QuestionBank:
+    """
+    Índice colunar das questões de várias fichas. Cada ficha é adicionada com add_ta (em memória)
+    ou add_stored/add_folder (ficheiros .babta: só o índice é lido). Voltar a adicionar uma ficha
+    substitui as linhas antigas.
+    """
+
+    def __init__(self):
+        self.columns: Dict[str, _Column] = {name: _Column() for name in COLUMNS}
+        self.qids: List[str] = []
+        # Posição da questão na ficha (para a ler só quando é pedida)
+        self.positions = array("I")
+        # ta_id -> TA ou StoredTA de onde as questões são lidas
+        self.sources: Dict[str, Union[TA, StoredTA]] = {}
+        self.alive = 0
+        self._n_dead = 0
+
+    def __len__(self) -> int:
+        return self.alive.bit_count()
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.qids)
+
+    # --- Construção ---
+
+    def _append(self, ta_id: str, rows: Iterable[Tuple[str, str, str, Optional[str], float, Optional[str]]]) -> None:
+        start = len(self.qids)
+        cols = [self.columns[name] for name in COLUMNS]
+        for pos, (qid, *values) in enumerate(rows):
+            row = len(self.qids)
+            self.qids.append(qid)
+            self.positions.append(pos)
+            for col, value in zip(cols, values):
+                col.append(value, row)
+            cols[-1].append(ta_id, row)
+        n = len(self.qids) - start
+        self.alive |= ((1 << n) - 1) << start
+
+    def add_ta(self, ta: TA) -> None:
+        """Indexa uma ficha em memória (se já estava no banco, as linhas antigas são substituídas)."""
+        self.remove_ta(ta.ta_id)
+        self.sources[ta.ta_id] = ta
+        self._append(ta.ta_id, (
+            (q.qid, q.moodle_type, q.section, q.meta.difficulty, q.meta.points, q.meta.category)
+            for q in ta.questions
+        ))
+
+    def add_stored(self, stored: StoredTA) -> None:
+        """Indexa uma ficha gravada a partir do índice do ficheiro, sem descodificar as questões."""
+        ta_id = stored.header.get("ta", {}).get("ta_id") or stored.path
+        if any(e.difficulty is None for e in stored.entries):
+            # Ficheiro antigo (índice sem categoria/nível): lê as questões
+            ta = stored.to_ta(lazy=False)
+            ta.ta_id = ta_id
+            self.add_ta(ta)
+            return
+        self.remove_ta(ta_id)
+        self.sources[ta_id] = stored
+        self._append(ta_id, (
+            (e.qid, e.moodle_type, e.section, e.difficulty, e.points, e.category)
+            for e in stored.entries
+        ))
+
+    def add_folder(self, folder: str) -> int:
+        """Indexa todas as fichas .babta da pasta. Devolve o número de fichas."""
+        n = 0
+        for name in sorted(os.listdir(folder)):
+            if name.endswith(EXTENSION):
+                self.add_stored(open_ta(os.path.join(folder, name)))
+                n += 1
+        return n
+
+    def remove_ta(self, ta_id: str) -> None:
+        if self.sources.pop(ta_id, None) is None:
+            return
+        rows = self.columns["ta_id"].mask(ta_id) & self.alive
+        self.alive &= ~rows
+        self._n_dead += rows.bit_count()
+        if self._n_dead > len(self):
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        # Demasiadas linhas mortas: volta a indexar as fichas atuais
+        sources = list(self.sources.values())
+        self.__init__()
+        for src in sources:
+            if isinstance(src, StoredTA):
+                self.add_stored(src)
+            else:
+                self.add_ta(src)
+
+    # --- Consultas ---
+
+    def where(self, **conditions: Condition) -> int:
+        """
+        Máscara das linhas que cumprem todas as condições (coluna=valor, coluna=(v1, v2),
+        coluna=lambda v: ...). Combina-se com & e |; ~ deve ser seguido de & bank.alive.
+        """
+        mask = self.alive
+        for name, cond in conditions.items():
+            try:
+                col = self.columns[name]
+            except KeyError:
+                raise ValueError(f"Coluna desconhecida: {name!r} (disponíveis: {', '.join(COLUMNS)})")
+            mask &= col.mask(cond)
+            if not mask:
+                break
+        return mask
+
+    def count(self, mask: Optional[int] = None) -> int:
+        return (self.alive if mask is None else mask & self.alive).bit_count()
+
+    def group_count(self, column: str, mask: Optional[int] = None) -> Dict[Any, int]:
+        """Número de linhas por valor da coluna (só valores com pelo menos uma linha)."""
+        mask = self.alive if mask is None else mask & self.alive
+        col = self.columns[column]
+        out = {}
+        for code, value in enumerate(col.values):
+            n = (col.bitmap(code) & mask).bit_count()
+            if n:
+                out[value] = n
+        return out
+
+    def sum_points(self, mask: Optional[int] = None) -> float:
+        return sum((v or 0) * n for v, n in self.group_count("points", mask).items())
+
+    def aggregate(self, column: str, mask: Optional[int] = None) -> Dict[Any, Tuple[int, float]]:
+        """Por valor da coluna: (nº de questões, soma dos pontos)."""
+        mask = self.alive if mask is None else mask & self.alive
+        col = self.columns[column]
+        out = {}
+        for code, value in enumerate(col.values):
+            sub = col.bitmap(code) & mask
+            if sub:
+                out[value] = (sub.bit_count(), self.sum_points(sub))
+        return out
+
+    def value(self, column: str, row: int) -> Any:
+        col = self.columns[column]
+        return col.values[col.codes[row]]
+
+    def rows(self, mask: int, limit: Optional[int] = None) -> List[int]:
+        out = []
+        for row in iter_rows(mask & self.alive):
+            if limit is not None and len(out) >= limit:
+                break
+            out.append(row)
+        return out
+
+    def question(self, row: int) -> Question:
+        """Lê a questão da linha (da ficha em memória ou do ficheiro)."""
+        src = self.sources[self.value("ta_id", row)]
+        pos, qid = self.positions[row], self.qids[row]
+        if isinstance(src, StoredTA):
+            return src.question(pos)
+        questions = src.questions
+        if pos < len(questions) and questions[pos].qid == qid:
+            return questions[pos]
+        # A ficha mudou de ordem desde que foi indexada: procura pelo qid
+        for q in questions:
+            if q.qid == qid:
+                return q
+        raise KeyError(qid)
+
+    def questions(self, mask: int, limit: Optional[int] = None) -> List[Question]:
+        """Questões do resultado (só estas são lidas/descodificadas)."""
+        rows = self.rows(mask, limit)
+        # Fichas gravadas: uma leitura do ficheiro por ficha, não por questão
+        stored_rows: Dict[str, List[int]] = {}
+        for row in rows:
+            ta_id = self.value("ta_id", row)
+            if isinstance(self.sources[ta_id], StoredTA):
+                stored_rows.setdefault(ta_id, []).append(row)
+        found: Dict[int, Question] = {}
+        for ta_id, group in stored_rows.items():
+            qs = self.sources[ta_id].questions_at([self.positions[r] for r in group])
+            found.update(zip(group, qs))
+        return [found[row] if row in found else self.question(row) for row in rows]
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Consulta o banco de questões de uma pasta de fichas (.babta).")
+    parser.add_argument("input_dir", help="Pasta com as fichas (*.babta)")
+    parser.add_argument("--type", dest="moodle_type", help="Tipo Moodle (ex: cloze_mc)")
+    parser.add_argument("--section", help="Secção")
+    parser.add_argument("--level", dest="difficulty", help="Nível (ex: B1)")
+    parser.add_argument("--category", help="Categoria")
+    parser.add_argument("--min-points", type=float, help="Pontuação mínima")
+    parser.add_argument("--show", type=int, default=20, help="Questões a listar (default: 20)")
+    args = parser.parse_args(argv)
+
+    bank = QuestionBank()
+    n_fichas = bank.add_folder(args.input_dir)
+    conditions = {k: getattr(args, k) for k in ("moodle_type", "section", "difficulty", "category") if getattr(args, k)}
+    if args.min_points is not None:
+        conditions["points"] = lambda p: p >= args.min_points
+    mask = bank.where(**conditions)
+
+    for q in bank.questions(mask, limit=args.show):
+        print(f"[{q.qid}] {q.moodle_type:<18} {q.section:<14} {q.meta.difficulty:<3} {q.meta.points:>4} pts  {q.title or q.prompt[:60]}")
+    print(f"{bank.count(mask)} de {len(bank)} questões ({n_fichas} fichas), {bank.sum_points(mask):g} pontos")
+    for section, (n, pts) in sorted(bank.aggregate("section", mask).items()):
+        print(f"  {section}: {n} questões, {pts:g} pontos")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
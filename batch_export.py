@@ -0,0 +1,151 @@
+# batch_export.py
+# Exportação em lote (sem interface): valida e exporta muitas fichas em paralelo.
+#
+# Uso:
+#   python batch_export.py pasta_fichas/ -o pasta_xml/ --jobs 8 [--format gift]
+#
+# Cada ficha da pasta (*.babta gravada pela aplicação, com as edições do diário, ou *.json
+# gerado por serialization.save_ta_json) dá origem a um <nome>.xml (ou a extensão do formato
+# escolhido) na pasta de saída. O resultado é o mesmo qualquer que seja o número de processos.
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
+
+from serialization import load_ta_json  # noqa: E402
+from storage import EXTENSION  # noqa: E402
+from journal import read_ficha  # noqa: E402
+from validators import iter_validation  # noqa: E402
+from exporters import EXPORTERS, write_export  # noqa: E402
+
+
+@dataclass
+class BatchResult:
+    source: str
+    output: Optional[str]
+    n_questions: int
+    n_errors: int
+    n_warnings: int
+    failure: str = ""
+    n_skipped: int = 0
+    # True se a validação parou no primeiro erro (--fail-fast): as contagens são parciais
+    partial: bool = False
+
+
+# Extensões das fichas aceites na pasta de entrada
+FICHA_EXTENSIONS = (EXTENSION, ".json")
+
+
+def load_ficha(path: str):
+    """Lê uma ficha .babta (fotografia + diário da aplicação) ou .json."""
+    if path.endswith(EXTENSION):
+        return read_ficha(path)
+    return load_ta_json(path)
+
+
+def export_one(source: str, out_dir: str, force: bool = False, fmt: str = "moodlexml",
+               fail_fast: bool = False) -> BatchResult:
+    """Valida e exporta UMA ficha. Corre dentro de um processo do pool."""
+    try:
+        ta = load_ficha(source)
+    except (OSError, ValueError, TypeError) as e:
+        return BatchResult(source, None, 0, 0, 0, failure=f"Erro ao ler: {e}")
+
+    # Com fail_fast (e sem --force) a validação pára no primeiro ERRO: a ficha não vai ser
+    # exportada de qualquer forma, por isso não vale a pena percorrer o resto
+    stop_early = fail_fast and not force
+    issues = list(iter_validation(ta, fail_fast=stop_early))
+    n_errors = sum(1 for i in issues if i.level == "ERRO")
+    n_warnings = len(issues) - n_errors
+    if n_errors and not force:
+        return BatchResult(source, None, len(ta.questions), n_errors, n_warnings,
+                           failure="Ficha com erros (não exportada)", partial=stop_early)
+
+    stem = os.path.splitext(os.path.basename(source))[0]
+    output = os.path.join(out_dir, f"{stem}.{EXPORTERS[fmt].extension}")
+    # Escreve primeiro para um temporário para nunca deixar um ficheiro a meio
+    tmp = output + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8", newline="") as f:
+            skipped = write_export(ta, fmt, f)
+        os.replace(tmp, output)
+    except Exception as e:
+        # Uma ficha que falha a meio não deixa o temporário nem interrompe o resto do lote
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        return BatchResult(source, None, len(ta.questions), n_errors, n_warnings,
+                           failure=f"Erro ao exportar: {type(e).__name__}: {e}")
+    return BatchResult(source, output, len(ta.questions), n_errors, n_warnings, n_skipped=len(skipped))
+
+
+def find_fichas(in_dir: str) -> List[str]:
+    # Ordem alfabética: garante saída e relatório determinísticos
+    names = sorted(n for n in os.listdir(in_dir) if n.endswith(FICHA_EXTENSIONS))
+    return [os.path.join(in_dir, n) for n in names]
+
+
+def run_batch(sources: List[str], out_dir: str, jobs: int = 1, force: bool = False,
+              fmt: str = "moodlexml", fail_fast: bool = False) -> List[BatchResult]:
+    os.makedirs(out_dir, exist_ok=True)
+    if jobs <= 1:
+        return [export_one(s, out_dir, force, fmt, fail_fast) for s in sources]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        # map() devolve os resultados pela ordem de entrada, independentemente de quem acaba primeiro
+        n = len(sources)
+        return list(pool.map(export_one, sources, [out_dir] * n, [force] * n, [fmt] * n, [fail_fast] * n,
+                             chunksize=max(1, len(sources) // (jobs * 4))))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=f"Valida e exporta fichas BabeliUM ({EXTENSION} ou JSON) para MoodleXML/GIFT/Aiken em lote.")
+    parser.add_argument("input_dir", help=f"Pasta com as fichas (*{EXTENSION} gravadas pela aplicação ou *.json)")
+    parser.add_argument("-o", "--output-dir", default="xml_export", help="Pasta de saída (default: xml_export)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="Número de processos (default: nº de CPUs)")
+    parser.add_argument("-f", "--format", choices=list(EXPORTERS), default="moodlexml",
+                        help="Formato de saída (default: moodlexml)")
+    parser.add_argument("--fail-fast", action="store_true",
+                        help="Pára a validação de cada ficha no primeiro erro (mais rápido; contagens parciais)")
+    parser.add_argument("--force", action="store_true", help="Exporta mesmo fichas com erros de validação")
+    args = parser.parse_args(argv)
+
+    sources = find_fichas(args.input_dir)
+    if not sources:
+        print(f"Nenhuma ficha (*{EXTENSION} ou *.json) encontrada em {args.input_dir}")
+        return 1
+
+    t0 = time.perf_counter()
+    results = run_batch(sources, args.output_dir, jobs=args.jobs, force=args.force, fmt=args.format,
+                        fail_fast=args.fail_fast)
+    elapsed = max(time.perf_counter() - t0, 1e-9)
+
+    failed = [r for r in results if r.output is None]
+    for r in results:
+        status = "OK " if r.output else "FALHOU"
+        extra = f" — {r.failure}" if r.failure else ""
+        if r.n_skipped:
+            extra += f" — {r.n_skipped} ignoradas no formato {args.format}"
+        at_least = "≥" if r.partial else ""
+        print(f"[{status}] {os.path.basename(r.source)}: {r.n_questions} questões, "
+              f"{at_least}{r.n_errors} erros, {at_least}{r.n_warnings} avisos{extra}")
+
+    n_questions = sum(r.n_questions for r in results if r.output)
+    exported = len(results) - len(failed)
+    print()
+    print(f"Exportadas {exported}/{len(results)} fichas ({n_questions} questões) em {elapsed:.2f}s "
+          f"com {args.jobs} processo(s)")
+    print(f"Débito: {exported / elapsed:.1f} fichas/s, {n_questions / elapsed:.0f} questões/s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,4 @@
+# benchmarks/
+# Benchmarks dos caminhos críticos do BabeliUM. Cada ficheiro bench_*.py corre sozinho:
+#   python benchmarks/bench_core.py --sizes 100 1000 10000 --output bench_results.json
+# synthetic.py gera fichas sintéticas (reprodutíveis por seed) com todos os tipos de pergunta.
@@ -0,0 +1,123 @@
+# benchmarks/bench_app_reruns.py
+# Latência dos reruns reais do app.py (sem navegador, com streamlit.testing AppTest) com fichas
+# sintéticas de vários tamanhos em st.session_state.ta. Percorre os fluxos mais comuns:
+# rerun do editor de ficha, abrir o editor de questão, editar uma opção, guardar, mover uma
+# questão, abrir a exportação e voltar. Cada passo inclui os reruns que ele próprio pede
+# (st.rerun). Os resultados vão para um JSON, para comparar entre commits (ver bench_core.py).
+#
+# Uso:
+#   python benchmarks/bench_app_reruns.py                          # 100, 1k, 10k
+#   python benchmarks/bench_app_reruns.py --sizes 100 1000 -o app_results.json --repeat 5
+
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# As fichas guardadas durante o benchmark (diário, fotografias) ficam numa pasta temporária
+os.environ["BABELIUM_DATA_DIR"] = tempfile.mkdtemp(prefix="babelium_bench_")
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from bench_core import git_commit  # noqa: E402
+from synthetic import make_synthetic_ta  # noqa: E402
+
+DEFAULT_SIZES = [100, 1_000, 10_000]
+APP = os.path.join(ROOT, "app.py")
+STEPS = ("ficha_rerun", "abrir_editor", "editar_opcao", "guardar", "mover_questao", "abrir_exportar", "voltar_ficha")
+
+
+def timed_run(at: AppTest, action: Callable[[], object]) -> float:
+    t0 = time.perf_counter()
+    action()
+    elapsed = time.perf_counter() - t0
+    if at.exception:
+        raise RuntimeError(f"Exceção na aplicação: {at.exception[0].value}")
+    return elapsed
+
+
+def button(at: AppTest, label: str):
+    for b in at.button:
+        if b.label == label:
+            return b
+    raise KeyError(label)
+
+
+def flow(at: AppTest, qid: str, oid: str, k: int) -> Dict[str, float]:
+    """Uma volta pelos fluxos comuns; devolve os segundos de cada passo."""
+    times = {"ficha_rerun": timed_run(at, at.run)}
+    times["abrir_editor"] = timed_run(at, at.button(key=f"ed_c_{qid}").click().run)
+    times["editar_opcao"] = timed_run(at, at.text_input(key=f"t_mc_{oid}").input(f"Opção editada {k}").run)
+    times["guardar"] = timed_run(at, button(at, "💾 Guardar e Sair").click().run)
+    # A primeira questão da página passa para a segunda posição (e volta na volta seguinte)
+    first = at.session_state["ta"].questions[0].qid
+    times["mover_questao"] = timed_run(at, at.number_input(key=f"pos_{first}_0").set_value(2).run)
+    times["abrir_exportar"] = timed_run(at, button(at, "📦 Gerar MoodleXML Final").click().run)
+    times["voltar_ficha"] = timed_run(at, button(at, "🔙 Voltar ao Editor").click().run)
+    return times
+
+
+def bench_size(n: int, repeat: int, seed: int) -> Dict[str, Dict[str, float]]:
+    ta = make_synthetic_ta(n, seed=seed)
+    at = AppTest.from_file(APP, default_timeout=600)
+    at.session_state["ta"] = ta
+    at.run()
+    # Uma escolha múltipla com opções, entre as primeiras (as que aparecem na primeira página)
+    q = next(q for q in ta.questions[:10] if q.moodle_type.startswith("multichoice") and q.options)
+    oid = q.options[0].oid
+
+    samples: Dict[str, List[float]] = {step: [] for step in STEPS}
+    for k in range(repeat + 1):
+        for step, secs in flow(at, q.qid, oid, k).items():
+            samples[step].append(secs)
+
+    # A primeira volta conta à parte (caches de validação/exportação ainda vazias)
+    return {
+        step: {"first": secs[0], "median": statistics.median(secs[1:]), "min": min(secs[1:])}
+        for step, secs in samples.items()
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Latência dos reruns do app.py com fichas grandes (AppTest).")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3, help="Voltas medidas depois da primeira")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default="bench_app_results.json")
+    args = parser.parse_args(argv)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": dt.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "unit": "seconds",
+        "results": {},
+    }
+
+    print(f"{'questões':>10} | " + " | ".join(f"{step:>14}" for step in STEPS))
+    for n in args.sizes:
+        r = bench_size(n, args.repeat, args.seed)
+        report["results"][str(n)] = r
+        print(f"{n:>10} | " + " | ".join(f"{r[step]['median'] * 1000:>11.0f} ms" for step in STEPS))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nMedianas depois da primeira volta; resultados completos em {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+# benchmarks/bench_bank.py
+# Banco de questões colunar (bank.py) vs percorrer listas de Question: construção do índice
+# (fichas em memória e a partir de ficheiros .babta), consulta filtrada, agregação por secção
+# e leitura das questões do resultado. Confirma que os resultados coincidem.
+#
+# Uso: python benchmarks/bench_bank.py [--fichas 100] [--per-ficha 1000]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from bank import QuestionBank  # noqa: E402
+from storage import EXTENSION, save_ta  # noqa: E402
+from synthetic import make_synthetic_ta  # noqa: E402
+
+
+def best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def scan_query(fichas):
+    return [q for ta in fichas for q in ta.questions
+            if q.moodle_type == "cloze_mc" and q.section == "Gramática"
+            and q.meta.difficulty == "B1" and q.meta.points >= 2]
+
+
+def scan_aggregate(fichas):
+    counts, points = Counter(), Counter()
+    for ta in fichas:
+        for q in ta.questions:
+            counts[q.section] += 1
+            points[q.section] += q.meta.points
+    return {s: (counts[s], points[s]) for s in counts}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do banco de questões colunar.")
+    parser.add_argument("--fichas", type=int, default=100)
+    parser.add_argument("--per-ficha", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    fichas = []
+    for k in range(args.fichas):
+        ta = make_synthetic_ta(args.per_ficha, seed=k, name=f"Ficha {k}")
+        ta.ta_id = f"ta_{k:04d}"
+        fichas.append(ta)
+    n = args.fichas * args.per_ficha
+    print(f"{n} questões em {args.fichas} fichas")
+
+    def build():
+        bank = QuestionBank()
+        for ta in fichas:
+            bank.add_ta(ta)
+        return bank
+    t_build = best_of(build, 3)
+    bank = build()
+
+    def query():
+        return bank.where(moodle_type="cloze_mc", section="Gramática", difficulty="B1", points=lambda p: p >= 2)
+
+    expected = scan_query(fichas)
+    mask = query()
+    assert [q.qid for q in bank.questions(mask)] == [q.qid for q in expected]
+    assert bank.aggregate("section") == scan_aggregate(fichas)
+
+    t_scan = best_of(lambda: scan_query(fichas))
+    # A primeira consulta constrói os bitmaps dos valores usados (ficam em cache)
+    cold = build()
+    t0 = time.perf_counter()
+    cold.where(moodle_type="cloze_mc", section="Gramática", difficulty="B1", points=lambda p: p >= 2)
+    t_cold = time.perf_counter() - t0
+    t_query = best_of(query)
+    t_scan_agg = best_of(lambda: scan_aggregate(fichas))
+    t_agg = best_of(lambda: bank.aggregate("section"))
+    t_rows = best_of(lambda: bank.questions(mask))
+
+    print(f"{'construir índice (memória)':<32} {t_build * 1000:>8.0f} ms")
+    print(f"{'consulta: percorrer listas':<32} {t_scan * 1000:>8.1f} ms")
+    print(f"{'consulta: banco (1ª vez)':<32} {t_cold * 1000:>8.2f} ms")
+    print(f"{'consulta: banco colunar':<32} {t_query * 1000:>8.2f} ms  ({bank.count(mask)} resultados)")
+    print(f"{'agregação: percorrer listas':<32} {t_scan_agg * 1000:>8.1f} ms")
+    print(f"{'agregação: banco colunar':<32} {t_agg * 1000:>8.2f} ms")
+    print(f"{'ler questões do resultado':<32} {t_rows * 1000:>8.2f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for ta in fichas:
+            save_ta(ta, os.path.join(tmp, f"{ta.ta_id}{EXTENSION}"))
+
+        def build_stored():
+            stored_bank = QuestionBank()
+            stored_bank.add_folder(tmp)
+            return stored_bank
+        t_stored = best_of(build_stored, 3)
+        stored_bank = build_stored()
+        stored_mask = stored_bank.where(moodle_type="cloze_mc", section="Gramática", difficulty="B1", points=lambda p: p >= 2)
+        t_stored_rows = best_of(lambda: stored_bank.questions(stored_mask))
+        assert [q.qid for q in stored_bank.questions(stored_mask)] == [q.qid for q in expected]
+    print(f"{'construir índice (.babta)':<32} {t_stored * 1000:>8.0f} ms")
+    print(f"{'ler resultado do disco':<32} {t_stored_rows * 1000:>8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# benchmarks/bench_cloze.py
+# Textos de compreensão de leitura com centenas de lacunas: tempo de compilação do
+# enunciado e de export por número de lacunas (deve crescer de forma linear).
+#
+# Uso: python benchmarks/bench_cloze.py [n_lacunas ...]
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from cloze import compile_cloze  # noqa: E402
+from export import _question_xml  # noqa: E402
+from models import TA, Question, Blank  # noqa: E402
+
+
+def old_gap_scan(prompt, blanks):
+    # Algoritmo anterior: três varrimentos separados (contagem, split e concatenação com +=)
+    prompt.count("[ ]")
+    out = ""
+    for i, part in enumerate(prompt.split("[ ]")):
+        out += part
+        if i < len(blanks):
+            out += "{1:SHORTANSWER:=" + blanks[i].answers[0] + "}"
+    prompt.replace("[ ]", " `[ ________ ]` ")
+    return out
+
+
+def make_question(n_gaps):
+    # Varia o espaçamento das lacunas ("[ ]", "[]", "[  ]")
+    marks = ["[ ]", "[]", "[  ]"]
+    prompt = " ".join(f"Na linha {k}, o aluno {marks[k % 3]} (completar) o texto." for k in range(n_gaps))
+    q = Question(qid="q_cloze", ui_type="Texto com lacunas (Escrever)", moodle_type="cloze", prompt=prompt)
+    q.blanks = [Blank(f"b_{k}", f"L{k + 1}", [f"resposta{k}"]) for k in range(n_gaps)]
+    return q
+
+
+def best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(sizes):
+    ta = TA(ta_id="ta_bench")
+    print(f"{'lacunas':>8} | {'compilar':>10} | {'export':>10} | {'µs/lacuna':>10} | {'antigo':>10}")
+    for n in sizes:
+        q = make_question(n)
+
+        def cold_compile():
+            compile_cloze.cache_clear()
+            compile_cloze(q.prompt)
+
+        t_compile = best_of(cold_compile)
+        assert compile_cloze(q.prompt).gap_count == n
+        t_export = best_of(lambda: (compile_cloze.cache_clear(), _question_xml(q, ta, "Cat")))
+        q_old = make_question(n)
+        q_old.prompt = q_old.prompt.replace("[]", "[ ]").replace("[  ]", "[ ]")
+        t_old = best_of(lambda: old_gap_scan(q_old.prompt, q_old.blanks))
+        print(f"{n:>8} | {t_compile * 1000:>7.2f} ms | {t_export * 1000:>7.2f} ms | "
+              f"{t_export * 1e6 / n:>10.2f} | {t_old * 1000:>7.2f} ms")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [200, 400, 800, 1600, 3200])
@@ -0,0 +1,70 @@
+# benchmarks/bench_compact_export.py
+# Compara o export normal com o modo compacto (categorias agrupadas, sem indentação):
+# tamanho do ficheiro, tempo de geração e tempo de (re)importação, e confirma que os
+# dois ficheiros produzem o mesmo banco de questões.
+#
+# Uso: python benchmarks/bench_compact_export.py [n_questoes]
+
+import io
+import os
+import sys
+import time
+from collections import defaultdict
+from dataclasses import replace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from export import build_moodle_xml_stub, _question_xml  # noqa: E402
+from import_moodle import iter_moodle_questions  # noqa: E402
+from bench_export_memory import make_ta  # noqa: E402
+from models import TA  # noqa: E402
+
+_NO_TA = TA(ta_id="bench")
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def bank(xml: str):
+    # Banco "como o Moodle o vê": por categoria, a lista de questões (na ordem de importação)
+    by_cat = defaultdict(list)
+    for q in iter_moodle_questions(io.BytesIO(xml.encode("utf-8"))):
+        # As questões importadas são compactas (meta partilhado): substituir, não alterar
+        cat = q.meta.category
+        q.meta = replace(q.meta, category="")
+        by_cat[cat].append(_question_xml(q, _NO_TA, ""))
+    return dict(by_cat)
+
+
+def main(n: int):
+    ta = make_ta(n)
+    # Algumas questões com categoria própria, o resto na categoria por defeito da ficha
+    for i, q in enumerate(ta.questions):
+        if i % 10 == 0:
+            q.meta = replace(q.meta, category=f"Extra/Grupo {i % 3}")
+
+    normal, t_normal = timed(lambda: build_moodle_xml_stub(ta, cache=None))
+    compact, t_compact = timed(lambda: build_moodle_xml_stub(ta, cache=None, compact=True))
+    b_normal, ti_normal = timed(lambda: bank(normal))
+    b_compact, ti_compact = timed(lambda: bank(compact))
+    assert b_normal == b_compact, "O modo compacto não produz um banco equivalente!"
+
+    size_n, size_c = len(normal.encode("utf-8")), len(compact.encode("utf-8"))
+    marker = 'type="category"'
+    cats_n, cats_c = normal.count(marker), compact.count(marker)
+    print(f"{n} questões, {len(b_normal)} categorias (banco equivalente: sim)")
+    print(f"  {'':10} {'tamanho':>12} {'export':>10} {'import':>10} {'categorias':>11}")
+    print(f"  {'normal':10} {size_n / 1024:>9.0f} KB {t_normal * 1000:>7.0f} ms {ti_normal * 1000:>7.0f} ms "
+          f"{cats_n:>11}")
+    print(f"  {'compacto':10} {size_c / 1024:>9.0f} KB {t_compact * 1000:>7.0f} ms {ti_compact * 1000:>7.0f} ms "
+          f"{cats_c:>11}")
+    print(f"  redução de tamanho: {100 * (1 - size_c / size_n):.0f}%")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -0,0 +1,103 @@
+# benchmarks/bench_core.py
+# Tempos dos caminhos críticos (validação, estado, export, cópia de questões) para fichas
+# sintéticas de vários tamanhos. Os resultados vão para um JSON, para comparar entre commits.
+#
+# Uso:
+#   python benchmarks/bench_core.py                          # 100, 1k, 10k, 100k
+#   python benchmarks/bench_core.py --sizes 100 1000 -o results.json --repeat 5
+
+import argparse
+import copy
+import datetime as dt
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from synthetic import make_synthetic_ta  # noqa: E402
+from validators import ValidationCache, validate_ficha, update_ficha_status  # noqa: E402
+from export import build_moodle_xml_stub  # noqa: E402
+
+DEFAULT_SIZES = [100, 1_000, 10_000, 100_000]
+
+
+def best_of(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def bench_size(n: int, repeat: int, seed: int) -> Dict[str, float]:
+    ta = make_synthetic_ta(n, seed=seed)
+    issues = validate_ficha(ta, cache=None)
+    cache = ValidationCache(maxsize=n)
+    validate_ficha(ta, cache=cache)
+    # Uma amostra fixa de questões para a cópia (deepcopy de 100k questões seria só ruído)
+    sample = ta.questions[: min(n, 1_000)]
+
+    results = {
+        # Sem cache (comparável com os resultados anteriores à cache de validação) e com a cache
+        # já cheia (um rerun sem edições)
+        "validate_ficha": best_of(lambda: validate_ficha(ta, cache=None), repeat),
+        "validate_ficha_warm": best_of(lambda: validate_ficha(ta, cache=cache), repeat),
+        "update_ficha_status": best_of(lambda: update_ficha_status(ta, issues), repeat),
+        "build_moodle_xml_stub": best_of(lambda: build_moodle_xml_stub(ta, cache=None), repeat),
+        "deepcopy_question": best_of(lambda: [copy.deepcopy(q) for q in sample], repeat) / len(sample),
+    }
+    return results
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks dos caminhos críticos do BabeliUM.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3, help="Repetições (fica o melhor tempo)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default="bench_results.json")
+    args = parser.parse_args(argv)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": dt.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "unit": "seconds",
+        "results": {},
+    }
+
+    print(f"{'questões':>10} | {'validate':>10} | {'val. cache':>10} | {'status':>10} | {'export':>10} | {'deepcopy/q':>11}")
+    for n in args.sizes:
+        r = bench_size(n, args.repeat, args.seed)
+        report["results"][str(n)] = r
+        print(f"{n:>10} | {r['validate_ficha'] * 1000:>7.1f} ms | {r['validate_ficha_warm'] * 1000:>7.1f} ms | "
+              f"{r['update_ficha_status'] * 1000:>7.2f} ms | "
+              f"{r['build_moodle_xml_stub'] * 1000:>7.0f} ms | {r['deepcopy_question'] * 1e6:>8.1f} µs")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados em {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
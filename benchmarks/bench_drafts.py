@@ -0,0 +1,83 @@
+# benchmarks/bench_drafts.py
+# Rascunhos do editor: cópia integral (deepcopy ao abrir + deepcopy ao guardar, como antes) vs
+# rascunho com cópia na escrita (drafts.QuestionDraft). Cada ciclo simula abrir uma questão
+# Cloze grande, um "rerun" do editor (que reescreve todos os campos com os mesmos valores),
+# alterar uma lacuna e guardar. Confirma que a original fica intacta e o resultado é igual.
+#
+# Uso: python benchmarks/bench_drafts.py [--blanks 50 200 500]
+
+import argparse
+import copy
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from cache import question_fingerprint  # noqa: E402
+from drafts import QuestionDraft  # noqa: E402
+from models import Blank, Question, QuestionMeta, compact_question, thaw_question  # noqa: E402
+from synthetic import WORDS  # noqa: E402
+
+
+def big_cloze(n_blanks):
+    prompt = " ".join(f"{' '.join(WORDS[(k + j) % len(WORDS)] for j in range(12))} [ ]" for k in range(n_blanks))
+    blanks = [Blank(f"b_{k:04d}", f"L{k + 1}", [WORDS[k % len(WORDS)]], [WORDS[(k + 1) % len(WORDS)], WORDS[(k + 2) % len(WORDS)]])
+              for k in range(n_blanks)]
+    return compact_question(Question("q_big", "Texto com lacunas (Menu/Seleção)", "cloze_mc", prompt=prompt,
+                                     meta=QuestionMeta(points=2.0), blanks=blanks))
+
+
+def cycle_deepcopy(original, target):
+    q = thaw_question(copy.deepcopy(original))
+    for b in q.blanks:  # rerun: o editor reescreve cada campo
+        b.answers[0] = b.answers[0]
+        b.distractors = list(b.distractors)
+    q.meta.points = q.meta.points
+    q.blanks[target].answers[0] = "alterada"
+    return compact_question(copy.deepcopy(q))
+
+
+def cycle_cow(original, target):
+    draft = QuestionDraft(original)
+    q = draft.q
+    for i, b in enumerate(q.blanks):
+        draft.set_item("blanks", i, "distractors", list(b.distractors))
+    draft.set_meta("points", q.meta.points)
+    b = q.blanks[target]
+    draft.set_item("blanks", target, "answers", ["alterada", *b.answers[1:]])
+    return draft.commit()
+
+
+def best_of(fn, repeat=20):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark dos rascunhos do editor (deepcopy vs cópia na escrita).")
+    parser.add_argument("--blanks", type=int, nargs="+", default=[50, 200, 500])
+    args = parser.parse_args(argv)
+
+    print(f"{'lacunas':>8} | {'deepcopy':>10} | {'cópia na escrita':>16} | {'objetos novos':>13}")
+    for n in args.blanks:
+        original = big_cloze(n)
+        before = question_fingerprint(original)
+        target = n // 2
+        a, b = cycle_deepcopy(original, target), cycle_cow(original, target)
+        assert question_fingerprint(a) == question_fingerprint(b)
+        assert question_fingerprint(original) == before, "o rascunho alterou a questão guardada"
+        shared = sum(1 for x, y in zip(b.blanks, original.blanks) if x is y)
+        t_deep = best_of(lambda: cycle_deepcopy(original, target))
+        t_cow = best_of(lambda: cycle_cow(original, target))
+        print(f"{n:>8} | {t_deep * 1000:>7.2f} ms | {t_cow * 1000:>13.3f} ms | {n - shared:>6} de {n:<4}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# benchmarks/bench_duplicates.py
+# Índice de duplicados (MinHash/LSH): débito de indexação e de pesquisa, e quantos dos
+# quase-duplicados plantados são encontrados (uma palavra do enunciado alterada). A recolha é
+# contada só entre os pares cuja semelhança de Jaccard real está acima do limiar.
+#
+# Uso: python benchmarks/bench_duplicates.py [--sizes 10000 50000] [--dups 200]
+
+import argparse
+import copy
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from duplicates import DuplicateIndex, question_text, shingles  # noqa: E402
+from synthetic import WORDS, make_synthetic_ta  # noqa: E402
+
+
+def plant_duplicates(questions, n_dups, seed=0):
+    # Copia questões com enunciado longo e troca uma palavra; devolve as cópias e os pares esperados
+    rnd = random.Random(seed)
+    sources = [q for q in questions if len(q.prompt.split()) >= 20]
+    copies, pairs = [], []
+    for k, src in enumerate(rnd.sample(sources, min(n_dups, len(sources)))):
+        dup = copy.deepcopy(src)
+        dup.qid = f"dup_{k:06d}"
+        words = dup.prompt.split()
+        words[rnd.randrange(len(words))] = rnd.choice(WORDS)
+        dup.prompt = " ".join(words)
+        copies.append(dup)
+        pairs.append((src.qid, dup.qid))
+    return copies, pairs
+
+
+def jaccard(q1, q2):
+    a, b = shingles(question_text(q1)), shingles(question_text(q2))
+    return len(a & b) / len(a | b)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do índice de duplicados MinHash/LSH.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--dups", type=int, default=200, help="Quase-duplicados plantados por tamanho")
+    args = parser.parse_args(argv)
+
+    print(f"{'questões':>9} | {'indexar':>9} | {'µs/questão':>10} | {'pesquisar':>9} | {'encontrados':>11} | {'outros':>6}")
+    for n in args.sizes:
+        questions = make_synthetic_ta(n, seed=5).questions
+        copies, pairs = plant_duplicates(questions, args.dups)
+
+        index = DuplicateIndex()
+        t0 = time.perf_counter()
+        for q in questions:
+            index.add(q)
+        t_index = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        found = {dup.qid: {qid for qid, _ in index.query(dup)} for dup in copies}
+        t_query = time.perf_counter() - t0
+
+        by_qid = {q.qid: q for q in questions}
+        dup_by_qid = {q.qid: q for q in copies}
+        expected = [(src, dup) for src, dup in pairs if jaccard(by_qid[src], dup_by_qid[dup]) >= index.threshold]
+        hits = sum(1 for src, dup in expected if src in found[dup])
+        others = sum(len(f) for f in found.values()) - sum(1 for src, dup in pairs if src in found[dup])
+        print(f"{n:>9} | {t_index:>7.2f} s | {t_index * 1e6 / n:>10.0f} | {t_query * 1000:>6.0f} ms | "
+              f"{hits:>5}/{len(expected):<5} | {others:>6}")
+
+
+if __name__ == "__main__":
+    main()
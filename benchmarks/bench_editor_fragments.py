@@ -0,0 +1,117 @@
+# benchmarks/bench_editor_fragments.py
+# Editor de questão: rerun da página inteira (o que cada tecla/caixa custava antes dos
+# fragmentos, e o que ainda custa um rerun completo) vs rerun só de um bloco
+# (question_editor.py), numa questão de associação com 100 pares e num Cloze com 150 lacunas.
+#
+# Corre a aplicação sem navegador (streamlit.testing AppTest). O AppTest corre sempre o script
+# inteiro, por isso o rerun de um fragmento é medido correndo um script que só chama esse bloco
+# (é o código que um rerun do fragmento executa); o custo fixo do AppTest entra nos dois lados.
+# Cada medida altera um widget do bloco das respostas antes de correr.
+#
+# Uso: python benchmarks/bench_editor_fragments.py [--pairs 100] [--gaps 150] [--repeat 5]
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+os.environ.setdefault("BABELIUM_DATA_DIR", tempfile.mkdtemp(prefix="babelium_bench_"))
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from drafts import QuestionDraft  # noqa: E402
+from models import TA, TYPE_TO_LABEL, Blank, MatchPair, Question, QuestionMeta, compact_question  # noqa: E402
+from synthetic import WORDS  # noqa: E402
+
+BLOCK_SCRIPT = """
+import sys
+sys.path.insert(0, {root!r})
+import streamlit as st
+from question_editor import {block}
+{block}(st.session_state.draft_q)
+"""
+
+
+def matching_question(n_pairs):
+    pairs = [MatchPair(f"p_{k:04d}", f"{WORDS[k % len(WORDS)]} {k}", WORDS[(k + 3) % len(WORDS)]) for k in range(n_pairs)]
+    return compact_question(Question("q_match", TYPE_TO_LABEL["matching"], "matching", title="Associação grande",
+                                     prompt="Associe as palavras:", meta=QuestionMeta(points=2.0), pairs=pairs))
+
+
+def cloze_question(n_gaps):
+    prompt = " ".join(f"{WORDS[k % len(WORDS)]} {WORDS[(k + 1) % len(WORDS)]} [ ]" for k in range(n_gaps))
+    blanks = [Blank(f"b_{k:04d}", f"L{k + 1}", [WORDS[(k + 2) % len(WORDS)]], []) for k in range(n_gaps)]
+    return compact_question(Question("q_cloze", TYPE_TO_LABEL["cloze"], "cloze", title="Cloze grande",
+                                     prompt=prompt, meta=QuestionMeta(points=2.0), blanks=blanks))
+
+
+def answer_input(at, q):
+    # Um campo do bloco das respostas (o do meio)
+    key = f"pl_{q.pairs[len(q.pairs) // 2].pid}" if q.moodle_type == "matching" else f"ans_{q.blanks[len(q.blanks) // 2].bid}"
+    return at.text_input(key=key)
+
+
+def timed_reruns(at, q, repeat):
+    times = []
+    for k in range(repeat):
+        answer_input(at, q).input(f"valor {k}")
+        t0 = time.perf_counter()
+        at.run()
+        times.append(time.perf_counter() - t0)
+        assert not at.exception, at.exception
+    return times
+
+
+def full_page(q, repeat):
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120)
+    ta = TA(ta_id="ta_bench", ta_name="Bench")
+    ta.questions.append(q)
+    at.session_state["ta"] = ta
+    at.session_state["active_view"] = "Editor de Questão"
+    at.session_state["active_qid"] = q.qid
+    at.run()
+    return timed_reruns(at, q, repeat)
+
+
+def block_only(q, block, repeat):
+    at = AppTest.from_string(BLOCK_SCRIPT.format(root=ROOT, block=block), default_timeout=120)
+    at.session_state["draft_q"] = QuestionDraft(q)
+    at.run()
+    if block != "render_answers":
+        t = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            at.run()
+            t.append(time.perf_counter() - t0)
+        return t
+    return timed_reruns(at, q, repeat)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark dos fragmentos do editor de questão.")
+    parser.add_argument("--pairs", type=int, default=100)
+    parser.add_argument("--gaps", type=int, default=150)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    cases = [(f"associação, {args.pairs} pares", matching_question(args.pairs)),
+             (f"cloze, {args.gaps} lacunas", cloze_question(args.gaps))]
+    print(f"{'questão':<24} {'rerun':<30} {'mediana (ms)':>13} {'mín (ms)':>9}")
+    for label, q in cases:
+        rows = [("página inteira (antes)", full_page(q, args.repeat)),
+                ("fragmento: respostas", block_only(q, "render_answers", args.repeat)),
+                ("fragmento: pré-visualização", block_only(q, "render_preview", args.repeat)),
+                ("fragmento: enunciado", block_only(q, "render_prompt", args.repeat)),
+                ("fragmento: configurações", block_only(q, "render_settings", args.repeat))]
+        for name, times in rows:
+            print(f"{label:<24} {name:<30} {statistics.median(times) * 1e3:>13.1f} {min(times) * 1e3:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
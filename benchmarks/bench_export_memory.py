@@ -0,0 +1,58 @@
+# benchmarks/bench_export_memory.py
+# Compara o pico de memória de build_moodle_xml_stub (string inteira) com
+# write_moodle_xml (streaming) à medida que o número de questões cresce.
+#
+# Uso: python benchmarks/bench_export_memory.py [n1 n2 ...]
+
+import sys
+import os
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from models import TA  # noqa: E402
+from synthetic import make_synthetic_ta  # noqa: E402
+from export import build_moodle_xml_stub, write_moodle_xml  # noqa: E402
+
+
+class NullSink:
+    """Destino de escrita que só conta bytes (simula um ficheiro/resposta HTTP)."""
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, chunk):
+        self.size += len(chunk)
+
+
+def make_ta(n: int) -> TA:
+    return make_synthetic_ta(n, seed=1, name="Ficha Benchmark")
+
+
+def measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def main(sizes):
+    print(f"{'questões':>10} | {'build (pico)':>14} | {'stream (pico)':>14} | {'XML':>12} | {'build s':>8} | {'stream s':>8}")
+    for n in sizes:
+        ta = make_ta(n)
+        sink = NullSink()
+        peak_build, t_build = measure(lambda: build_moodle_xml_stub(ta, cache=None))
+        peak_stream, t_stream = measure(lambda: write_moodle_xml(ta, sink))
+        print(f"{n:>10} | {peak_build / 1024:>11.0f} KB | {peak_stream / 1024:>11.0f} KB | "
+              f"{sink.size / 1024:>9.0f} KB | {t_build:>8.3f} | {t_stream:>8.3f}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]] or [1_000, 5_000, 20_000]
+    main(args)
@@ -0,0 +1,79 @@
+# benchmarks/bench_export_view.py
+# Vista de exportação: gerar o ficheiro inteiro a cada rerun (como antes) vs cached_export
+# (exporters.py), que só gera quando a ficha muda. Mede também o rerun depois de uma edição,
+# o tamanho do que segue para o navegador (ficheiro inteiro na pré-visualização + download,
+# antes; uma página + download, agora) e a compressão gzip. Confirma que os bytes coincidem.
+#
+# Uso: python benchmarks/bench_export_view.py [--sizes 500 5000 20000] [--fmt moodlexml]
+
+import argparse
+import copy
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from cache import LRUCache  # noqa: E402
+from exporters import cached_export, export_text  # noqa: E402
+from synthetic import make_synthetic_ta  # noqa: E402
+
+PREVIEW_LINES = 300
+
+
+def best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def rerun_before(ta, fmt):
+    output, _ = export_text(ta, fmt)
+    # Pré-visualização (st.code, mesmo com o expander fechado) + download
+    return len(output.encode("utf-8")) * 2
+
+
+def rerun_after(ta, fmt, cache):
+    result = cached_export(ta, fmt, cache=cache)
+    return len(result.data) + len(result.lines(0, PREVIEW_LINES).encode("utf-8"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark da vista de exportação em cache.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 5000, 20000])
+    parser.add_argument("--fmt", default="moodlexml")
+    args = parser.parse_args(argv)
+
+    print(f"{'questões':>9} {'antes (ms)':>11} {'cache (ms)':>11} {'após edição (ms)':>17} "
+          f"{'enviado antes':>14} {'enviado agora':>14} {'gzip':>10}")
+    for n in args.sizes:
+        ta = make_synthetic_ta(n, seed=n)
+        cache = LRUCache(maxsize=4)
+        t_before = best_of(lambda: rerun_before(ta, args.fmt), repeat=3)
+        sent_before = rerun_before(ta, args.fmt)
+        cached_export(ta, args.fmt, cache=cache)
+        t_cached = best_of(lambda: rerun_after(ta, args.fmt, cache))
+        sent_after = rerun_after(ta, args.fmt, cache)
+
+        # Uma edição (substituir uma questão) gera de novo, com os fragmentos das restantes em cache
+        def edit_and_rerun():
+            q = copy.copy(ta.questions[n // 2])
+            q.title += "."
+            ta.questions[n // 2] = q
+            return rerun_after(ta, args.fmt, cache)
+        t_edit = best_of(edit_and_rerun, repeat=3)
+
+        result = cached_export(ta, args.fmt, cache=cache)
+        assert result.data == export_text(ta, args.fmt)[0].encode("utf-8")
+        gz = len(result.gzipped())
+        print(f"{n:>9} {t_before * 1e3:>11.1f} {t_cached * 1e3:>11.3f} {t_edit * 1e3:>17.1f} "
+              f"{sent_before / 1024:>11.0f} KB {sent_after / 1024:>11.0f} KB {gz / 1024:>7.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
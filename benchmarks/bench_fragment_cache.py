@@ -0,0 +1,58 @@
+# benchmarks/bench_fragment_cache.py
+# Mede o tempo de reexportar uma ficha depois de editar UMA questão,
+# com e sem a cache de fragmentos XML.
+#
+# Uso: python benchmarks/bench_fragment_cache.py [n_questoes]
+
+import copy
+import sys
+import os
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from models import Blank  # noqa: E402
+from export import FragmentCache, build_moodle_xml_stub  # noqa: E402
+from bench_export_memory import make_ta  # noqa: E402
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def make_heavy_ta(n: int):
+    # Igual a make_ta, mas as questões Cloze são textos de leitura longos (40 lacunas)
+    ta = make_ta(n)
+    for i, q in enumerate(ta.questions):
+        if q.moodle_type == "cloze":
+            q.prompt = " ".join(f"Frase {k} do texto de leitura com uma lacuna [ ] aqui." for k in range(40))
+            q.blanks = [Blank(f"b_{i}_{k}", f"L{k + 1}", [f"resposta{k}"], []) for k in range(40)]
+    return ta
+
+
+def main(n: int):
+    ta = make_heavy_ta(n)
+    cache = FragmentCache(maxsize=max(n, 1) * 2)
+
+    _, t_nocache = timed(lambda: build_moodle_xml_stub(ta, cache=None))
+    _, t_cold = timed(lambda: build_moodle_xml_stub(ta, cache=cache))
+
+    # Edita uma única questão (como o editor: uma cópia nova substitui a guardada) e volta a exportar
+    q = copy.copy(ta.questions[n // 2])
+    q.prompt += " (editado)"
+    ta.questions[n // 2] = q
+    xml, t_warm = timed(lambda: build_moodle_xml_stub(ta, cache=cache))
+
+    assert xml == build_moodle_xml_stub(ta, cache=None)
+    print(f"{n} questões")
+    print(f"  sem cache:              {t_nocache * 1000:8.1f} ms")
+    print(f"  cache fria:             {t_cold * 1000:8.1f} ms")
+    print(f"  após 1 edição (quente): {t_warm * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000)
@@ -0,0 +1,100 @@
+# benchmarks/bench_journal.py
+# Diário de edições (journal.py): latência de cada registo (com e sem fsync) e tempo de
+# recuperação (fotografia + repetição do diário) para fichas com dezenas de milhares de edições,
+# sem compactação e com compactação periódica. Confirma que a ficha recuperada é igual à
+# que estava em memória.
+#
+# Uso: python benchmarks/bench_journal.py [--questions 2000] [--edits 20000 50000]
+
+import argparse
+import copy
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from cache import question_fingerprint  # noqa: E402
+from drafts import QuestionDraft  # noqa: E402
+from journal import Journal, snapshot_path  # noqa: E402
+from synthetic import make_synthetic_ta  # noqa: E402
+
+
+def run_edits(journal, n_edits, seed):
+    # Mistura parecida com o uso real: sobretudo updates, alguns create/move/delete/header
+    rnd = random.Random(seed)
+    ta = journal.ta
+    pool = make_synthetic_ta(max(10, n_edits // 10), seed=seed + 1).questions
+    latencies = []
+    for k in range(n_edits):
+        r = rnd.random()
+        t0 = time.perf_counter()
+        if r < 0.75 and len(ta.questions):
+            i = rnd.randrange(len(ta.questions))
+            old = ta.questions[i]
+            draft = QuestionDraft(old)
+            draft.q.prompt = f"{old.prompt[:200]} (edição {k})"
+            if rnd.random() < 0.3:
+                draft.set_meta("points", rnd.choice([0.5, 1.0, 2.0]))
+            new = ta.questions[i] = draft.commit()
+            journal.log_update(old, new)
+        elif r < 0.85:
+            q = copy.copy(pool[k % len(pool)])
+            q.qid = f"q_new_{k:06d}"
+            pos = rnd.randrange(len(ta.questions) + 1)
+            ta.questions.insert(pos, q)
+            journal.log_create(pos, q)
+        elif r < 0.93 and len(ta.questions) > 1:
+            i, j = rnd.randrange(len(ta.questions)), rnd.randrange(len(ta.questions))
+            q = ta.questions.pop(i)
+            ta.questions.insert(j, q)
+            journal.log_move(q.qid, j)
+        elif r < 0.97 and len(ta.questions) > 1:
+            q = ta.questions.pop(rnd.randrange(len(ta.questions)))
+            journal.log_delete(q.qid)
+        else:
+            ta.ta_name = f"Ficha (versão {k})"
+            journal.log_header()
+        latencies.append(time.perf_counter() - t0)
+    return latencies
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do diário de edições.")
+    parser.add_argument("--questions", type=int, default=2000)
+    parser.add_argument("--edits", type=int, nargs="+", default=[20000, 50000])
+    args = parser.parse_args(argv)
+
+    print(f"{'edições':>8} | {'fsync':<5} | {'compactar a cada':>16} | {'registo p50':>11} | {'p99':>8} | "
+          f"{'diário':>8} | {'recuperar':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.edits:
+            for fsync, every in ((True, 10 ** 9), (True, 3000), (False, 3000)):
+                ta = make_synthetic_ta(args.questions, seed=3)
+                ta.ta_id = f"ta_{n}_{int(fsync)}_{every}"
+                journal = Journal.for_ta(tmp, ta, fsync=fsync, compact_every=every)
+                journal.compact()
+                latencies = run_edits(journal, n, seed=n)
+                journal.close()
+                size = os.path.getsize(journal.path)
+
+                t0 = time.perf_counter()
+                recovered = Journal.recover(snapshot_path(tmp, ta.ta_id)).ta
+                t_recover = time.perf_counter() - t0
+                assert recovered.ta_name == ta.ta_name
+                assert [question_fingerprint(q) for q in recovered.questions] == \
+                       [question_fingerprint(q) for q in ta.questions], "a ficha recuperada é diferente"
+
+                q = statistics.quantiles(latencies, n=100)
+                label = "nunca" if every >= 10 ** 9 else str(every)
+                print(f"{n:>8} | {'sim' if fsync else 'não':<5} | {label:>16} | {q[49] * 1e6:>8.0f} µs | "
+                      f"{q[98] * 1e3:>5.1f} ms | {size / 1e6:>5.1f} MB | {t_recover * 1000:>6.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# benchmarks/bench_listing.py
+# Lista de questões do editor de ficha: preparar todas as linhas (como antes, uma por questão)
+# vs só a página visível (listing.py), sem filtros e com filtros de secção, texto e estado,
+# em fichas em memória e abertas de um .babta (LazyQuestionList). Mede só o trabalho em Python
+# de cada rerun; o custo de desenhar cada linha no Streamlit (muito maior) também passa a ser
+# proporcional à página e não à ficha.
+#
+# Uso: python benchmarks/bench_listing.py [--sizes 500 5000 50000] [--page-size 25]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from listing import ListFilter, filter_positions, list_facets, page_of  # noqa: E402
+from storage import load_ta, save_ta  # noqa: E402
+from synthetic import make_synthetic_ta  # noqa: E402
+
+
+def best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def row(idx, q):
+    # O que a vista calcula para cada linha desenhada
+    titulo = q.title if q.title.strip() else f"(Sem título - {idx+1})"
+    clean_text = q.prompt.replace("\n", " ")
+    return f"{idx+1}. {titulo}", clean_text[:150]
+
+
+def all_rows(ta):
+    return [row(idx, q) for idx, q in enumerate(ta.questions)]
+
+
+def page_rows(ta, flt, page_size):
+    if flt.active():
+        # Com os filtros visíveis, a vista lista também os tipos e secções da ficha
+        list_facets(ta.questions)
+    positions = filter_positions(ta.questions, flt)
+    visible, _, _ = page_of(positions, 0, page_size)
+    return [row(idx, ta.questions[idx]) for idx in visible]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark da lista paginada do editor de ficha.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 5000, 50000])
+    parser.add_argument("--page-size", type=int, default=25)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'questões':>9} {'lista':<8} {'filtro':<10} {'todas (ms)':>11} {'página (ms)':>12} {'lidas':>7}")
+        for n in args.sizes:
+            ta = make_synthetic_ta(n, seed=n)
+            path = os.path.join(tmp, f"f{n}.babta")
+            save_ta(ta, path)
+            section = ta.questions[n // 2].section
+            word = ta.questions[n // 2].prompt.split()[0]
+            filters = {
+                "nenhum": ListFilter(),
+                "secção": ListFilter(sections=(section,)),
+                "texto": ListFilter(text=word),
+                "estado": ListFilter(status="Com erros"),
+            }
+            for kind in ("memória", "babta"):
+                for label, flt in filters.items():
+                    if kind == "memória":
+                        t_all = best_of(lambda: all_rows(ta))
+                        t_page = best_of(lambda: page_rows(ta, flt, args.page_size))
+                        loaded = "-"
+                    else:
+                        t_all = best_of(lambda: all_rows(load_ta(path)), repeat=3)
+                        # Cada repetição abre a ficha de novo: conta só o que o filtro descodifica
+                        fichas = [load_ta(path) for _ in range(3)]
+                        it = iter(fichas)
+                        t_page = best_of(lambda: page_rows(next(it), flt, args.page_size), repeat=3)
+                        loaded = fichas[-1].questions.n_loaded
+                    print(f"{n:>9} {kind:<8} {label:<10} {t_all * 1e3:>11.2f} {t_page * 1e3:>12.2f} {loaded:>7}")
+
+            # Os resultados paginados coincidem com o filtro feito à mão
+            expected = [i for i, q in enumerate(ta.questions) if q.section == section]
+            assert list(filter_positions(ta.questions, filters["secção"])) == expected
+            assert list(filter_positions(load_ta(path).questions, filters["secção"])) == expected
+
+
+if __name__ == "__main__":
+    main()
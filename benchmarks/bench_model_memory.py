@@ -0,0 +1,98 @@
+# benchmarks/bench_model_memory.py
+# Memória ocupada por questão (tracemalloc), por tipo, em três representações:
+#   legado    - dataclasses com __dict__, listas próprias, strings repetidas (como antes)
+#   slots     - os dataclasses atuais (slots + strings de baixa cardinalidade internadas)
+#   compacta  - slots + compact_question (listas vazias e metas partilhados)
+# As questões são lidas de JSON, como ao abrir uma ficha guardada, para que cada string seja
+# um objeto novo (e não partilhado com o gerador sintético).
+#
+# Uso: python benchmarks/bench_model_memory.py [n_por_tipo]
+
+import gc
+import json
+import os
+import sys
+import tracemalloc
+from dataclasses import MISSING, field, fields, make_dataclass
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import models  # noqa: E402
+from serialization import question_to_dict  # noqa: E402
+from synthetic import make_synthetic_ta  # noqa: E402
+
+MODEL_CLASSES = ("Blank", "ChoiceOption", "MatchPair", "QuestionMeta", "Question")
+
+
+def _legacy_class(cls):
+    # Mesmos campos e defaults, mas dataclass "normal" (com __dict__ e sem internar strings)
+    spec = []
+    for f in fields(cls):
+        if f.default_factory is not MISSING:
+            spec.append((f.name, f.type, field(default_factory=f.default_factory)))
+        elif f.default is not MISSING:
+            spec.append((f.name, f.type, field(default=f.default)))
+        else:
+            spec.append((f.name, f.type))
+    return make_dataclass(cls.__name__ + "Legado", spec)
+
+
+LEGACY = {name: _legacy_class(getattr(models, name)) for name in MODEL_CLASSES}
+CURRENT = {name: getattr(models, name) for name in MODEL_CLASSES}
+
+
+def build(classes, data):
+    def make(name, d):
+        cls = classes[name]
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in d.items() if k in known})
+
+    q = make("Question", {k: v for k, v in data.items() if k not in ("meta", "blanks", "options", "pairs")})
+    q.meta = make("QuestionMeta", data["meta"])
+    q.blanks = [make("Blank", b) for b in data["blanks"]]
+    q.options = [make("ChoiceOption", o) for o in data["options"]]
+    q.pairs = [make("MatchPair", p) for p in data["pairs"]]
+    return q
+
+
+def measure(payloads, make_one):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [make_one(json.loads(p)) for p in payloads]
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(kept) == len(payloads)
+    return (after - before) / len(payloads)
+
+
+def main(n_per_type):
+    questions = make_synthetic_ta(n_per_type * 12, seed=11).questions
+    by_type = {}
+    for q in questions:
+        by_type.setdefault(q.moodle_type, [])
+        if len(by_type[q.moodle_type]) < n_per_type:
+            by_type[q.moodle_type].append(json.dumps(question_to_dict(q), ensure_ascii=False))
+
+    print(f"{'tipo':<20} | {'legado':>9} | {'slots':>9} | {'compacta':>9} | {'poupança':>8}")
+    totals = [0.0, 0.0, 0.0]
+    for mt in models.UI_TYPES.values():
+        payloads = by_type.get(mt, [])
+        if not payloads:
+            continue
+        legacy = measure(payloads, lambda d: build(LEGACY, d))
+        slots = measure(payloads, lambda d: build(CURRENT, d))
+        compact = measure(payloads, lambda d: models.compact_question(build(CURRENT, d)))
+        for k, v in enumerate((legacy, slots, compact)):
+            totals[k] += v
+        print(f"{mt:<20} | {legacy:>7.0f} B | {slots:>7.0f} B | {compact:>7.0f} B | {1 - compact / legacy:>7.0%}")
+    n_types = len(by_type)
+    legacy, slots, compact = (t / n_types for t in totals)
+    print(f"{'média':<20} | {legacy:>7.0f} B | {slots:>7.0f} B | {compact:>7.0f} B | {1 - compact / legacy:>7.0%}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
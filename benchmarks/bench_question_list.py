@@ -0,0 +1,107 @@
+# benchmarks/bench_question_list.py
+# QuestionList (models.py) vs lista simples procurada por qid, como fazia a aplicação:
+# procurar uma questão por qid, substituí-la ao guardar, apagá-la, movê-la para outra posição
+# (antes: uma troca com a vizinha por rerun) e ordenar a ficha por secção. Confirma que as duas
+# listas acabam com a mesma ordem.
+#
+# Uso: python benchmarks/bench_question_list.py [--sizes 500 5000 50000] [--ops 2000]
+
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from models import QuestionList  # noqa: E402
+from synthetic import make_synthetic_ta  # noqa: E402
+
+
+def best_of(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def scan_index(questions, qid):
+    for i, q in enumerate(questions):
+        if q.qid == qid:
+            return i
+    return None
+
+
+def edits_list(questions, plan):
+    questions = list(questions)
+    for kind, qid, to in plan:
+        i = scan_index(questions, qid)
+        if kind == "save":
+            questions[i] = questions[i]
+        elif kind == "move":
+            # Uma troca com a vizinha de cada vez, até chegar à posição
+            step = 1 if to > i else -1
+            while i != to:
+                questions[i], questions[i + step] = questions[i + step], questions[i]
+                i += step
+        elif kind == "delete":
+            q = questions.pop(i)
+            questions.append(q)
+    return questions
+
+
+def edits_indexed(questions, plan):
+    questions = QuestionList(questions)
+    for kind, qid, to in plan:
+        if kind == "save":
+            questions.replace(questions.get(qid))
+        elif kind == "move":
+            questions.move(qid, to)
+        elif kind == "delete":
+            q = questions.pop_qid(qid)
+            questions.append(q)
+    return questions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark da lista de questões indexada por qid.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 5000, 50000])
+    parser.add_argument("--ops", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    print(f"{'questões':>9} {'operação':<22} {'lista (ms)':>11} {'QuestionList (ms)':>18}")
+    for n in args.sizes:
+        ta = make_synthetic_ta(n, seed=n)
+        base = list(ta.questions)
+        rng = random.Random(n)
+        qids = [q.qid for q in base]
+
+        lookups = [rng.choice(qids) for _ in range(args.ops)]
+        indexed = QuestionList(base)
+        t_list = best_of(lambda: [scan_index(base, qid) for qid in lookups])
+        t_idx = best_of(lambda: [indexed.index_of(qid) for qid in lookups])
+        print(f"{n:>9} {'procurar por qid':<22} {t_list * 1e3:>11.2f} {t_idx * 1e3:>18.2f}")
+
+        # Edições misturadas: guardar (70%), mover para uma posição qualquer (20%), apagar (10%)
+        plan = []
+        for _ in range(args.ops // 10 if n > 5000 else args.ops):
+            r = rng.random()
+            kind = "save" if r < 0.7 else "move" if r < 0.9 else "delete"
+            plan.append((kind, rng.choice(qids), rng.randrange(n)))
+        t_list = best_of(lambda: edits_list(base, plan), repeat=1)
+        t_idx = best_of(lambda: edits_indexed(base, plan), repeat=1)
+        print(f"{n:>9} {f'{len(plan)} edições':<22} {t_list * 1e3:>11.2f} {t_idx * 1e3:>18.2f}")
+        assert [q.qid for q in edits_list(base, plan)] == edits_indexed(base, plan).qids()
+
+        key = lambda q: q.section  # noqa: E731
+        t_list = best_of(lambda: base.copy().sort(key=key))
+        t_idx = best_of(lambda: QuestionList(base).sort_by(key))
+        print(f"{n:>9} {'ordenar por secção':<22} {t_list * 1e3:>11.2f} {t_idx * 1e3:>18.2f}")
+
+
+if __name__ == "__main__":
+    main()
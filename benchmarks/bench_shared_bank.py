@@ -0,0 +1,101 @@
+# benchmarks/bench_shared_bank.py
+# Memória de N sessões a trabalhar sobre o mesmo banco de referência:
+#   cópias     - cada sessão lê o banco para a sua própria TA (o que acontecia antes)
+#   partilhado - um SharedTA por processo + uma OverlayQuestions por sessão (shared_bank.py)
+# Cada sessão simulada edita algumas questões (rascunho com cópia na escrita), acrescenta
+# questões e apaga uma. Confirma que cada sessão vê as suas alterações e que o banco fica intacto.
+#
+# Uso: python benchmarks/bench_shared_bank.py [--questions 1000] [--sessions 10 50 200]
+
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from cache import question_fingerprint  # noqa: E402
+from drafts import QuestionDraft  # noqa: E402
+from models import ChoiceOption, Question, compact_question  # noqa: E402
+from shared_bank import load_shared_ta, session_ta  # noqa: E402
+from storage import load_ta, save_ta  # noqa: E402
+from synthetic import make_synthetic_ta  # noqa: E402
+
+EDITS_PER_SESSION = 5
+ADDS_PER_SESSION = 2
+
+
+def simulate_edits(ta, seed):
+    rnd = random.Random(seed)
+    for i in rnd.sample(range(len(ta.questions)), EDITS_PER_SESSION):
+        draft = QuestionDraft(ta.questions[i])
+        draft.q.prompt = f"Editada na sessão {seed}: {draft.q.prompt}"
+        draft.set_meta("points", 2.5)
+        ta.questions[i] = draft.commit()
+    for k in range(ADDS_PER_SESSION):
+        ta.questions.append(compact_question(Question(
+            f"q_s{seed}_{k}", "Escolha múltipla (1 correta)", "multichoice_single", prompt=f"Nova {k}",
+            options=[ChoiceOption("o1", "sim", True), ChoiceOption("o2", "não")])))
+    del ta.questions[rnd.randrange(len(ta.questions))]
+
+
+def measure(make_sessions):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = make_sessions()
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used, sessions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memória de N sessões sobre o mesmo banco (cópias vs partilhado).")
+    parser.add_argument("--questions", type=int, default=1000)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[10, 50, 200])
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "banco.babta")
+        save_ta(make_synthetic_ta(args.questions, seed=8, name="Banco de referência"), path)
+
+        print(f"banco: {args.questions} questões; cada sessão edita {EDITS_PER_SESSION}, "
+              f"acrescenta {ADDS_PER_SESSION} e apaga 1")
+        print(f"{'sessões':>8} | {'cópias':>10} | {'partilhado':>10} | {'por sessão (cópias / partilhado)':>32}")
+        for n in args.sessions:
+            def copies():
+                out = []
+                for s in range(n):
+                    ta = load_ta(path, lazy=False)
+                    simulate_edits(ta, s)
+                    out.append(ta)
+                return out
+
+            def shared():
+                bank = load_shared_ta(path)
+                out = []
+                for s in range(n):
+                    ta = session_ta(bank)
+                    simulate_edits(ta, s)
+                    out.append(ta)
+                return bank, out
+
+            used_copies, copied = measure(copies)
+            used_shared, (bank, overlaid) = measure(shared)
+            # As duas versões têm de ver exatamente as mesmas questões
+            for a, b in zip(copied, overlaid):
+                assert [question_fingerprint(q) for q in a.questions] == [question_fingerprint(q) for q in b.questions]
+            assert not any(q.prompt.startswith("Editada") for q in bank.questions), "o banco partilhado foi alterado"
+            del copied, overlaid, bank
+            print(f"{n:>8} | {used_copies / 1e6:>7.1f} MB | {used_shared / 1e6:>7.1f} MB | "
+                  f"{used_copies / n / 1e3:>14.0f} kB / {used_shared / n / 1e3:.1f} kB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# benchmarks/bench_storage.py
+# Formato .babta (storage.py) vs JSON (serialization.py): gravar, listar (só cabeçalho), abrir
+# (cabeçalho + índice), ler uma questão, ler a ficha toda, e tamanho do ficheiro.
+# Confirma também que a ficha lida é igual à gravada.
+#
+# Uso: python benchmarks/bench_storage.py [--sizes 1000 10000] [--repeat 3]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import storage  # noqa: E402
+from cache import question_fingerprint  # noqa: E402
+from serialization import load_ta_json, save_ta_json  # noqa: E402
+from synthetic import make_synthetic_ta  # noqa: E402
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do formato de ficha em disco (.babta vs JSON).")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'questões':>9} | {'formato':<6} | {'gravar':>9} | {'listar':>9} | {'abrir':>9} | "
+          f"{'1 questão':>9} | {'ler tudo':>9} | {'tamanho':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            ta = make_synthetic_ta(n, seed=4)
+            bab = os.path.join(tmp, f"ficha_{n}{storage.EXTENSION}")
+            js = os.path.join(tmp, f"ficha_{n}.json")
+
+            t_save = best_of(lambda: storage.save_ta(ta, bab), args.repeat)
+            t_header = best_of(lambda: storage.read_header(bab), args.repeat)
+            t_open = best_of(lambda: storage.open_ta(bab), args.repeat)
+            stored = storage.open_ta(bab)
+            t_one = best_of(lambda: stored.question(n // 2), args.repeat)
+            t_full = best_of(lambda: storage.load_ta(bab, lazy=False), args.repeat)
+            loaded = storage.load_ta(bab, lazy=False)
+            assert [question_fingerprint(q) for q in loaded.questions] == [question_fingerprint(q) for q in ta.questions]
+            print(f"{n:>9} | {'babta':<6} | {t_save * 1000:>6.0f} ms | {t_header * 1000:>6.2f} ms | "
+                  f"{t_open * 1000:>6.1f} ms | {t_one * 1000:>6.2f} ms | {t_full * 1000:>6.0f} ms | "
+                  f"{os.path.getsize(bab) / 1e6:>5.1f} MB")
+
+            t_save = best_of(lambda: save_ta_json(ta, js), args.repeat)
+            t_full = best_of(lambda: load_ta_json(js), args.repeat)
+            # Sem índice, listar, abrir e ler uma questão obrigam a ler o ficheiro todo
+            print(f"{n:>9} | {'json':<6} | {t_save * 1000:>6.0f} ms | {t_full * 1000:>6.0f} ms | "
+                  f"{t_full * 1000:>6.0f} ms | {t_full * 1000:>6.0f} ms | {t_full * 1000:>6.0f} ms | "
+                  f"{os.path.getsize(js) / 1e6:>5.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
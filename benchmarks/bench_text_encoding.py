@@ -0,0 +1,106 @@
+# benchmarks/bench_text_encoding.py
+# Compara a antiga escape_xml (5 str.replace encadeados) com a camada text_encoding
+# (tradução numa só passagem + memorização) sobre todas as strings de um banco grande.
+# Antes de medir, confirma que as respostas Cloze com metacaracteres ("=z", "~z", "#z"...)
+# sobrevivem a exportar e voltar a importar (import_moodle.py) sem mudar de papel.
+#
+# Uso: python benchmarks/bench_text_encoding.py [n_questoes]
+
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import text_encoding  # noqa: E402
+from text_encoding import xml_text, cdata  # noqa: E402
+from bench_export_memory import make_ta  # noqa: E402
+from export import build_moodle_xml_stub  # noqa: E402
+from import_moodle import import_moodle_xml  # noqa: E402
+from models import TA, TYPE_TO_LABEL, Blank, Question  # noqa: E402
+
+# Respostas que começam (ou têm) metacaracteres da sintaxe Cloze
+CLOZE_TRICKY = ["=z", "~z", "#z", "a=b", "a~b#c", "50%", "x}y", "\\n", "a/b", 'dizer "olá"']
+
+
+def chained_escape_xml(s):
+    # Implementação anterior de utils.escape_xml
+    if s is None:
+        return ""
+    return (str(s).replace("&", "&amp;")
+            .replace("<", "&lt;")
+            .replace(">", "&gt;")
+            .replace('"', "&quot;")
+            .replace("'", "&apos;"))
+
+
+def chained_cdata(s):
+    # Anterior: f"<![CDATA[{s}]]>" (sem proteção contra "]]>")
+    return f"<![CDATA[{s}]]>"
+
+
+def bank_strings(n):
+    # As strings que o export escreve: nomes, enunciados, opções, pares e as respostas fixas V/F
+    ta = make_ta(n)
+    out = []
+    for q in ta.questions:
+        out.append(f"{ta.ta_name} - Questão {q.qid[:5]}")
+        out.append("$course$/" + "PLE A2/Tema 1/Ficha & Exercícios")
+        out.append(q.prompt)
+        for o in q.options:
+            out.append(o.text)
+            out.append("Verdadeiro" if o.is_correct else "Falso")
+        for p in q.pairs:
+            out.extend((p.left, p.right))
+        out.append("Muito bem! Reveja a matéria da <b>Unidade 3</b> se tiver dúvidas.")
+    return out
+
+
+def run(label, fn, strings, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for s in strings:
+            fn(s)
+        best = min(best, time.perf_counter() - t0)
+    print(f"  {label:38} {best * 1000:8.1f} ms")
+    return best
+
+
+def check_cloze_roundtrip():
+    # Um menu (cloze_mc) e uma resposta escrita (cloze) por resposta difícil: a certa e os
+    # distratores têm de voltar iguais e no mesmo papel
+    ta = TA(ta_id="ta_roundtrip", ta_name="Ida e volta")
+    for k, tricky in enumerate(CLOZE_TRICKY):
+        menu = Blank(f"b_mc_{k}", "L1", [tricky], [t for t in CLOZE_TRICKY if t != tricky])
+        ta.questions.append(Question(f"q_mc_{k}", TYPE_TO_LABEL["cloze_mc"], "cloze_mc", prompt="Escolha: [ ]", blanks=[menu]))
+        written = Blank(f"b_sa_{k}", "L1", [tricky], [])
+        ta.questions.append(Question(f"q_sa_{k}", TYPE_TO_LABEL["cloze"], "cloze", prompt="Escreva: [ ]", blanks=[written]))
+    xml = build_moodle_xml_stub(ta)
+    back = import_moodle_xml(io.BytesIO(xml.encode("utf-8")))
+    assert len(back.questions) == len(ta.questions)
+    for q, r in zip(ta.questions, back.questions):
+        expected = [(list(b.answers), list(b.distractors)) for b in q.blanks]
+        got = [(list(b.answers), list(b.distractors)) for b in r.blanks]
+        assert got == expected, f"{q.qid}: exportado {expected}, importado {got}"
+    print(f"ida e volta Cloze: {len(ta.questions)} questões iguais")
+
+
+def main(n):
+    check_cloze_roundtrip()
+    strings = bank_strings(n)
+    print(f"{len(strings)} strings ({n} questões)")
+    a = run("escape_xml encadeado (antigo)", chained_escape_xml, strings)
+    text_encoding.clear_memo()
+    b = run("xml_text (1 passagem + memo)", xml_text, strings)
+    run("CDATA antigo", chained_cdata, strings)
+    text_encoding.clear_memo()
+    run("cdata (seguro contra \"]]>\")", cdata, strings)
+    print(f"  ganho em texto XML: {a / b:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -0,0 +1,153 @@
+# benchmarks/bench_validation.py
+# Motor de regras de validação vs a antiga cadeia de if/elif (copiada abaixo como referência).
+# Confirma que os problemas encontrados são exatamente os mesmos e mede o tempo por questão,
+# sem cache e com a cache já quente. Com --timings, mostra o tempo de cada regra.
+#
+# Uso: python benchmarks/bench_validation.py [--sizes 1000 5000] [--timings regras.json]
+
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import validators  # noqa: E402
+from models import ValidationIssue  # noqa: E402
+from synthetic import make_synthetic_ta  # noqa: E402
+
+
+def legacy_validate(ta):
+    # Versão anterior de validate_ficha (uma só função, if/elif por moodle_type)
+    issues = []
+    if len(ta.questions) == 0:
+        issues.append(ValidationIssue("ERRO", "Ficha", "A ficha não tem questões. Adiciona pelo menos uma."))
+        return issues
+    if not ta.ta_name.strip():
+        issues.append(ValidationIssue("ERRO", "Ficha", "Nome da ficha em falta."))
+    for i, q in enumerate(ta.questions, start=1):
+        base_where = f"Questão {i}"
+        mt = q.moodle_type
+        if not q.prompt.strip():
+            issues.append(ValidationIssue("ERRO", base_where, "Enunciado em falta.", qid=q.qid, field_key="prompt"))
+        if mt != "description":
+            if q.meta.points is None or q.meta.points <= 0:
+                issues.append(ValidationIssue("ERRO", base_where, "Pontuação inválida (tem de ser > 0).", qid=q.qid, field_key="points"))
+        if mt == "description":
+            pass
+        elif mt == "cloze" or mt == "cloze_mc":
+            if len(q.blanks) < 1:
+                issues.append(ValidationIssue("ERRO", base_where, "Cloze sem lacunas. Use [ ] no texto.", qid=q.qid))
+            for b_idx, b in enumerate(q.blanks, start=1):
+                ans = [a.strip() for a in b.answers if a.strip()]
+                if not ans:
+                    issues.append(ValidationIssue("ERRO", f"{base_where} > Lacuna {b_idx}", "Lacuna sem resposta correta definida.", qid=q.qid))
+        elif mt.startswith("multichoice"):
+            opts_with_text = [o for o in q.options if o.text.strip()]
+            if len(opts_with_text) < 2:
+                issues.append(ValidationIssue("ERRO", base_where, "A questão precisa de pelo menos 2 opções com texto.", qid=q.qid))
+            marked_correct = [o for o in q.options if o.is_correct]
+            if not marked_correct:
+                issues.append(ValidationIssue("ERRO", base_where, "Nenhuma opção marcada como correta.", qid=q.qid))
+            else:
+                correct_with_text = [o for o in marked_correct if o.text.strip()]
+                if not correct_with_text:
+                    issues.append(ValidationIssue("ERRO", base_where, "A opção correta não tem texto.", qid=q.qid))
+                if mt == "multichoice_single" and len(marked_correct) > 1:
+                    issues.append(ValidationIssue("ERRO", base_where, "Neste tipo só pode haver 1 correta.", qid=q.qid))
+        elif mt == "truefalse":
+            valid_opts = [o for o in q.options if o.text.strip()]
+            if not valid_opts:
+                issues.append(ValidationIssue("ERRO", base_where, "Adicione pelo menos uma afirmação V/F.", qid=q.qid))
+        elif mt == "matching":
+            complete_pairs = [p for p in q.pairs if p.left.strip() and p.right.strip()]
+            if len(complete_pairs) < 2:
+                issues.append(ValidationIssue("ERRO", base_where, "Associação requer pelo menos 2 pares completos.", qid=q.qid))
+            rights = [p.right.strip() for p in complete_pairs]
+            if len(set(rights)) != len(rights):
+                issues.append(ValidationIssue("AVISO", base_where, "Há respostas (coluna B) repetidas. Confirma se é intencional.", qid=q.qid))
+        elif mt == "shortanswer":
+            ans = [a.strip() for a in q.accepted_answers if a.strip()]
+            if not ans:
+                issues.append(ValidationIssue("ERRO", base_where, "Indique pelo menos uma resposta aceite.", qid=q.qid))
+        elif mt == "essay":
+            if not q.rubric.strip():
+                issues.append(ValidationIssue("AVISO", base_where, "Sem rubrica/critério. (Recomendado)", qid=q.qid))
+    return issues
+
+
+def make_flawed_ta(n, seed=0):
+    # Ficha sintética com defeitos espalhados, para que todas as regras disparem
+    ta = make_synthetic_ta(n, seed=seed, name="Ficha Validação")
+    rnd = random.Random(seed)
+    for q in ta.questions:
+        if rnd.random() < 0.1:
+            q.prompt = "  "
+        if rnd.random() < 0.05:
+            q.meta.points = 0
+        for o in q.options:
+            if rnd.random() < 0.2:
+                o.text = " "
+            if rnd.random() < 0.2:
+                o.is_correct = not o.is_correct
+        for b in q.blanks:
+            if rnd.random() < 0.2:
+                b.answers = [" "]
+        for p in q.pairs:
+            if rnd.random() < 0.2:
+                p.right = "x"
+        if rnd.random() < 0.3:
+            q.accepted_answers = [""]
+        if rnd.random() < 0.3:
+            q.rubric = ""
+    return ta
+
+
+def best_of(fn, repeat=7):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do motor de regras de validação.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--timings", help="Escreve os tempos por regra (JSON) neste ficheiro")
+    args = parser.parse_args(argv)
+
+    print(f"{'questões':>9} | {'problemas':>9} | {'if/elif':>9} | {'regras':>9} | {'cache quente':>12}")
+    for n in args.sizes:
+        ta = make_flawed_ta(n)
+        expected = legacy_validate(ta)
+        assert validators.validate_ficha(ta, cache=None) == expected, "o motor de regras mudou o resultado"
+        t_legacy = best_of(lambda: legacy_validate(ta))
+        t_rules = best_of(lambda: validators.validate_ficha(ta, cache=None))
+        cache = validators.ValidationCache()
+        validators.validate_ficha(ta, cache=cache)
+        t_warm = best_of(lambda: validators.validate_ficha(ta, cache=cache))
+        print(f"{n:>9} | {len(expected):>9} | {t_legacy * 1000:>6.1f} ms | {t_rules * 1000:>6.1f} ms | "
+              f"{t_warm * 1000:>9.1f} ms")
+
+    validators.reset_rule_timings()
+    validators.enable_rule_timing(True)
+    validators.validate_ficha(make_flawed_ta(args.sizes[-1]), cache=None)
+    validators.enable_rule_timing(False)
+    print()
+    print(f"{'regra':<28} | {'chamadas':>8} | {'problemas':>9} | {'total':>9} | {'µs/chamada':>10}")
+    if args.timings:
+        with open(args.timings, "w", encoding="utf-8") as f:
+            rows = validators.dump_rule_timings(f)
+    else:
+        rows = validators.dump_rule_timings()
+    for r in rows:
+        print(f"{r['rule']:<28} | {r['calls']:>8} | {r['hits']:>9} | {r['total_ms']:>6.2f} ms | {r['us_per_call']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
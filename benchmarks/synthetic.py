@@ -0,0 +1,133 @@
+# benchmarks/synthetic.py
+# Gerador de fichas sintéticas, reprodutível (seed), com uma mistura realista dos nove UI_TYPES.
+
+import os
+import random
+import sys
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from models import TA, Question, QuestionList, QuestionMeta, Blank, ChoiceOption, MatchPair, UI_TYPES, TYPE_TO_LABEL  # noqa: E402
+
+# Peso relativo de cada tipo (aprox. a distribuição das fichas reais: muito cloze e escolha múltipla)
+TYPE_WEIGHTS: Dict[str, int] = {
+    "cloze": 20,
+    "cloze_mc": 12,
+    "multichoice_single": 18,
+    "multichoice_multi": 8,
+    "truefalse": 12,
+    "matching": 10,
+    "shortanswer": 8,
+    "essay": 6,
+    "description": 6,
+}
+assert set(TYPE_WEIGHTS) == set(UI_TYPES.values())
+
+SECTIONS = ["Gramática", "Vocabulário", "Compreensão", "Escrita", "Sem secção"]
+LEVELS = ["A1", "A2", "B1", "B2", "C1"]
+POINTS = [0.5, 1.0, 1.0, 1.5, 2.0, 3.0]
+
+WORDS = ("o gato bebe leite a menina escreve cartas ontem amanhã sempre nunca livro casa escola "
+         "professor aluno cidade Lisboa Braga Porto praia verão inverno comer beber viver falar "
+         "correr estudar trabalhar viajar ler ouvir música família amigo jantar comboio").split()
+VERBS = ["beber", "comer", "ir", "ser", "estar", "ter", "fazer", "dizer", "poder", "querer"]
+CAPITALS = [("Portugal", "Lisboa"), ("Espanha", "Madrid"), ("França", "Paris"), ("Itália", "Roma"),
+            ("Brasil", "Brasília"), ("Angola", "Luanda"), ("Moçambique", "Maputo"), ("Alemanha", "Berlim")]
+
+
+class _Gen:
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+
+    def id(self, prefix: str) -> str:
+        return f"{prefix}_{self.rng.getrandbits(40):010x}"
+
+    def sentence(self, lo: int = 6, hi: int = 14) -> str:
+        words = self.rng.choices(WORDS, k=self.rng.randint(lo, hi))
+        return " ".join(words).capitalize() + "."
+
+    def cloze_prompt(self, n_gaps: int) -> str:
+        parts = []
+        for _ in range(n_gaps):
+            parts.append(f"{self.sentence(3, 8)[:-1]} [ ] ({self.rng.choice(VERBS)})")
+        return ". ".join(parts) + "."
+
+    def question(self, moodle_type: str) -> Question:
+        rng = self.rng
+        q = Question(
+            qid=self.id("q"),
+            ui_type=TYPE_TO_LABEL[moodle_type],
+            moodle_type=moodle_type,
+            title=f"Q - {self.sentence(2, 4)}" if rng.random() < 0.6 else "",
+            section=rng.choice(SECTIONS),
+            meta=QuestionMeta(
+                category=rng.choice(["", "", "", "Banco/Comum"]),
+                difficulty=rng.choice(LEVELS),
+                points=rng.choice(POINTS),
+                feedback_general=self.sentence() if rng.random() < 0.25 else "",
+            ),
+        )
+
+        if moodle_type in ("cloze", "cloze_mc"):
+            # Maioria com poucas lacunas, algumas com textos de leitura longos
+            n_gaps = rng.choice([1, 2, 3, 4, 5]) if rng.random() < 0.9 else rng.randint(20, 60)
+            q.prompt = self.cloze_prompt(n_gaps)
+            for k in range(n_gaps):
+                dists = rng.sample(WORDS, 3) if moodle_type == "cloze_mc" else []
+                q.blanks.append(Blank(self.id("b"), f"L{k + 1}", [rng.choice(WORDS)], dists,
+                                      case_sensitive=rng.random() < 0.1))
+
+        elif moodle_type.startswith("multichoice"):
+            q.prompt = self.sentence() + " Escolha a opção correta:"
+            n = rng.randint(3, 5)
+            correct = {0} if moodle_type == "multichoice_single" else set(rng.sample(range(n), rng.randint(1, n - 1)))
+            q.options = [ChoiceOption(self.id("o"), self.sentence(2, 5), k in correct,
+                                      self.sentence(3, 6) if rng.random() < 0.2 else "") for k in range(n)]
+            q.shuffle_options = rng.random() < 0.8
+
+        elif moodle_type == "truefalse":
+            q.prompt = "Classifique as afirmações sobre o texto:"
+            if rng.random() < 0.2:
+                # V/F simples (uma só afirmação)
+                q.options = [ChoiceOption(self.id("o"), "Verdadeiro", rng.random() < 0.5)]
+            else:
+                # Matriz V/F (exportada como matching)
+                q.options = [ChoiceOption(self.id("o"), self.sentence(), rng.random() < 0.5)
+                             for _ in range(rng.randint(2, 8))]
+                q.tf_require_correction = rng.random() < 0.3
+
+        elif moodle_type == "matching":
+            q.prompt = "Associe os países às capitais:"
+            pairs = rng.sample(CAPITALS, rng.randint(2, 6))
+            q.pairs = [MatchPair(self.id("p"), left, right) for left, right in pairs]
+            q.distractors_right = rng.sample(["Londres", "Dublin", "Atenas", "Viena"], rng.randint(0, 2))
+
+        elif moodle_type == "shortanswer":
+            left, right = rng.choice(CAPITALS)
+            q.prompt = f"Qual é a capital de {left}?"
+            q.accepted_answers = [right, right.lower()]
+            q.sa_case_sensitive = rng.random() < 0.2
+
+        elif moodle_type == "essay":
+            q.prompt = "Escreva um texto sobre " + self.sentence(3, 6).lower()
+            q.rubric = self.sentence(8, 20) if rng.random() < 0.7 else ""
+            q.word_limit = rng.choice([None, 80, 150])
+
+        else:  # description
+            q.prompt = " ".join(self.sentence(10, 25) for _ in range(rng.randint(2, 6)))
+
+        return q
+
+
+def make_synthetic_ta(n_questions: int, seed: int = 0, name: str = "Ficha Sintética") -> TA:
+    """Ficha com `n_questions` questões de todos os tipos. A mesma seed dá sempre a mesma ficha."""
+    gen = _Gen(seed)
+    types: List[str] = list(TYPE_WEIGHTS)
+    weights = [TYPE_WEIGHTS[t] for t in types]
+    ta = TA(ta_id=gen.id("ta"), course="PLE B1", theme="Tema Sintético", ta_name=name,
+            created_at="2024-01-01T00:00:00")
+    ta.questions = QuestionList(gen.question(t) for t in gen.rng.choices(types, weights=weights, k=n_questions))
+    return ta
@@ -0,0 +1,131 @@
+# cache.py
+# Impressões digitais (fingerprints) de conteúdo e cache LRU limitada,
+# usadas para evitar regenerar trabalho (XML, validação...) de questões que não mudaram.
+import threading
+from collections import OrderedDict
+from dataclasses import fields, is_dataclass
+from operator import attrgetter
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, get_args, get_origin, get_type_hints
+
+# Para cada dataclass, uma função que extrai o conteúdo como tuplo (compilada uma vez por classe)
+_KEY_FUNCS: Dict[type, Callable[[Any], Tuple]] = {}
+
+
+def _compile_key_func(cls: type) -> Callable[[Any], Tuple]:
+    # Classifica os campos pelo tipo anotado: escalares, listas de escalares,
+    # listas de dataclasses (ex: List[Blank]) e dataclasses aninhados (ex: QuestionMeta).
+    # Todos os campos são lidos de uma vez com attrgetter (em C); depois só os compostos
+    # são convertidos, pela ordem dos campos.
+    hints = get_type_hints(cls)
+    names = [f.name for f in fields(cls)]
+    get_values = attrgetter(*names) if len(names) > 1 else (lambda o: (getattr(o, names[0]),))
+    converters: List[Tuple[int, Callable[[Any], Any]]] = []
+    for i, name in enumerate(names):
+        tp = hints.get(name, Any)
+        if get_origin(tp) is list:
+            elem = (get_args(tp) or (Any,))[0]
+            converters.append((i, _list_key_func(_key_func_for(elem)) if is_dataclass(elem) else tuple))
+        elif is_dataclass(tp):
+            converters.append((i, _key_func_for(tp)))
+
+    if not converters:
+        # Caso comum (ChoiceOption, MatchPair, QuestionMeta): tudo escalar, extração 100% em C
+        return get_values
+
+    def key(o: Any) -> Tuple:
+        values = list(get_values(o))
+        for i, convert in converters:
+            values[i] = convert(values[i])
+        return tuple(values)
+
+    return key
+
+
+def _list_key_func(item_key: Callable[[Any], Tuple]) -> Callable[[Any], Tuple]:
+    def key(items: Any) -> Tuple:
+        return tuple(map(item_key, items))
+    return key
+
+
+def _key_func_for(cls: type) -> Callable[[Any], Tuple]:
+    func = _KEY_FUNCS.get(cls)
+    if func is None:
+        func = _KEY_FUNCS[cls] = _compile_key_func(cls)
+    return func
+
+
+def content_key(obj: Any, cls: Optional[type] = None) -> Tuple:
+    """Tuplo imutável com o conteúdo completo de um dataclass (recursivo)."""
+    return _key_func_for(cls or type(obj))(obj)
+
+
+def question_fingerprint(q: Any) -> Tuple:
+    """
+    Impressão digital do conteúdo de uma questão (meta, blanks, options, pairs, ...).
+    Duas questões com o mesmo conteúdo têm o mesmo fingerprint, independentemente da identidade do objeto.
+
+    O resultado é um tuplo (e não um digest): é usado diretamente como chave de dicionário,
+    por isso uma colisão de hash nunca devolve o fragmento de outra questão.
+    As strings são partilhadas com a questão original, logo o custo em memória é pequeno.
+    """
+    return content_key(q)
+
+
+class LRUCache:
+    """
+    Cache com número máximo de entradas; ao encher, descarta a usada há mais tempo.
+
+    As caches globais (FRAGMENT_CACHE, VALIDATION_CACHE...) são partilhadas pelas threads de
+    todas as sessões Streamlit, por isso as operações que mexem na ordem são feitas sob um lock.
+    """
+
+    def __init__(self, maxsize: int = 10_000):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+
+_MISSING = object()
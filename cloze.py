@@ -0,0 +1,66 @@
+# cloze.py
+# "Compilador" de enunciados Cloze: parte o texto UMA vez em segmentos literais e lacunas.
+# O resultado (em cache por texto) serve o editor (contagem e sincronização das lacunas),
+# as pré-visualizações e o export MoodleXML.
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+import re
+
+# Uma lacuna é um par de parêntesis retos só com espaços lá dentro: "[ ]", "[]", "[   ]"...
+GAP_RE = re.compile(r"\[[ \t]*\]")
+
+# Marca canónica de lacuna (a que o botão "Inserir [ ]" escreve)
+GAP_MARK = "[ ]"
+
+
+class CompiledCloze:
+    """
+    Enunciado já partido: `literals` tem sempre gap_count + 1 segmentos de texto,
+    e a lacuna i fica entre literals[i] e literals[i + 1].
+    """
+
+    __slots__ = ("literals", "gap_count")
+
+    def __init__(self, literals: Tuple[str, ...]):
+        self.literals = literals
+        self.gap_count = len(literals) - 1
+
+    def render(self, fills: Sequence[str]) -> str:
+        """
+        Volta a juntar o texto, pondo fills[i] a seguir ao segmento i.
+        Lacunas sem preenchimento ficam vazias; um preenchimento a mais vai para o fim
+        (o mesmo comportamento que o export sempre teve).
+        """
+        pieces: List[str] = []
+        n_fills = len(fills)
+        for i, literal in enumerate(self.literals):
+            pieces.append(literal)
+            if i < n_fills:
+                pieces.append(fills[i])
+        return "".join(pieces)
+
+    def fill_all(self, mark: str) -> str:
+        """Substitui todas as lacunas pelo mesmo texto (usado nas pré-visualizações)."""
+        return mark.join(self.literals)
+
+
+@lru_cache(maxsize=4096)
+def compile_cloze(prompt: str) -> CompiledCloze:
+    """Parte o enunciado em segmentos/lacunas. Resultado em cache por texto (tempo linear)."""
+    return CompiledCloze(tuple(GAP_RE.split(prompt or "")))
+
+
+def count_gaps(text: str) -> int:
+    return compile_cloze(text).gap_count
+
+
+def sync_cloze_blanks(q, new_blank) -> None:
+    """
+    Ajusta q.blanks ao número de lacunas do enunciado: mantém as respostas já inseridas,
+    acrescenta lacunas novas com new_blank(índice) e corta as que sobram.
+    """
+    n = count_gaps(q.prompt)
+    if len(q.blanks) > n:
+        q.blanks = q.blanks[:n]
+    while len(q.blanks) < n:
+        q.blanks.append(new_blank(len(q.blanks)))
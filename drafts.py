@@ -0,0 +1,116 @@
+# drafts.py
+# Rascunhos de questões com cópia na escrita (copy-on-write), para o editor.
+#
+# Abrir um rascunho faz só uma cópia rasa da questão: listas, lacunas, opções, pares e meta
+# continuam partilhados com a questão guardada (que é compacta e só de leitura). Um objeto
+# interno só é copiado quando o editor lhe escreve um valor diferente, e nessa altura copia-se
+# também a lista que o contém (cópia de referências, não dos elementos). Guardar devolve a
+# questão do rascunho, que partilha com a original tudo o que não mudou: o custo é proporcional
+# ao que foi alterado, não ao tamanho da questão.
+#
+# Regras para quem edita:
+#   - campos escalares da própria questão (prompt, section, title...): atribuir diretamente
+#     (draft.q é uma cópia só do rascunho);
+#   - campos de meta:                     draft.set_meta("points", valor)
+#   - campos de lacunas/opções/pares:     draft.set_item("options", i, "text", valor)
+#   - acrescentar/remover elementos:      draft.mutable_list("options").append(...)
+import copy
+import os
+import sys
+from dataclasses import fields
+from typing import Any, Dict, List
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
+
+from models import Question, compact_blank, compact_question  # noqa: E402
+
+_QUESTION_FIELDS = tuple(f.name for f in fields(Question))
+
+
+def _same(a: Any, b: Any) -> bool:
+    # Uma lista nova com o mesmo conteúdo do tuplo compacto (ex: [] e EMPTY) não é uma alteração
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(x is y or x == y for x, y in zip(a, b))
+    return a == b
+
+
+class QuestionDraft:
+    """Rascunho editável de uma questão; `q` é a questão a ler e `base` a que foi aberta."""
+
+    def __init__(self, base: Question):
+        self.base = base
+        self.q = copy.copy(base)
+        # id -> objeto já copiado para o rascunho (as referências mantêm os ids válidos)
+        self._owned: Dict[int, Any] = {}
+        self._dirty = False
+
+    def _own(self, obj: Any) -> Any:
+        self._owned[id(obj)] = obj
+        return obj
+
+    def _is_owned(self, obj: Any) -> bool:
+        return id(obj) in self._owned
+
+    # --- Escrita ---
+
+    def mutable_list(self, name: str) -> List[Any]:
+        """A lista `name` da questão, copiada para o rascunho na primeira chamada."""
+        value = getattr(self.q, name)
+        if not self._is_owned(value):
+            value = self._own(list(value))
+            setattr(self.q, name, value)
+        self._dirty = True
+        return value
+
+    def set_meta(self, name: str, value: Any) -> None:
+        meta = self.q.meta
+        if _same(getattr(meta, name), value):
+            return
+        if not self._is_owned(meta):
+            meta = self.q.meta = self._own(copy.copy(meta))
+        setattr(meta, name, value)
+        self._dirty = True
+
+    def set_item(self, list_name: str, index: int, name: str, value: Any) -> None:
+        """Altera um campo do elemento `index` da lista `list_name` (só copia se o valor mudar)."""
+        item = getattr(self.q, list_name)[index]
+        if _same(getattr(item, name), value):
+            return
+        if not self._is_owned(item):
+            items = self.mutable_list(list_name)
+            item = items[index] = self._own(copy.copy(item))
+        setattr(item, name, value)
+        self._dirty = True
+
+    # --- Guardar ---
+
+    def changed(self) -> bool:
+        if self._dirty:
+            return True
+        q, base = self.q, self.base
+        for name in _QUESTION_FIELDS:
+            a, b = getattr(q, name), getattr(base, name)
+            if a is not b and not _same(a, b):
+                return True
+        return False
+
+    def commit(self) -> Question:
+        """
+        Questão pronta a guardar em ta.questions (compacta). Sem alterações devolve a própria
+        questão original. O rascunho continua utilizável: as edições seguintes voltam a copiar.
+        """
+        if not self.changed():
+            return self.base
+        q = self.q
+        # Se a lista de lacunas não mudou, as lacunas são as da original (já compactas)
+        if q.blanks is not self.base.blanks:
+            for b in q.blanks:
+                compact_blank(b)
+        compact_question(q, blanks=False)
+        self.base = q
+        self.q = copy.copy(q)
+        self._owned = {}
+        self._dirty = False
+        return q
@@ -0,0 +1,480 @@
+# duplicates.py
+# Deteção de questões quase iguais no banco (MinHash + LSH).
+#
+# Cada questão é reduzida a um conjunto de "shingles" (sequências de 3 palavras do enunciado e
+# das respostas) e a uma assinatura MinHash de tamanho fixo. As assinaturas são partidas em
+# bandas e guardadas em tabelas de dispersão (LSH): só as questões que partilham pelo menos uma
+# banda são comparadas, por isso não há comparação de todos com todos e o índice cresce
+# questão a questão.
+#
+# A assinatura usa "one permutation hashing" (Li et al., 2012): cada shingle é dispersado uma
+# só vez e cai num dos num_perm compartimentos, onde se guarda o mínimo. Custa O(shingles) em
+# vez de O(shingles * num_perm) e estima a mesma semelhança de Jaccard; os compartimentos
+# vazios (textos curtos) são preenchidos por rotação a partir do seguinte (Shrivastava & Li, 2014).
+# No índice, cada assinatura é guardada como um inteiro (os num_perm valores de 32 bits lado a
+# lado): a semelhança conta os valores iguais com um XOR e operações de bits sobre o inteiro.
+#
+# Na aplicação, o banco de referência e as fichas gravadas são indexados uma vez por processo
+# (index_fichas, numa thread) e ficam só de leitura; o índice de cada sessão tem esse índice
+# por base e guarda só as questões da ficha atual que são novas ou diferentes das da base.
+#
+# Uso (linha de comandos):
+#   python duplicates.py pasta_fichas/ [--threshold 0.8]      (fichas *.babta ou *.json)
+
+import argparse
+import os
+import random
+import re
+import sys
+import zlib
+from array import array
+from concurrent.futures import Future
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
+
+from models import TA, Question, ValidationIssue  # noqa: E402
+
+# Primo de Mersenne 2^61 - 1: h(x) = (a*x + b) mod P é uma permutação aleatória dos shingles
+_MERSENNE_P = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_EMPTY = _MAX_HASH
+# Deslocamento somado por cada passo de rotação ao preencher compartimentos vazios
+_ROTATION_STEP = 0x9E3779B1
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_WORD_RE = re.compile(r"\w+")
+
+# Tamanho dos shingles (em palavras)
+SHINGLE_SIZE = 3
+
+
+def question_text(q: Question) -> str:
+    """Texto que identifica a questão: enunciado + opções, lacunas, pares e respostas aceites."""
+    parts = [q.prompt]
+    parts += [o.text for o in q.options]
+    for b in q.blanks:
+        parts += b.answers
+        parts += b.distractors
+    for p in q.pairs:
+        parts.append(p.left)
+        parts.append(p.right)
+    parts += q.accepted_answers
+    return "\n".join(parts)
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[int]:
+    """Conjunto de shingles (hash de `size` palavras seguidas), sem HTML nem maiúsculas."""
+    words = _WORD_RE.findall(_TAG_RE.sub(" ", text).lower())
+    if not words:
+        return set()
+    if len(words) < size:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))}
+    return {zlib.crc32(" ".join(words[i:i + size]).encode("utf-8")) for i in range(len(words) - size + 1)}
+
+
+class DuplicateIndex:
+    """
+    Índice LSH de questões. `add` insere (ou atualiza) uma questão, `query` devolve as
+    questões do índice com semelhança estimada >= threshold.
+
+    Com num_perm=64 e bands=16 (4 linhas por banda), pares com semelhança 0.8 são
+    candidatos com probabilidade > 99.9%; pares abaixo de ~0.5 quase nunca o são.
+
+    Com `base` (um índice só de leitura feito por index_fichas, com os mesmos parâmetros), as
+    pesquisas incluem as questões da base; as questões de uma ficha iguais às da base não são
+    indexadas de novo e usam as parecidas que a base já encontrou.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 16, seed: int = 1,
+                 base: Optional["DuplicateIndex"] = None):
+        if num_perm % bands:
+            raise ValueError("num_perm tem de ser múltiplo de bands")
+        if base is not None and (base.threshold, base.num_perm, base.bands, base.seed) != (threshold, num_perm, bands, seed):
+            raise ValueError("O índice base tem de usar os mesmos parâmetros (threshold, num_perm, bands, seed)")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.seed = seed
+        rnd = random.Random(seed)
+        self._a = rnd.randrange(1, _MERSENNE_P)
+        self._b = rnd.randrange(0, _MERSENNE_P)
+        # qid -> assinatura (inteiro com os num_perm valores de 32 bits; ver _similarity)
+        self._signatures: Dict[str, int] = {}
+        self._low_bits = int.from_bytes(array("I", [1] * num_perm).tobytes(), "little")
+        self.base = base
+        # Com base: qid -> questão da ficha igual à da base (não indexada aqui) e qids da base
+        # que a ficha atual substitui ou apagou (as parecidas da base com eles não contam)
+        self._same_as_base: Dict[str, Question] = {}
+        self._shadowed: Set[str] = set()
+        # qid -> hash do texto indexado (para saltar questões que não mudaram)
+        self._text_hash: Dict[str, int] = {}
+        # qid -> descrição legível ("Ficha X > Questão 3"), usada nas mensagens
+        self.labels: Dict[str, str] = {}
+        # Uma tabela por banda: hash da banda -> qids
+        self._buckets: List[Dict[int, List[str]]] = [{} for _ in range(bands)]
+        # ta_id -> qids indexados dessa ficha (para retirar as questões apagadas)
+        self._ficha_qids: Dict[str, Set[str]] = {}
+        # qid -> questão indexada: o mesmo objeto (as questões guardadas nunca são alteradas no
+        # próprio objeto) é saltado sem voltar a montar o texto
+        self._indexed: Dict[str, Question] = {}
+        # qid -> parecidas encontradas na última pesquisa (ficha_issues) e qids cuja assinatura
+        # mudou desde então (as parecidas delas, antes e depois, são pesquisadas de novo)
+        self._found: Dict[str, List[Tuple[str, float]]] = {}
+        self._dirty: Set[str] = set()
+        # ta_id -> (lista de questões, versão, nome da ficha, problemas) da última verificação
+        self._ficha_issues: Dict[str, Tuple[object, int, str, List[ValidationIssue]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, qid: str) -> bool:
+        return qid in self._signatures
+
+    # --- Assinaturas ---
+
+    def signature(self, q: Question) -> Optional[array]:
+        """Assinatura MinHash da questão (None se não tiver texto)."""
+        return self._signature_of(shingles(question_text(q)))
+
+    def _signature_key(self, text: str) -> Optional[int]:
+        # Assinatura na forma guardada no índice
+        sig = self._signature_of(shingles(text))
+        return None if sig is None else int.from_bytes(sig.tobytes(), "little")
+
+    def _signature_of(self, hs: Set[int]) -> Optional[array]:
+        if not hs:
+            return None
+        a, b, P, k = self._a, self._b, _MERSENNE_P, self.num_perm
+        sig = [_EMPTY] * k
+        for x in hs:
+            h = (a * x + b) % P
+            i = h % k
+            v = (h // k) & _MAX_HASH
+            if v < sig[i]:
+                sig[i] = v
+        if _EMPTY in sig:
+            # Rotação: um compartimento vazio herda o valor do próximo não vazio (à direita,
+            # circular), mais um deslocamento por cada passo dado. Duas voltas da direita para
+            # a esquerda chegam para todos os compartimentos saberem qual é o próximo não vazio.
+            filled = list(sig)
+            nearest, steps = _EMPTY, 0
+            for pos in range(2 * k - 1, -1, -1):
+                i = pos % k
+                if sig[i] != _EMPTY:
+                    nearest, steps = sig[i], 0
+                else:
+                    steps += 1
+                    if pos < k:
+                        filled[i] = (nearest + steps * _ROTATION_STEP) & _MAX_HASH
+            sig = filled
+        return array("I", sig)
+
+    def _band_keys(self, sig: int) -> List[int]:
+        raw = sig.to_bytes(4 * self.num_perm, "little")
+        step = self.rows * 4
+        return [hash(raw[i:i + step]) for i in range(0, len(raw), step)]
+
+    # --- Inserção / remoção ---
+
+    def add(self, q: Question, label: str = "") -> None:
+        """Insere a questão; se já existe com o mesmo texto, só atualiza a descrição."""
+        if label:
+            self.labels[q.qid] = label
+        if self._indexed.get(q.qid) is q:
+            return
+        text = question_text(q)
+        text_hash = hash(text)
+        if self._text_hash.get(q.qid) == text_hash:
+            self._indexed[q.qid] = q
+            return
+        self.remove(q.qid, keep_label=True)
+        self._indexed[q.qid] = q
+        sig = self._signature_key(text)
+        if sig is None:
+            return
+        self._signatures[q.qid] = sig
+        self._text_hash[q.qid] = text_hash
+        self._dirty.add(q.qid)
+        for table, key in zip(self._buckets, self._band_keys(sig)):
+            bucket = table.get(key)
+            if bucket is None:
+                table[key] = [q.qid]
+            else:
+                bucket.append(q.qid)
+
+    def add_ficha(self, ta: TA) -> None:
+        """
+        Indexa (ou atualiza) as questões da ficha e retira as que entretanto foram apagadas.
+        Com base, as questões iguais às da base só ficam registadas (não são indexadas aqui).
+        """
+        base = self.base
+        current = set()
+        for i, q in enumerate(ta.questions, start=1):
+            label = f"{ta.ta_name or 'Ficha'} > Questão {i}"
+            current.add(q.qid)
+            if base is not None and self._in_base(q):
+                self.labels[q.qid] = label
+                if q.qid in self._indexed or q.qid in self._signatures:
+                    self.remove(q.qid, keep_label=True)
+                continue
+            self._same_as_base.pop(q.qid, None)
+            self.add(q, label=label)
+        for qid in self._ficha_qids.get(ta.ta_id, set()) - current:
+            self.remove(qid)
+            self._same_as_base.pop(qid, None)
+        self._ficha_qids[ta.ta_id] = current
+        if base is not None:
+            # A ficha atual manda nas suas questões: as versões da base que ela alterou ou
+            # apagou não contam como parecidas
+            self._shadowed = set(self._indexed) | (base._ficha_qids.get(ta.ta_id, set()) - current)
+
+    def _in_base(self, q: Question) -> bool:
+        # A questão é a mesma que está na base (o mesmo objeto ou o mesmo texto)?
+        if self._same_as_base.get(q.qid) is q:
+            return True
+        base = self.base
+        if base._indexed.get(q.qid) is not q and base._text_hash.get(q.qid, 0) != hash(question_text(q)):
+            return False
+        if q.qid not in base._signatures:
+            return False
+        self._same_as_base[q.qid] = q
+        return True
+
+    def drop_ficha(self, ta_id: str) -> None:
+        """Retira do índice as questões de uma ficha (ex: a sessão passou a outra ficha)."""
+        for qid in self._ficha_qids.pop(ta_id, set()):
+            self.remove(qid)
+            self._same_as_base.pop(qid, None)
+        self._ficha_issues.pop(ta_id, None)
+
+    def fichas(self) -> Set[str]:
+        """ta_id das fichas indexadas com add_ficha."""
+        return set(self._ficha_qids)
+
+    def remove(self, qid: str, keep_label: bool = False) -> None:
+        sig = self._signatures.pop(qid, None)
+        self._text_hash.pop(qid, None)
+        self._indexed.pop(qid, None)
+        if not keep_label:
+            self.labels.pop(qid, None)
+        if sig is None:
+            return
+        self._dirty.add(qid)
+        for table, key in zip(self._buckets, self._band_keys(sig)):
+            bucket = table.get(key)
+            if bucket is not None:
+                bucket.remove(qid)
+                if not bucket:
+                    del table[key]
+
+    # --- Pesquisa ---
+
+    def _similarity(self, a: int, b: int) -> float:
+        # Valores iguais = valores de 32 bits a zero no XOR: cada um é reduzido ao seu bit mais
+        # baixo (OR de todos os bits do valor) e contam-se os que ficaram a 1 (os diferentes)
+        d = a ^ b
+        d |= d >> 16
+        d |= d >> 8
+        d |= d >> 4
+        d |= d >> 2
+        d |= d >> 1
+        return (self.num_perm - (d & self._low_bits).bit_count()) / self.num_perm
+
+    def query(self, q: Question) -> List[Tuple[str, float]]:
+        """Questões do índice parecidas com `q` (exceto a própria): [(qid, semelhança)], da mais parecida."""
+        sig = self._signatures.get(q.qid)
+        if sig is None or (self._indexed.get(q.qid) is not q and self._text_hash.get(q.qid) != hash(question_text(q))):
+            sig = self._signature_key(question_text(q))
+            if sig is None:
+                return []
+        return self._matches(q.qid, sig)
+
+    def _matches(self, qid: str, sig: int) -> List[Tuple[str, float]]:
+        candidates: Set[str] = set()
+        for table, key in zip(self._buckets, self._band_keys(sig)):
+            bucket = table.get(key)
+            if bucket:
+                candidates.update(bucket)
+        candidates.discard(qid)
+        found = []
+        for other in candidates:
+            sim = self._similarity(sig, self._signatures[other])
+            if sim >= self.threshold:
+                found.append((other, sim))
+        found.sort(key=lambda m: (-m[1], m[0]))
+        return found
+
+    def groups(self) -> List[List[Tuple[str, float]]]:
+        """Todos os grupos de duplicados do índice (cada par aparece uma só vez)."""
+        seen: Set[str] = set()
+        out = []
+        for qid in sorted(self._signatures):
+            if qid in seen:
+                continue
+            matches = [m for m in self._matches(qid, self._signatures[qid]) if m[0] not in seen]
+            if matches:
+                out.append([(qid, 1.0)] + matches)
+                seen.update(m[0] for m in matches)
+            seen.add(qid)
+        return out
+
+    # --- Avisos de uma ficha ---
+
+    def _refresh_found(self) -> None:
+        # Pesquisa de novo as questões cuja assinatura mudou e as que eram ou passaram a ser
+        # parecidas com elas (a semelhança é simétrica); as restantes mantêm o resultado
+        affected: Set[str] = set()
+        for qid in self._dirty:
+            affected.update(other for other, _ in self._found.pop(qid, ()))
+        for qid in self._dirty:
+            sig = self._signatures.get(qid)
+            if sig is not None:
+                found = self._found[qid] = self._matches(qid, sig)
+                affected.update(other for other, _ in found)
+        for qid in affected - self._dirty:
+            sig = self._signatures.get(qid)
+            if sig is not None and qid in self._found:
+                self._found[qid] = self._matches(qid, sig)
+        self._dirty.clear()
+
+    def ficha_issues(self, ta: TA) -> List[ValidationIssue]:
+        """
+        Avisos de duplicados da ficha (ver duplicate_issues), guardados por versão da lista de
+        questões: um rerun sem alterações não faz contas e uma edição só volta a pesquisar as
+        questões afetadas.
+        """
+        questions = ta.questions
+        version = getattr(questions, "version", None)
+        cached = self._ficha_issues.get(ta.ta_id)
+        if (cached is not None and version is not None and not self._dirty
+                and cached[0] is questions and cached[1] == version and cached[2] == ta.ta_name):
+            return cached[3]
+
+        self.add_ficha(ta)
+        self._refresh_found()
+        issues: List[ValidationIssue] = []
+        for i, q in enumerate(questions, start=1):
+            matches = self._ficha_matches(q.qid)
+            if not matches:
+                continue
+            listed = ", ".join(f"{self._label(qid)} [{qid}] ({sim:.0%})" for qid, sim in matches[:MAX_LISTED])
+            more = f" e mais {len(matches) - MAX_LISTED}" if len(matches) > MAX_LISTED else ""
+            issues.append(ValidationIssue(
+                "AVISO", f"Questão {i}",
+                f"Possível duplicado de: {listed}{more}. Confirma se é intencional.",
+                qid=q.qid,
+            ))
+        if version is not None:
+            self._ficha_issues[ta.ta_id] = (questions, version, ta.ta_name, issues)
+        return issues
+
+    def _ficha_matches(self, qid: str) -> List[Tuple[str, float]]:
+        # Parecidas de uma questão da ficha: no próprio índice e, havendo base, também na base
+        base = self.base
+        if base is not None and qid in self._same_as_base:
+            # Igual à da base: as parecidas que a base já encontrou, mais as do próprio índice
+            sig = base._signatures[qid]
+            found = [m for m in base._found_for(qid) if m[0] not in self._shadowed]
+            if self._signatures:
+                found += self._matches(qid, sig)
+                found.sort(key=lambda m: (-m[1], m[0]))
+            return found
+        found = self._found.get(qid)
+        if found is None:
+            sig = self._signatures.get(qid)
+            if sig is None:
+                return []
+            found = self._found[qid] = self._matches(qid, sig)
+        if base is None:
+            return found
+        from_base = [m for m in base._matches(qid, self._signatures[qid]) if m[0] not in self._shadowed]
+        if not from_base:
+            return found
+        return sorted(found + from_base, key=lambda m: (-m[1], m[0]))
+
+    def _found_for(self, qid: str) -> List[Tuple[str, float]]:
+        # Parecidas de uma questão indexada, da última pesquisa (numa base, todas já pesquisadas)
+        found = self._found.get(qid)
+        return found if found is not None else self._matches(qid, self._signatures[qid])
+
+    def _label(self, qid: str) -> str:
+        label = self.labels.get(qid)
+        if label is None and self.base is not None:
+            label = self.base.labels.get(qid)
+        return label or qid
+
+
+# Quantos duplicados são nomeados em cada aviso (os restantes são só contados)
+MAX_LISTED = 3
+
+
+def index_fichas(fichas: Iterable[TA], **kwargs) -> DuplicateIndex:
+    """
+    Índice com as questões de várias fichas e as parecidas de cada questão já pesquisadas, para
+    servir de base (só de leitura, partilhada entre threads) a DuplicateIndex(base=...).
+    Se duas fichas tiverem questões com o mesmo qid, fica a última.
+    """
+    index = DuplicateIndex(**kwargs)
+    for ta in fichas:
+        index.add_ficha(ta)
+    index._refresh_found()
+    return index
+
+
+def index_in_background(load_fichas: Callable[[], Iterable[TA]], **kwargs) -> "Future[DuplicateIndex]":
+    """index_fichas(load_fichas()) numa thread: devolve logo um Future com o índice."""
+    future: "Future[DuplicateIndex]" = Future()
+
+    def build() -> None:
+        try:
+            future.set_result(index_fichas(load_fichas(), **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=build, name="babelium-duplicates", daemon=True).start()
+    return future
+
+
+def duplicate_issues(ta: TA, index: Optional[DuplicateIndex] = None,
+                     max_issues: Optional[int] = None) -> List[ValidationIssue]:
+    """
+    Avisos de questões quase iguais, dentro da ficha e (se for dado um índice do banco) em relação
+    às questões já indexadas. As questões da ficha são adicionadas ao índice. Com `max_issues`
+    devolve no máximo esse número de avisos.
+    """
+    if index is None:
+        index = DuplicateIndex()
+    issues = index.ficha_issues(ta)
+    return issues[:max_issues] if max_issues is not None else issues
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    from batch_export import FICHA_EXTENSIONS, load_ficha
+    from storage import EXTENSION
+
+    parser = argparse.ArgumentParser(description=f"Procura questões quase iguais num conjunto de fichas BabeliUM ({EXTENSION} ou JSON).")
+    parser.add_argument("input_dir", help=f"Pasta com as fichas (*{EXTENSION} gravadas pela aplicação ou *.json)")
+    parser.add_argument("--threshold", type=float, default=0.8, help="Semelhança mínima (0-1, default: 0.8)")
+    args = parser.parse_args(argv)
+
+    index = DuplicateIndex(threshold=args.threshold)
+    names = sorted(n for n in os.listdir(args.input_dir) if n.endswith(FICHA_EXTENSIONS))
+    for name in names:
+        ta = load_ficha(os.path.join(args.input_dir, name))
+        for i, q in enumerate(ta.questions, start=1):
+            index.add(q, label=f"{name} > Questão {i}")
+
+    groups = index.groups()
+    for group in groups:
+        print(" ~ ".join(f"{index.labels.get(qid, qid)} ({sim:.0%})" for qid, sim in group))
+    print(f"{len(index)} questões indexadas, {len(groups)} grupo(s) de possíveis duplicados")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
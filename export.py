@@ -1,240 +1,384 @@
-# export.py
-from typing import List
-import sys
-import os
-
-# Tenta importar os modelos. Se der erro, tenta adicionar o caminho atual.
-# Adiciona o diretório atual ao path para garantir que Python encontra os módulos
-current_dir = os.path.dirname(os.path.abspath(__file__))
-if current_dir not in sys.path:
-    sys.path.insert(0, current_dir)
-
-try:
-    from models import TA, Question, ChoiceOption, MatchPair, Blank  # type: ignore
-    from utils import escape_xml, count_gaps  # type: ignore
-except ImportError as e:
-    print(f"Erro ao importar módulos: {e}")
-    raise
-
-def build_moodle_xml_stub(ta: TA) -> str:
-    """
-    Gera o XML compatível com Moodle para importação.
-    Suporta: Cloze, V/F (Simples e Matriz), Escolha Múltipla, Associação, Texto e Ensaio.
-    """
-    
-    # Cabeçalho padrão do Moodle XML
-    lines: List[str] = []
-    lines.append('<?xml version="1.0" encoding="UTF-8"?>')
-    lines.append("<quiz>")
-
-    # Categoria por defeito (Curso / Tema / Nome da Ficha)
-    # Limpa espaços extra para evitar categorias "feias"
-    cat_parts = [p.strip() for p in [ta.course, ta.theme, ta.ta_name] if p.strip()]
-    default_cat = "/".join(cat_parts)
-
-    for q in ta.questions:
-        # 1. Definir Categoria (para organizar no banco de questões do Moodle)
-        cat = q.meta.category.strip() or default_cat
-        
-        # O Moodle interpreta a categoria quando encontra uma questão do tipo "category"
-        lines.append('  <question type="category">')
-        lines.append("    <category>")
-        lines.append(f"      <text>{escape_xml('$course$/' + cat)}</text>")
-        lines.append("    </category>")
-        lines.append("  </question>")
-
-        # 2. Determinar o Tipo de Questão REAL para o XML
-        mt = q.moodle_type
-        xml_type = mt # Por defeito, assume o nome interno
-
-        # Lógica de conversão inteligente
-        if mt == "truefalse":
-            # Se tiver mais de 1 opção, vira "Matching" (Matriz V/F)
-            # Se tiver apenas 1, mantém-se "truefalse"
-            if len(q.options) > 1:
-                xml_type = "matching"  
-            else:
-                xml_type = "truefalse"
-        
-        elif mt == "cloze" or mt == "cloze_mc":
-            xml_type = "cloze"
-        
-        elif mt.startswith("multichoice"):
-            xml_type = "multichoice"
-        
-        # (matching, shortanswer, essay, description mantêm-se iguais)
-
-        # 3. Início da Tag da Questão
-        lines.append(f'  <question type="{xml_type}">')
-
-        # Nome da Questão (Visível ao professor na lista)
-        qname = q.title.strip() or f"{ta.ta_name} - Questão {q.qid[:5]}"
-        lines.append("    <name>")
-        lines.append(f"      <text>{escape_xml(qname)}</text>")
-        lines.append("    </name>")
-
-        # --- PROCESSAMENTO DO TEXTO (Especial para CLOZE) ---
-        texto_export = q.prompt
-        
-        if mt == "cloze" or mt == "cloze_mc":
-            # Substituir os [ ] pelos códigos do Moodle
-            # Ex: "O gato [ ] leite." -> "O gato {1:SHORTANSWER:=bebe} leite."
-            parts = q.prompt.split("[ ]")
-            texto_export = ""
-            
-            for i, part in enumerate(parts):
-                texto_export += part
-                # Se ainda houver lacunas para preencher...
-                if i < len(q.blanks):
-                    b = q.blanks[i]
-                    # Se não houver resposta definida, põe asterisco (aceita tudo ou erro)
-                    correct = b.answers[0] if b.answers else "*"
-                    
-                    if hasattr(b, 'distractors') and b.distractors:
-                         # Se o teu modelo Blank tiver distratores (para dropdown)
-                        dists = "~".join(b.distractors)
-                        texto_export += f"{{1:MULTICHOICE:={correct}~{dists}}}"
-                    else:
-                        # Modo Escrita (Shortanswer) - Padrão do código atual
-                        # Se case_sensitive for True, usamos SHORTANSWER_C
-                        sa_code = "SHORTANSWER_C" if b.case_sensitive else "SHORTANSWER"
-                        texto_export += f"{{1:{sa_code}:={correct}}}"
-        
-        # Escrever o Enunciado Final (HTML)
-        lines.append('    <questiontext format="html">')
-        lines.append(f"      <text><![CDATA[{texto_export}]]></text>")
-        lines.append("    </questiontext>")
-
-        # Pontuação (Description vale 0)
-        if mt == "description":
-            lines.append("    <defaultgrade>0</defaultgrade>")
-        else:
-            lines.append(f"    <defaultgrade>{q.meta.points}</defaultgrade>")
-
-        # Feedback Geral
-        if q.meta.feedback_general.strip():
-            lines.append('    <generalfeedback format="html">')
-            lines.append(f"      <text><![CDATA[{q.meta.feedback_general}]]></text>")
-            lines.append("    </generalfeedback>")
-
-        # 4. Detalhes Específicos por Tipo
-
-        # --- ESCOLHA MÚLTIPLA ---
-        if xml_type == "multichoice":
-            single = (mt == "multichoice_single")
-            lines.append(f"    <single>{'true' if single else 'false'}</single>")
-            lines.append(f"    <shuffleanswers>{'true' if q.shuffle_options else 'false'}</shuffleanswers>")
-            
-            correct_opts = [o for o in q.options if o.is_correct and o.text.strip()]
-            # Calcula a percentagem: 
-            # Se for single: 100% para a correta.
-            # Se for multi: 100 / nº de corretas.
-            frac_correct = 100 if single else (100 / max(1, len(correct_opts)))
-            # Penalização para erradas em multi (opcional, aqui pomos 0 para simplificar ou -frac)
-            
-            for o in q.options:
-                if not o.text.strip(): continue
-                fraction = frac_correct if o.is_correct else 0
-                
-                # Formato: <answer fraction="100">
-                lines.append(f'    <answer fraction="{fraction}" format="html">')
-                lines.append(f"      <text><![CDATA[{o.text}]]></text>")
-                if o.feedback.strip():
-                    lines.append(f"      <feedback format='html'><text><![CDATA[{o.feedback}]]></text></feedback>")
-                lines.append("    </answer>")
-
-        # --- VERDADEIRO/FALSO (Único - Clássico) ---
-        elif xml_type == "truefalse":
-            # Assume a 1ª opção como referência. 
-            # Se a opção[0] (ex: "A frase é bonita") for marcada como True, a resposta é 'true'.
-            # Se o utilizador marcou a opção[1] (Falso) como correta, a resposta é 'false'.
-            
-            # Lógica defensiva: Procura qual é a opção VERDADEIRA
-            # No teu UI, q.options[0] costuma ser o botão "Verdadeiro".
-            is_true_correct = q.options[0].is_correct if q.options else True
-            
-            lines.append(f'    <answer fraction="100"><text>{"true" if is_true_correct else "false"}</text></answer>')
-            lines.append(f'    <answer fraction="0"><text>{"false" if is_true_correct else "true"}</text></answer>')
-
-        # --- MATCHING (Inclui o V/F Múltiplo / Matriz) ---
-        elif xml_type == "matching":
-            lines.append(f"    <shuffleanswers>{'true' if q.shuffle_options or q.shuffle_pairs else 'false'}</shuffleanswers>")
-            
-            # CASO A: É um V/F transformado em Matriz
-            if mt == "truefalse":
-                used_answers = set()
-                for opt in q.options:
-                    if not opt.text.strip(): continue
-                    # A resposta na dropdown será "Verdadeiro" ou "Falso"
-                    ans_text = "Verdadeiro" if opt.is_correct else "Falso"
-                    used_answers.add(ans_text)
-                    
-                    lines.append('    <subquestion format="html">')
-                    lines.append(f"      <text><![CDATA[{opt.text}]]></text>")
-                    lines.append(f"      <answer><text>{ans_text}</text></answer>")
-                    lines.append("    </subquestion>")
-                
-                # Truque: Se todas as frases forem "Verdadeiro", o aluno deduziria a resposta.
-                # Temos de adicionar o "Falso" como resposta "órfã" (distrator) para aparecer na lista.
-                if "Verdadeiro" not in used_answers:
-                     lines.append('    <subquestion format="html"><text></text><answer><text>Verdadeiro</text></answer></subquestion>')
-                if "Falso" not in used_answers:
-                     lines.append('    <subquestion format="html"><text></text><answer><text>Falso</text></answer></subquestion>')
-
-            # CASO B: É um Matching normal
-            else:
-                for p in q.pairs:
-                    if not (p.left.strip() and p.right.strip()): continue
-                    lines.append('    <subquestion format="html">')
-                    lines.append(f"      <text><![CDATA[{p.left}]]></text>")
-                    lines.append(f"      <answer><text><![CDATA[{p.right}]]></text></answer>")
-                    lines.append("    </subquestion>")
-                
-                # Distratores (lado direito extra)
-                for dist in q.distractors_right:
-                    if dist.strip():
-                        lines.append(f'    <subquestion format="html"><text></text><answer><text><![CDATA[{dist}]]></text></answer></subquestion>')
-
-        # --- RESPOSTA CURTA ---
-        elif xml_type == "shortanswer":
-            lines.append(f"    <usecase>{'1' if q.sa_case_sensitive else '0'}</usecase>")
-            ans = [a.strip() for a in q.accepted_answers if a.strip()]
-            if ans:
-                frac = 100  # Qualquer uma das aceites dá 100%
-                for a in ans:
-                    lines.append(f'    <answer fraction="{frac}" format="moodle_auto_format">')
-                    lines.append(f"      <text><![CDATA[{a}]]></text>")
-                    lines.append("    </answer>")
-
-        # --- ENSAIO (Texto Livre) ---
-        elif xml_type == "essay":
-            lines.append("    <responseformat>editor</responseformat>")
-            lines.append("    <responsetemplate format='html'><text></text></responsetemplate>")
-            if q.rubric:
-                 # Se houver rubrica, pode-se colocar como info para o avaliador
-                 lines.append(f"    <graderinfo format='html'><text><![CDATA[{q.rubric}]]></text></graderinfo>")
-
-        # Fecha a pergunta principal
-        lines.append("  </question>")
-
-        # 5. INJEÇÃO AUTOMÁTICA DA PERGUNTA DE CORREÇÃO (Se ativada no V/F)
-        if mt == "truefalse" and q.tf_require_correction:
-            lines.append('  <question type="essay">')
-            name_corr = f"{q.title} (Correção)" if q.title else "Correção V/F"
-            
-            lines.append("    <name>")
-            lines.append(f"      <text>{escape_xml(name_corr)}</text>")
-            lines.append("    </name>")
-            
-            lines.append('    <questiontext format="html">')
-            lines.append("      <text><![CDATA[<p><b>Justificação / Correção:</b></p><p>Reescreva corretamente as afirmações que classificou como Falsas na pergunta anterior.</p>]]></text>")
-            lines.append("    </questiontext>")
-            
-            lines.append("    <defaultgrade>1.0</defaultgrade>")
-            lines.append("    <responseformat>editor</responseformat>")
-            # Correção das aspas para evitar erro de string
-            lines.append('    <responsetemplate format="html"><text></text></responsetemplate>')
-            lines.append("  </question>")
-
-    lines.append("</quiz>")
-    return "\n".join(lines)
\ No newline at end of file
+# export.py
+from typing import IO, Dict, Iterator, List, Optional
+import io
+import sys
+import os
+
+# Tenta importar os modelos. Se der erro, tenta adicionar o caminho atual.
+# Adiciona o diretório atual ao path para garantir que Python encontra os módulos
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
+
+try:
+    from models import TA, Question, ChoiceOption, MatchPair, Blank  # type: ignore
+    from cloze import compile_cloze  # type: ignore
+    from text_encoding import xml_text, cdata, cloze_answer  # type: ignore
+    from cache import LRUCache, question_fingerprint  # type: ignore
+    from profiling import timed  # type: ignore
+except ImportError as e:
+    print(f"Erro ao importar módulos: {e}")
+    raise
+
+
+
+class FragmentCache:
+    """
+    Fragmentos XML por questão, para só voltar a serializar as questões que mudaram.
+
+    Como a ValidationCache (validators.py): cada entrada, por qid, guarda a questão, o contexto
+    da ficha (nome, categoria por defeito) e o fragmento. Se o objeto é o mesmo da última vez, o
+    fragmento é reutilizado sem mais contas (o editor nunca altera uma questão guardada:
+    substitui-a por uma cópia nova). Só quando o objeto mudou se compara o fingerprint de
+    conteúdo, por isso uma exportação a frio não calcula fingerprint nenhum. Quem alterar uma
+    questão no próprio objeto deve chamar invalidate(qid).
+    """
+
+    def __init__(self, maxsize: int = 20_000):
+        # (qid, compact) -> (questão, contexto, fragmento, fingerprint ou None se ainda não foi preciso)
+        self._entries = LRUCache(maxsize=maxsize)
+
+    def fragment(self, q: Question, ta: TA, default_cat: str, compact: bool = False) -> str:
+        key = (q.qid, compact)
+        context = (ta.ta_name, default_cat)
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] == context:
+            if entry[0] is q:
+                return entry[2]
+            old_fp = entry[3] if entry[3] is not None else question_fingerprint(entry[0])
+            fp = question_fingerprint(q)
+            if fp == old_fp:
+                self._entries.put(key, (q, context, entry[2], fp))
+                return entry[2]
+        fragment = _question_xml(q, ta, default_cat, compact)
+        self._entries.put(key, (q, context, fragment, None))
+        return fragment
+
+    def invalidate(self, qid: str) -> None:
+        self._entries.discard((qid, False))
+        self._entries.discard((qid, True))
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Cache de fragmentos da interface (cached_export). As exportações pontuais (batch_export,
+# build_moodle_xml_stub...) não usam cache por defeito: a frio, guardar só custa.
+FRAGMENT_CACHE = FragmentCache()
+
+# Enunciado da pergunta de correção injetada a seguir a um V/F com "Pedir correção das Falsas"
+TF_CORRECTION_TEXT = "<p><b>Justificação / Correção:</b></p><p>Reescreva corretamente as afirmações que classificou como Falsas na pergunta anterior.</p>"
+
+# Elementos vazios que o modo compacto não escreve (o Moodle usa os mesmos valores por defeito)
+_COMPACT_OMIT = {
+    "<responsetemplate format='html'><text></text></responsetemplate>",
+    '<responsetemplate format="html"><text></text></responsetemplate>',
+}
+
+def _default_category(ta: TA) -> str:
+    # Categoria por defeito (Curso / Tema / Nome da Ficha)
+    # Limpa espaços extra para evitar categorias "feias"
+    cat_parts = [p.strip() for p in [ta.course, ta.theme, ta.ta_name] if p.strip()]
+    return "/".join(cat_parts)
+
+
+def _resolved_category(q: Question, default_cat: str) -> str:
+    return q.meta.category.strip() or default_cat
+
+
+def _category_xml(cat: str, compact: bool = False) -> str:
+    # O Moodle interpreta a categoria quando encontra uma questão do tipo "category"
+    text = xml_text('$course$/' + cat)
+    if compact:
+        return f'<question type="category"><category><text>{text}</text></category></question>'
+    return "\n".join([
+        '  <question type="category">',
+        "    <category>",
+        f"      <text>{text}</text>",
+        "    </category>",
+        "  </question>",
+    ])
+
+
+def _cloze_code(b: Blank) -> str:
+    # Se não houver resposta definida, põe asterisco (aceita tudo ou erro)
+    correct = cloze_answer(b.answers[0]) if b.answers else "*"
+
+    if b.distractors:
+        # Com distratores (para dropdown)
+        dists = "~".join([cloze_answer(d) for d in b.distractors])
+        return f"{{1:MULTICHOICE:={correct}~{dists}}}"
+
+    # Modo Escrita (Shortanswer)
+    # Se case_sensitive for True, usamos SHORTANSWER_C
+    sa_code = "SHORTANSWER_C" if b.case_sensitive else "SHORTANSWER"
+    return f"{{1:{sa_code}:={correct}}}"
+
+
+def _question_xml(q: Question, ta: TA, default_cat: str, compact: bool = False) -> str:
+    """
+    Gera o bloco XML de UMA questão (categoria + questão + eventual correção V/F).
+    Devolve as linhas já unidas por "\n", sem quebra de linha final.
+    Em modo compacto não há bloco de categoria (é escrito uma vez por grupo), nem indentação.
+    """
+    lines: List[str] = []
+
+    # 1. Definir Categoria (para organizar no banco de questões do Moodle)
+    if not compact:
+        lines.append(_category_xml(_resolved_category(q, default_cat)))
+
+    # 2. Determinar o Tipo de Questão REAL para o XML
+    mt = q.moodle_type
+    xml_type = mt # Por defeito, assume o nome interno
+
+    # Lógica de conversão inteligente
+    if mt == "truefalse":
+        # Se tiver mais de 1 opção, vira "Matching" (Matriz V/F)
+        # Se tiver apenas 1, mantém-se "truefalse"
+        if len(q.options) > 1:
+            xml_type = "matching"  
+        else:
+            xml_type = "truefalse"
+    
+    elif mt == "cloze" or mt == "cloze_mc":
+        xml_type = "cloze"
+    
+    elif mt.startswith("multichoice"):
+        xml_type = "multichoice"
+    
+    # (matching, shortanswer, essay, description mantêm-se iguais)
+
+    # 3. Início da Tag da Questão
+    lines.append(f'  <question type="{xml_type}">')
+
+    # Nome da Questão (Visível ao professor na lista)
+    qname = q.title.strip() or f"{ta.ta_name} - Questão {q.qid[:5]}"
+    lines.append("    <name>")
+    lines.append(f"      <text>{xml_text(qname)}</text>")
+    lines.append("    </name>")
+
+    # --- PROCESSAMENTO DO TEXTO (Especial para CLOZE) ---
+    texto_export = q.prompt
+    
+    if mt == "cloze" or mt == "cloze_mc":
+        # Substituir os [ ] pelos códigos do Moodle
+        # Ex: "O gato [ ] leite." -> "O gato {1:SHORTANSWER:=bebe} leite."
+        # O enunciado é partido uma só vez (e em cache) pelo compilador de cloze.py
+        compiled = compile_cloze(q.prompt)
+        codes = [_cloze_code(b) for b in q.blanks[:len(compiled.literals)]]
+        texto_export = compiled.render(codes)
+    
+    # Escrever o Enunciado Final (HTML)
+    lines.append('    <questiontext format="html">')
+    lines.append(f"      <text>{cdata(texto_export)}</text>")
+    lines.append("    </questiontext>")
+
+    # Pontuação (Description vale 0)
+    if mt == "description":
+        lines.append("    <defaultgrade>0</defaultgrade>")
+    else:
+        lines.append(f"    <defaultgrade>{q.meta.points}</defaultgrade>")
+
+    # Feedback Geral
+    if q.meta.feedback_general.strip():
+        lines.append('    <generalfeedback format="html">')
+        lines.append(f"      <text>{cdata(q.meta.feedback_general)}</text>")
+        lines.append("    </generalfeedback>")
+
+    # 4. Detalhes Específicos por Tipo
+
+    # --- ESCOLHA MÚLTIPLA ---
+    if xml_type == "multichoice":
+        single = (mt == "multichoice_single")
+        lines.append(f"    <single>{'true' if single else 'false'}</single>")
+        lines.append(f"    <shuffleanswers>{'true' if q.shuffle_options else 'false'}</shuffleanswers>")
+        
+        correct_opts = [o for o in q.options if o.is_correct and o.text.strip()]
+        # Calcula a percentagem: 
+        # Se for single: 100% para a correta.
+        # Se for multi: 100 / nº de corretas.
+        frac_correct = 100 if single else (100 / max(1, len(correct_opts)))
+        # Penalização para erradas em multi (opcional, aqui pomos 0 para simplificar ou -frac)
+        
+        for o in q.options:
+            if not o.text.strip(): continue
+            fraction = frac_correct if o.is_correct else 0
+            
+            # Formato: <answer fraction="100">
+            lines.append(f'    <answer fraction="{fraction}" format="html">')
+            lines.append(f"      <text>{cdata(o.text)}</text>")
+            if o.feedback.strip():
+                lines.append(f"      <feedback format='html'><text>{cdata(o.feedback)}</text></feedback>")
+            lines.append("    </answer>")
+
+    # --- VERDADEIRO/FALSO (Único - Clássico) ---
+    elif xml_type == "truefalse":
+        # Assume a 1ª opção como referência. 
+        # Se a opção[0] (ex: "A frase é bonita") for marcada como True, a resposta é 'true'.
+        # Se o utilizador marcou a opção[1] (Falso) como correta, a resposta é 'false'.
+        
+        # Lógica defensiva: Procura qual é a opção VERDADEIRA
+        # No teu UI, q.options[0] costuma ser o botão "Verdadeiro".
+        is_true_correct = q.options[0].is_correct if q.options else True
+        
+        lines.append(f'    <answer fraction="100"><text>{"true" if is_true_correct else "false"}</text></answer>')
+        lines.append(f'    <answer fraction="0"><text>{"false" if is_true_correct else "true"}</text></answer>')
+
+    # --- MATCHING (Inclui o V/F Múltiplo / Matriz) ---
+    elif xml_type == "matching":
+        lines.append(f"    <shuffleanswers>{'true' if q.shuffle_options or q.shuffle_pairs else 'false'}</shuffleanswers>")
+        
+        # CASO A: É um V/F transformado em Matriz
+        if mt == "truefalse":
+            used_answers = set()
+            for opt in q.options:
+                if not opt.text.strip(): continue
+                # A resposta na dropdown será "Verdadeiro" ou "Falso"
+                ans_text = "Verdadeiro" if opt.is_correct else "Falso"
+                used_answers.add(ans_text)
+                
+                lines.append('    <subquestion format="html">')
+                lines.append(f"      <text>{cdata(opt.text)}</text>")
+                lines.append(f"      <answer><text>{ans_text}</text></answer>")
+                lines.append("    </subquestion>")
+            
+            # Truque: Se todas as frases forem "Verdadeiro", o aluno deduziria a resposta.
+            # Temos de adicionar o "Falso" como resposta "órfã" (distrator) para aparecer na lista.
+            if "Verdadeiro" not in used_answers:
+                 lines.append('    <subquestion format="html"><text></text><answer><text>Verdadeiro</text></answer></subquestion>')
+            if "Falso" not in used_answers:
+                 lines.append('    <subquestion format="html"><text></text><answer><text>Falso</text></answer></subquestion>')
+
+        # CASO B: É um Matching normal
+        else:
+            for p in q.pairs:
+                if not (p.left.strip() and p.right.strip()): continue
+                lines.append('    <subquestion format="html">')
+                lines.append(f"      <text>{cdata(p.left)}</text>")
+                lines.append(f"      <answer><text>{cdata(p.right)}</text></answer>")
+                lines.append("    </subquestion>")
+            
+            # Distratores (lado direito extra)
+            for dist in q.distractors_right:
+                if dist.strip():
+                    lines.append(f'    <subquestion format="html"><text></text><answer><text>{cdata(dist)}</text></answer></subquestion>')
+
+    # --- RESPOSTA CURTA ---
+    elif xml_type == "shortanswer":
+        lines.append(f"    <usecase>{'1' if q.sa_case_sensitive else '0'}</usecase>")
+        ans = [a.strip() for a in q.accepted_answers if a.strip()]
+        if ans:
+            frac = 100  # Qualquer uma das aceites dá 100%
+            for a in ans:
+                lines.append(f'    <answer fraction="{frac}" format="moodle_auto_format">')
+                lines.append(f"      <text>{cdata(a)}</text>")
+                lines.append("    </answer>")
+
+    # --- ENSAIO (Texto Livre) ---
+    elif xml_type == "essay":
+        lines.append("    <responseformat>editor</responseformat>")
+        lines.append("    <responsetemplate format='html'><text></text></responsetemplate>")
+        if q.rubric:
+             # Se houver rubrica, pode-se colocar como info para o avaliador
+             lines.append(f"    <graderinfo format='html'><text>{cdata(q.rubric)}</text></graderinfo>")
+
+    # Fecha a pergunta principal
+    lines.append("  </question>")
+
+    # 5. INJEÇÃO AUTOMÁTICA DA PERGUNTA DE CORREÇÃO (Se ativada no V/F)
+    if mt == "truefalse" and q.tf_require_correction:
+        lines.append('  <question type="essay">')
+        name_corr = f"{q.title} (Correção)" if q.title else "Correção V/F"
+        
+        lines.append("    <name>")
+        lines.append(f"      <text>{xml_text(name_corr)}</text>")
+        lines.append("    </name>")
+        
+        lines.append('    <questiontext format="html">')
+        lines.append(f"      <text>{cdata(TF_CORRECTION_TEXT)}</text>")
+        lines.append("    </questiontext>")
+        
+        lines.append("    <defaultgrade>1.0</defaultgrade>")
+        lines.append("    <responseformat>editor</responseformat>")
+        # Correção das aspas para evitar erro de string
+        lines.append('    <responsetemplate format="html"><text></text></responsetemplate>')
+        lines.append("  </question>")
+
+    if compact:
+        return "".join([line.lstrip(" ") for line in lines if line.strip() not in _COMPACT_OMIT])
+    return "\n".join(lines)
+
+
+def _iter_compact(ta: TA, default_cat: str, cache: Optional[FragmentCache]) -> Iterator[str]:
+    # Agrupa as questões pela categoria final (pela ordem em que cada categoria aparece pela
+    # primeira vez; dentro do grupo mantém-se a ordem da ficha) e escreve cada categoria uma só vez.
+    groups: Dict[str, List[Question]] = {}
+    for q in ta.questions:
+        groups.setdefault(_resolved_category(q, default_cat), []).append(q)
+
+    for cat, questions in groups.items():
+        yield _category_xml(cat, compact=True)
+        for q in questions:
+            if cache is None:
+                yield _question_xml(q, ta, default_cat, compact=True)
+            else:
+                yield cache.fragment(q, ta, default_cat, compact=True)
+
+
+def iter_moodle_xml(ta: TA, cache: Optional[FragmentCache] = None, compact: bool = False) -> Iterator[str]:
+    """
+    Gera o XML do Moodle em pedaços (um por questão), sem nunca montar o ficheiro inteiro em memória.
+    A concatenação dos pedaços é exatamente igual ao resultado de build_moodle_xml_stub.
+    Se `cache` for dada, os fragmentos de questões já vistas são reaproveitados.
+
+    Com compact=True, as questões são agrupadas por categoria (um bloco de categoria por grupo),
+    sem indentação nem elementos vazios. O banco importado no Moodle é equivalente.
+    """
+    default_cat = _default_category(ta)
+
+    if compact:
+        yield '<?xml version="1.0" encoding="UTF-8"?>\n<quiz>'
+        yield from _iter_compact(ta, default_cat, cache)
+        yield "</quiz>\n"
+        return
+
+    # Cabeçalho padrão do Moodle XML
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n<quiz>'
+
+    for q in ta.questions:
+        if cache is None:
+            yield "\n" + _question_xml(q, ta, default_cat)
+        else:
+            yield "\n" + cache.fragment(q, ta, default_cat)
+
+    yield "\n</quiz>"
+
+
+def write_moodle_xml(ta: TA, fileobj: IO, encoding: str = "utf-8", cache: Optional[FragmentCache] = None,
+                     compact: bool = False) -> int:
+    """
+    Escreve o XML diretamente para qualquer objeto com .write() (ficheiro, gzip, resposta HTTP...).
+    Aceita destinos de texto ou binários (nestes, o texto é codificado em `encoding`).
+    Devolve o número de caracteres escritos.
+    """
+    binary = isinstance(fileobj, (io.RawIOBase, io.BufferedIOBase)) or "b" in str(getattr(fileobj, "mode", ""))
+    written = 0
+    for chunk in iter_moodle_xml(ta, cache=cache, compact=compact):
+        fileobj.write(chunk.encode(encoding) if binary else chunk)
+        written += len(chunk)
+    return written
+
+
+@timed()
+def build_moodle_xml_stub(ta: TA, cache: Optional[FragmentCache] = None, compact: bool = False) -> str:
+    """
+    Gera o XML compatível com Moodle para importação.
+    Suporta: Cloze, V/F (Simples e Matriz), Escolha Múltipla, Associação, Texto e Ensaio.
+    Com `cache` (ex: FRAGMENT_CACHE), os fragmentos de questões já vistas são reaproveitados.
+    compact=True agrupa por categoria e remove indentação (ver iter_moodle_xml).
+    Para fichas muito grandes, preferir write_moodle_xml (escreve em streaming).
+    """
+    return "".join(iter_moodle_xml(ta, cache=cache, compact=compact))
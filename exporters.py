@@ -0,0 +1,373 @@
+# exporters.py
+# Registo de formatos de exportação (MoodleXML, GIFT, Aiken).
+#
+# Cada formato é um "emissor" que recebe as questões uma a uma (a ficha é percorrida uma só vez)
+# e devolve pedaços de texto; nada é acumulado em memória. As questões que um formato não
+# consegue representar são saltadas e ficam no relatório como AVISO.
+#
+# Para a interface, cached_export guarda o ficheiro já gerado (em bytes) por ficha e formato,
+# enquanto a ficha não mudar: os reruns da vista de exportação não voltam a gerar nada.
+import gzip
+import io
+from abc import ABC, abstractmethod
+import os
+import sys
+from dataclasses import dataclass, field, fields
+from typing import IO, Dict, Iterator, List, Optional, Tuple, Type
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
+
+from cache import LRUCache  # noqa: E402
+from models import TA, Question, ValidationIssue  # noqa: E402
+from export import (FRAGMENT_CACHE, TF_CORRECTION_TEXT, FragmentCache, _default_category,  # noqa: E402
+                    _question_xml, _resolved_category, iter_moodle_xml)
+from text_encoding import gift_text  # noqa: E402
+
+
+class SkipQuestion(Exception):
+    """Lançada por um emissor quando a questão não pode ser representada no formato."""
+
+
+class Exporter(ABC):
+    """
+    Base dos emissores. Subclasses definem name/label/extension/mime e implementam
+    begin (cabeçalho), emit (uma questão) e end (rodapé); todos devolvem texto.
+    É criada uma instância nova por exportação, por isso o emissor pode guardar estado
+    (ex: a categoria atual) sem conflitos entre sessões.
+    """
+
+    name = ""
+    label = ""
+    extension = ""
+    mime = "text/plain"
+    # Cache de fragmentos por questão, para os formatos que a usam (ver iter_export)
+    fragments: Optional[FragmentCache] = None
+
+    def begin(self, ta: TA) -> str:
+        return ""
+
+    @abstractmethod
+    def emit(self, q: Question, ta: TA) -> str:
+        """Texto de uma questão; lança SkipQuestion se o formato não a consegue representar."""
+
+    def end(self, ta: TA) -> str:
+        return ""
+
+    def iter_chunks(self, ta: TA, skipped: List[ValidationIssue]) -> Iterator[str]:
+        head = self.begin(ta)
+        if head:
+            yield head
+        for i, q in enumerate(ta.questions, start=1):
+            try:
+                chunk = self.emit(q, ta)
+            except SkipQuestion as e:
+                skipped.append(ValidationIssue("AVISO", f"Questão {i}", f"Ignorada no formato {self.label}: {e}", qid=q.qid))
+                continue
+            if chunk:
+                yield chunk
+        tail = self.end(ta)
+        if tail:
+            yield tail
+
+
+# Registo global: nome curto -> classe do emissor
+EXPORTERS: Dict[str, Type[Exporter]] = {}
+
+
+def register_exporter(cls: Type[Exporter]) -> Type[Exporter]:
+    """Regista um formato (pode ser usado como decorador de classe)."""
+    EXPORTERS[cls.name] = cls
+    return cls
+
+
+def get_exporter(name: str) -> Exporter:
+    try:
+        return EXPORTERS[name]()
+    except KeyError:
+        raise ValueError(f"Formato de exportação desconhecido: {name!r} (disponíveis: {', '.join(EXPORTERS)})")
+
+
+def iter_export(ta: TA, fmt: str, skipped: Optional[List[ValidationIssue]] = None,
+                fragments: Optional[FragmentCache] = None) -> Iterator[str]:
+    """
+    Gera o ficheiro no formato `fmt` em pedaços. As questões saltadas vão para `skipped`.
+    Com `fragments`, os formatos que o suportam reaproveitam as questões já serializadas.
+    """
+    exporter = get_exporter(fmt)
+    exporter.fragments = fragments
+    return exporter.iter_chunks(ta, skipped if skipped is not None else [])
+
+
+def write_export(ta: TA, fmt: str, fileobj: IO, encoding: str = "utf-8",
+                 fragments: Optional[FragmentCache] = None) -> List[ValidationIssue]:
+    """Escreve diretamente para um ficheiro (texto ou binário). Devolve as questões saltadas."""
+    skipped: List[ValidationIssue] = []
+    binary = isinstance(fileobj, (io.RawIOBase, io.BufferedIOBase)) or "b" in str(getattr(fileobj, "mode", ""))
+    for chunk in iter_export(ta, fmt, skipped, fragments):
+        fileobj.write(chunk.encode(encoding) if binary else chunk)
+    return skipped
+
+
+def export_text(ta: TA, fmt: str) -> Tuple[str, List[ValidationIssue]]:
+    """Atalho para a interface: devolve (texto completo, questões saltadas)."""
+    skipped: List[ValidationIssue] = []
+    return "".join(iter_export(ta, fmt, skipped)), skipped
+
+
+# ==============================================================================
+# EXPORTAÇÃO EM CACHE (interface)
+# ==============================================================================
+# Os ficheiros gerados ficam numa cache de cada sessão (new_export_cache, guardada em
+# st.session_state): formato -> (lista de questões, versão, campos da ficha, ExportResult).
+# Uma cache global do processo manteria vivas as fichas e os ficheiros de sessões já terminadas.
+
+# Campos da ficha que entram no ficheiro exportado (o estado é recalculado a cada validação
+# e não muda o ficheiro)
+_TA_HEADER_FIELDS = tuple(f.name for f in fields(TA) if f.name not in ("questions", "status", "last_validation"))
+
+
+def new_export_cache() -> LRUCache:
+    """Cache de ficheiros exportados de uma sessão: um por formato, só da ficha atual."""
+    return LRUCache(maxsize=max(1, len(EXPORTERS)))
+
+
+@dataclass
+class ExportResult:
+    """Ficheiro exportado (UTF-8) e questões saltadas. A versão comprimida e os inícios das
+    linhas (pré-visualização) só são calculados quando pedidos, e uma só vez."""
+
+    data: bytes
+    skipped: List[ValidationIssue]
+    _gz: Optional[bytes] = field(default=None, repr=False)
+    _line_starts: Optional[List[int]] = field(default=None, repr=False)
+
+    def gzipped(self) -> bytes:
+        if self._gz is None:
+            # mtime=0: o mesmo conteúdo dá sempre os mesmos bytes
+            self._gz = gzip.compress(self.data, compresslevel=6, mtime=0)
+        return self._gz
+
+    def _starts_upto(self, n: int) -> List[int]:
+        """Inícios das primeiras n linhas (ou de todas, se houver menos); só lê o que falta."""
+        if self._line_starts is None:
+            self._line_starts = [0]
+        starts, data = self._line_starts, self.data
+        while len(starts) < n:
+            pos = data.find(b"\n", starts[-1])
+            if pos == -1 or pos + 1 == len(data):
+                break
+            starts.append(pos + 1)
+        return starts
+
+    @property
+    def n_lines(self) -> int:
+        if not self.data:
+            return 0
+        return self.data.count(b"\n") + (not self.data.endswith(b"\n"))
+
+    def lines(self, start: int, count: int) -> str:
+        """Texto das linhas [start, start+count) (para a pré-visualização paginada)."""
+        end = start + count
+        starts = self._starts_upto(end + 1)
+        if not self.data or start >= len(starts):
+            return ""
+        stop = starts[end] if end < len(starts) else len(self.data)
+        return self.data[starts[start]:stop].decode("utf-8", errors="replace")
+
+
+def cached_export(ta: TA, fmt: str, cache: Optional[LRUCache] = None) -> ExportResult:
+    """
+    O ficheiro da ficha no formato `fmt`, gerado só quando a ficha mudou desde a última vez
+    que passou por `cache` (ver new_export_cache; sem cache é sempre gerado). A versão da ficha
+    é a da sua QuestionList (muda a cada alteração) mais os campos da ficha; numa lista sem
+    versão (ex: uma list simples) o ficheiro é sempre gerado. Outra ficha na mesma cache
+    substitui a anterior.
+    """
+    questions = ta.questions
+    version = getattr(questions, "version", None)
+    header = tuple(getattr(ta, name) for name in _TA_HEADER_FIELDS)
+    key = fmt
+    if cache is not None and version is not None:
+        entry = cache.get(key)
+        if entry is not None and entry[0] is questions and entry[1] == version and entry[2] == header:
+            return entry[3]
+    buf = io.BytesIO()
+    # A interface reexporta a mesma ficha muitas vezes: aqui a cache de fragmentos compensa
+    skipped = write_export(ta, fmt, buf, fragments=FRAGMENT_CACHE)
+    result = ExportResult(buf.getvalue(), skipped)
+    if cache is not None and version is not None:
+        cache.put(key, (questions, version, header, result))
+    return result
+
+
+def _question_name(q: Question, ta: TA) -> str:
+    return q.title.strip() or f"{ta.ta_name} - Questão {q.qid[:5]}"
+
+
+# ------------------------------------------------------------------------------
+# MoodleXML (o export completo de export.py)
+# ------------------------------------------------------------------------------
+@register_exporter
+class MoodleXMLExporter(Exporter):
+    name = "moodlexml"
+    label = "MoodleXML"
+    extension = "xml"
+    mime = "application/xml"
+
+    def __init__(self, compact: bool = False):
+        self.compact = compact
+
+    def iter_chunks(self, ta: TA, skipped: List[ValidationIssue]) -> Iterator[str]:
+        # O MoodleXML representa todos os tipos: nada é saltado. O ficheiro vem inteiro de
+        # export.py (que no modo compacto agrupa as questões por categoria)
+        return iter_moodle_xml(ta, cache=self.fragments, compact=self.compact)
+
+    def emit(self, q: Question, ta: TA) -> str:
+        # Uma questão isolada (fora do ficheiro), com a categoria por defeito da ficha
+        default_cat = _default_category(ta)
+        if self.fragments is None:
+            return _question_xml(q, ta, default_cat, self.compact)
+        return self.fragments.fragment(q, ta, default_cat, compact=self.compact)
+
+
+# ------------------------------------------------------------------------------
+# GIFT
+# ------------------------------------------------------------------------------
+def _gift_fraction(value: float) -> str:
+    return f"{value:.5f}".rstrip("0").rstrip(".")
+
+
+@register_exporter
+class GIFTExporter(Exporter):
+    name = "gift"
+    label = "GIFT"
+    extension = "gift.txt"
+    mime = "text/plain"
+
+    def __init__(self):
+        self._current_cat: Optional[str] = None
+        self._default_cat = ""
+
+    def begin(self, ta: TA) -> str:
+        # Categoria por defeito (Curso / Tema / Nome da Ficha), calculada uma vez por ficha
+        self._default_cat = _default_category(ta)
+        return f"// {ta.ta_name} ({ta.course} / {ta.theme})\n\n"
+
+    def _head(self, q: Question, ta: TA) -> List[str]:
+        out = []
+        cat = _resolved_category(q, self._default_cat)
+        if cat != self._current_cat:
+            out.append(f"$CATEGORY: $course$/{cat}\n\n")
+            self._current_cat = cat
+        out.append(f"::{gift_text(_question_name(q, ta))}::[html]{gift_text(q.prompt)}")
+        return out
+
+    def _feedback(self, q: Question) -> str:
+        fb = q.meta.feedback_general.strip()
+        return f" ####{gift_text(fb)}" if fb else ""
+
+    def emit(self, q: Question, ta: TA) -> str:
+        mt = q.moodle_type
+
+        if mt == "description":
+            return "".join(self._head(q, ta)) + "\n\n"
+
+        if mt in ("cloze", "cloze_mc"):
+            raise SkipQuestion("o GIFT não suporta texto com lacunas (Cloze).")
+
+        body: List[str] = []
+        extra = ""
+
+        if mt.startswith("multichoice"):
+            opts = [o for o in q.options if o.text.strip()]
+            if mt == "multichoice_single":
+                for o in opts:
+                    body.append(("=" if o.is_correct else "~") + gift_text(o.text)
+                                + (f"#{gift_text(o.feedback)}" if o.feedback.strip() else ""))
+            else:
+                n_correct = max(1, sum(1 for o in opts if o.is_correct))
+                for o in opts:
+                    frac = _gift_fraction(100 / n_correct) if o.is_correct else "0"
+                    body.append(f"~%{frac}%{gift_text(o.text)}"
+                                + (f"#{gift_text(o.feedback)}" if o.feedback.strip() else ""))
+
+        elif mt == "truefalse":
+            if len(q.options) <= 1:
+                is_true = q.options[0].is_correct if q.options else True
+                body.append("T" if is_true else "F")
+            else:
+                # Matriz V/F como associação; o GIFT não tem respostas "órfãs", por isso
+                # é preciso que apareçam as duas respostas (V e F) entre as afirmações
+                stmts = [o for o in q.options if o.text.strip()]
+                if len({o.is_correct for o in stmts}) < 2:
+                    raise SkipQuestion("matriz V/F com todas as respostas iguais precisa de um distrator, que o GIFT não suporta.")
+                for o in stmts:
+                    body.append(f"={gift_text(o.text)} -> {'Verdadeiro' if o.is_correct else 'Falso'}")
+            if q.tf_require_correction:
+                name_corr = f"{q.title} (Correção)" if q.title else "Correção V/F"
+                extra = f"::{gift_text(name_corr)}::[html]{gift_text(TF_CORRECTION_TEXT)}{{}}\n\n"
+
+        elif mt == "matching":
+            if any(d.strip() for d in q.distractors_right):
+                raise SkipQuestion("o GIFT não suporta respostas distratoras na associação.")
+            for p in q.pairs:
+                if p.left.strip() and p.right.strip():
+                    body.append(f"={gift_text(p.left)} -> {gift_text(p.right)}")
+
+        elif mt == "shortanswer":
+            if q.sa_case_sensitive:
+                raise SkipQuestion("o GIFT não permite respostas curtas sensíveis a maiúsculas.")
+            for a in q.accepted_answers:
+                if a.strip():
+                    body.append("=" + gift_text(a.strip()))
+
+        elif mt == "essay":
+            pass  # "{}" vazio = ensaio
+
+        else:
+            raise SkipQuestion(f"tipo '{mt}' não suportado.")
+
+        inner = " ".join(body) + self._feedback(q)
+        return "".join(self._head(q, ta)) + "{" + inner + "}\n\n" + extra
+
+
+# ------------------------------------------------------------------------------
+# Aiken (só escolha múltipla com uma resposta correta)
+# ------------------------------------------------------------------------------
+_AIKEN_LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def _one_line(s: str) -> str:
+    return " ".join((s or "").split())
+
+
+@register_exporter
+class AikenExporter(Exporter):
+    name = "aiken"
+    label = "Aiken"
+    extension = "aiken.txt"
+    mime = "text/plain"
+
+    def emit(self, q: Question, ta: TA) -> str:
+        mt = q.moodle_type
+        if mt == "multichoice_single":
+            opts = [(_one_line(o.text), o.is_correct) for o in q.options if o.text.strip()]
+        elif mt == "truefalse" and len(q.options) <= 1:
+            is_true = q.options[0].is_correct if q.options else True
+            opts = [("Verdadeiro", is_true), ("Falso", not is_true)]
+        else:
+            raise SkipQuestion(f"o Aiken só suporta escolha múltipla com 1 correta (tipo '{mt}').")
+
+        correct = [i for i, (_, ok) in enumerate(opts) if ok]
+        if len(correct) != 1:
+            raise SkipQuestion("o Aiken exige exatamente 1 opção correta.")
+        if len(opts) > len(_AIKEN_LETTERS):
+            raise SkipQuestion("demasiadas opções para o Aiken.")
+
+        lines = [_one_line(q.prompt)]
+        lines += [f"{_AIKEN_LETTERS[i]}. {text}" for i, (text, _) in enumerate(opts)]
+        lines.append(f"ANSWER: {_AIKEN_LETTERS[correct[0]]}")
+        return "\n".join(lines) + "\n\n"
+
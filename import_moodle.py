@@ -0,0 +1,335 @@
+# import_moodle.py
+# Importação de bancos de questões MoodleXML para objetos TA / Question.
+#
+# O ficheiro é lido em streaming (xml.etree.ElementTree.iterparse): cada <question> é convertida
+# e descartada logo a seguir, por isso a memória usada não depende do tamanho do ficheiro.
+#
+# Uso (linha de comandos):
+#   python import_moodle.py banco.xml -o ficha.json
+
+import argparse
+import gzip
+import os
+import re
+import sys
+import xml.etree.ElementTree as ET
+from typing import BinaryIO, Callable, Iterator, List, Optional, Tuple, Union
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
+
+from models import TA, Question, QuestionList, QuestionMeta, Blank, ChoiceOption, MatchPair, ValidationIssue, TYPE_TO_LABEL, compact_question  # noqa: E402
+from utils import new_id  # noqa: E402
+from export import TF_CORRECTION_TEXT  # noqa: E402
+
+# progress(bytes_lidos, bytes_totais, questões_importadas)
+ProgressFn = Callable[[int, int, int], None]
+
+# Respostas usadas pelo export.py na matriz V/F (V/F múltiplo exportado como "matching")
+TF_ANSWERS = ("Verdadeiro", "Falso")
+
+# Códigos Cloze: {1:SHORTANSWER:=bebe}, {1:MULTICHOICE:=a~b}, {2:SA:%50%x#fb~=y}...
+# O conteúdo termina na primeira "}" que não esteja escapada com "\"
+CLOZE_CODE_RE = re.compile(r"\{(\d*):([A-Z_]+):((?:\\.|[^\\}])*)\}")
+_CLOZE_ANSWER_SPLIT_RE = re.compile(r"(?<!\\)~")
+_CLOZE_FEEDBACK_SPLIT_RE = re.compile(r"(?<!\\)#")
+_CLOZE_FRACTION_RE = re.compile(r"^%(-?[\d.]+)%")
+_CLOZE_UNESCAPE_RE = re.compile(r"\\(.)")
+
+# Tipos de subpergunta Cloze que se apresentam como menu/lista de opções
+CLOZE_MC_CODES = {"MULTICHOICE", "MC", "MULTICHOICE_V", "MCV", "MULTICHOICE_H", "MCH",
+                  "MULTICHOICE_S", "MCS", "MULTICHOICE_VS", "MCVS", "MULTICHOICE_HS", "MCHS",
+                  "MULTIRESPONSE", "MR", "MULTIRESPONSE_H", "MRH", "MULTIRESPONSE_S", "MRS",
+                  "MULTIRESPONSE_HS", "MRHS"}
+
+# De quantas em quantas questões se chama o callback de progresso
+PROGRESS_EVERY = 500
+
+
+class _CountingReader:
+    """Envolve um ficheiro binário e conta os bytes lidos (para o progresso)."""
+
+    def __init__(self, raw: BinaryIO):
+        self.raw = raw
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.raw.read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def _text(elem: Optional[ET.Element], path: str = "text") -> str:
+    if elem is None:
+        return ""
+    node = elem.find(path) if path else elem
+    return (node.text or "") if node is not None else ""
+
+
+def _float(value: str, default: float = 0.0) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _bool(value: str) -> bool:
+    return value.strip().lower() in ("1", "true")
+
+
+def _unescape_cloze(s: str) -> str:
+    return _CLOZE_UNESCAPE_RE.sub(r"\1", s)
+
+
+def parse_cloze_text(text: str) -> Tuple[str, List[Blank]]:
+    """
+    Converte um enunciado Cloze do Moodle no formato do editor:
+    cada código {n:TIPO:...} passa a "[ ]" e dá origem a um Blank.
+    Respostas corretas (= ou %100%) vão para `answers`; nos tipos de menu, as restantes são `distractors`.
+    """
+    blanks: List[Blank] = []
+    parts: List[str] = []
+    last = 0
+    for m in CLOZE_CODE_RE.finditer(text):
+        parts.append(text[last:m.start()])
+        parts.append("[ ]")
+        last = m.end()
+
+        code = m.group(2)
+        correct: List[str] = []
+        wrong: List[str] = []
+        feedback = ""
+        for raw in _CLOZE_ANSWER_SPLIT_RE.split(m.group(3)):
+            pieces = _CLOZE_FEEDBACK_SPLIT_RE.split(raw, 1)
+            ans_text = pieces[0]
+            fb_text = pieces[1] if len(pieces) > 1 else ""
+            if ans_text.startswith("="):
+                is_correct, ans_text = True, ans_text[1:]
+            else:
+                frac = _CLOZE_FRACTION_RE.match(ans_text)
+                is_correct = bool(frac) and _float(frac.group(1)) >= 100
+                if frac:
+                    ans_text = ans_text[frac.end():]
+            ans_text = _unescape_cloze(ans_text).strip()
+            if is_correct:
+                correct.append(ans_text)
+                if fb_text and not feedback:
+                    feedback = _unescape_cloze(fb_text).strip()
+            elif ans_text:
+                wrong.append(ans_text)
+
+        is_mc = code in CLOZE_MC_CODES
+        blanks.append(Blank(
+            bid=new_id("b"),
+            label=f"L{len(blanks) + 1}",
+            answers=correct[:1] if is_mc else correct,
+            distractors=(correct[1:] + wrong) if is_mc else [],
+            case_sensitive=code.endswith("_C") or code == "SAC",
+            feedback=feedback,
+        ))
+    parts.append(text[last:])
+    return "".join(parts), blanks
+
+
+def _answers(qel: ET.Element) -> List[Tuple[float, str, str]]:
+    # (fração, texto, feedback) de cada <answer>
+    out = []
+    for a in qel.findall("answer"):
+        out.append((_float(a.get("fraction", "0")), _text(a), _text(a.find("feedback"))))
+    return out
+
+
+def _new_question(moodle_type: str, qel: ET.Element, category: str) -> Question:
+    q = Question(
+        qid=new_id("q"),
+        ui_type=TYPE_TO_LABEL.get(moodle_type, moodle_type),
+        moodle_type=moodle_type,
+        title=_text(qel.find("name")).strip(),
+        prompt=_text(qel.find("questiontext")),
+        meta=QuestionMeta(category=category),
+    )
+    grade = qel.find("defaultgrade")
+    if grade is not None and grade.text:
+        q.meta.points = _float(grade.text, 1.0)
+    q.meta.feedback_general = _text(qel.find("generalfeedback"))
+    return q
+
+
+def question_from_element(qel: ET.Element, category: str = "") -> Optional[Question]:
+    """Converte um elemento <question> do MoodleXML. Devolve None para tipos não suportados."""
+    xml_type = qel.get("type", "")
+
+    if xml_type == "multichoice":
+        single = _bool(_text(qel, "single") or "true")
+        q = _new_question("multichoice_single" if single else "multichoice_multi", qel, category)
+        q.shuffle_options = _bool(_text(qel, "shuffleanswers") or "true")
+        q.options = [ChoiceOption(new_id("o"), text, frac > 0, fb) for frac, text, fb in _answers(qel)]
+        return q
+
+    if xml_type == "truefalse":
+        q = _new_question("truefalse", qel, category)
+        is_true = any(frac > 0 and text.strip().lower() == "true" for frac, text, _ in _answers(qel))
+        q.truefalse_answer = is_true
+        q.options = [ChoiceOption(new_id("o"), "Verdadeiro", is_true)]
+        return q
+
+    if xml_type == "matching":
+        subs = [(_text(s), _text(s.find("answer"))) for s in qel.findall("subquestion")]
+        shuffle = _bool(_text(qel, "shuffleanswers") or "true")
+        real = [(left, right) for left, right in subs if left.strip()]
+
+        # Matriz V/F gerada pelo export.py: todas as respostas são "Verdadeiro"/"Falso"
+        if real and all(right in TF_ANSWERS for _, right in subs):
+            q = _new_question("truefalse", qel, category)
+            q.shuffle_options = shuffle
+            q.options = [ChoiceOption(new_id("o"), left, right == "Verdadeiro") for left, right in real]
+            return q
+
+        q = _new_question("matching", qel, category)
+        q.shuffle_pairs = shuffle
+        q.pairs = [MatchPair(new_id("p"), left, right) for left, right in real]
+        q.distractors_right = [right for left, right in subs if not left.strip() and right.strip()]
+        return q
+
+    if xml_type in ("cloze", "multianswer"):
+        q = _new_question("cloze", qel, category)
+        q.prompt, q.blanks = parse_cloze_text(q.prompt)
+        if any(b.distractors for b in q.blanks):
+            q.moodle_type = "cloze_mc"
+            q.ui_type = TYPE_TO_LABEL.get("cloze_mc", "cloze_mc")
+        return q
+
+    if xml_type == "shortanswer":
+        q = _new_question("shortanswer", qel, category)
+        q.sa_case_sensitive = _bool(_text(qel, "usecase") or "0")
+        q.accepted_answers = [text for frac, text, _ in _answers(qel) if frac > 0]
+        return q
+
+    if xml_type == "essay":
+        q = _new_question("essay", qel, category)
+        q.rubric = _text(qel.find("graderinfo"))
+        return q
+
+    if xml_type == "description":
+        q = _new_question("description", qel, category)
+        q.meta.points = 1.0
+        return q
+
+    return None
+
+
+def _open_source(source: Union[str, BinaryIO]) -> Tuple[BinaryIO, int, bool]:
+    # Devolve (ficheiro binário, tamanho total em bytes ou 0, se temos de o fechar)
+    if isinstance(source, str):
+        return open(source, "rb"), os.path.getsize(source), True
+    try:
+        total = os.fstat(source.fileno()).st_size
+    except (AttributeError, OSError, ValueError):
+        total = 0
+    return source, total, False
+
+
+def iter_moodle_questions(source: Union[str, BinaryIO], progress: Optional[ProgressFn] = None,
+                          skipped: Optional[List[Tuple[str, str]]] = None) -> Iterator[Question]:
+    """
+    Lê um MoodleXML em streaming e devolve as questões uma a uma.
+    As mudanças de categoria (<question type="category">) ficam em meta.category.
+    Tipos não suportados são ignorados e, se `skipped` for dada, registados como (nome, tipo).
+    As questões saem compactas (models.compact_question).
+    """
+    raw, total, owned = _open_source(source)
+    # O progresso conta bytes do ficheiro em disco (comprimidos, no caso de .gz)
+    reader = _CountingReader(raw)
+    stream = gzip.GzipFile(fileobj=reader) if isinstance(source, str) and source.endswith(".gz") else reader
+    category = ""
+    count = 0
+    # Guardamos o último V/F: se a questão seguinte for a "Correção" injetada pelo export.py,
+    # volta a ser a opção tf_require_correction em vez de um ensaio à parte.
+    pending: Optional[Question] = None
+    try:
+        context = ET.iterparse(stream, events=("start", "end"))
+        root = None
+        for event, elem in context:
+            if root is None:
+                root = elem
+            if event != "end" or elem.tag != "question":
+                continue
+
+            qtype = elem.get("type", "")
+            if qtype == "category":
+                cat = _text(elem.find("category")).strip()
+                category = cat[len("$course$/"):] if cat.startswith("$course$/") else cat
+            elif (qtype == "essay" and pending is not None
+                  and _text(elem.find("questiontext")).strip() == TF_CORRECTION_TEXT):
+                pending.tf_require_correction = True
+            else:
+                q = question_from_element(elem, category)
+                if q is None:
+                    if skipped is not None:
+                        skipped.append((_text(elem.find("name")).strip(), qtype))
+                else:
+                    if pending is not None:
+                        yield compact_question(pending)
+                    pending = q if q.moodle_type == "truefalse" else None
+                    if pending is None:
+                        yield compact_question(q)
+                    count += 1
+                    if progress and count % PROGRESS_EVERY == 0:
+                        progress(reader.bytes_read, total, count)
+
+            # Liberta o que já foi processado: a árvore nunca cresce para lá de uma questão
+            elem.clear()
+            root.clear()
+
+        if pending is not None:
+            yield compact_question(pending)
+        if progress:
+            progress(reader.bytes_read, total, count)
+    finally:
+        if owned:
+            raw.close()
+
+
+def import_moodle_xml(source: Union[str, BinaryIO], ta_name: str = "", progress: Optional[ProgressFn] = None) -> TA:
+    """
+    Importa um banco MoodleXML inteiro para uma nova ficha.
+    Questões de tipos não suportados ficam registadas como AVISO em ta.last_validation.
+    """
+    if not ta_name:
+        ta_name = os.path.splitext(os.path.basename(source))[0] if isinstance(source, str) else "Importação Moodle"
+    ta = TA(ta_id=new_id("ta"), ta_name=ta_name)
+    skipped: List[Tuple[str, str]] = []
+    ta.questions = QuestionList(iter_moodle_questions(source, progress=progress, skipped=skipped))
+    for name, qtype in skipped:
+        ta.last_validation.append(ValidationIssue(
+            "AVISO", "Importação", f"Questão '{name}' ignorada: tipo '{qtype}' não suportado."))
+    return ta
+
+
+def _print_progress(done: int, total: int, n: int):
+    pct = f"{100 * done / total:5.1f}%" if total else "  ?  "
+    print(f"\r{pct}  {done / 1e6:8.1f} MB  {n} questões", end="", file=sys.stderr, flush=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from serialization import save_ta_json
+
+    parser = argparse.ArgumentParser(description="Importa um banco MoodleXML para uma ficha BabeliUM (JSON).")
+    parser.add_argument("source", help="Ficheiro MoodleXML (.xml ou .xml.gz)")
+    parser.add_argument("-o", "--output", help="Ficheiro JSON de saída (default: <source>.json)")
+    parser.add_argument("--name", default="", help="Nome da ficha (default: nome do ficheiro)")
+    args = parser.parse_args(argv)
+
+    ta = import_moodle_xml(args.source, ta_name=args.name, progress=_print_progress)
+    print(file=sys.stderr)
+    output = args.output or os.path.splitext(args.source)[0] + ".json"
+    save_ta_json(ta, output)
+    print(f"{len(ta.questions)} questões importadas para {output}")
+    for issue in ta.last_validation:
+        print(f"{issue.level}: {issue.message}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
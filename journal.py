@@ -0,0 +1,343 @@
+# journal.py
+# Diário de edições (append-only) para gravação automática à prova de falhas.
+#
+# Cada ficha com gravação automática tem dois ficheiros na pasta de dados:
+#   <ta_id>.babta     fotografia completa (storage.py), com o nº do último registo que inclui
+#   <ta_id>.journal   registos JSON, um por linha, acrescentados a cada operação e com fsync
+# As operações são ao nível da questão: create (questão completa), update (só os campos que
+# mudaram), delete, move, reorder (nova ordem da ficha inteira) e header (campos da ficha).
+# Acrescentar custa uma linha pequena, em vez de regravar a ficha inteira.
+#
+# Ao abrir, lê-se a fotografia (com descodificação a pedido) e repetem-se os registos com número
+# superior ao dela; só as questões tocadas por um update são descodificadas. Uma última linha
+# incompleta (o processo morreu a meio da escrita) é descartada. A compactação grava uma nova
+# fotografia e esvazia o diário; se o processo morrer entre os dois passos, os números dos
+# registos evitam que sejam aplicados duas vezes.
+#
+# Numa sessão sobre o banco partilhado (shared_bank.py) a fotografia guarda só a camada da
+# sessão e o caminho do banco; ao abrir, a camada é reposta sobre o banco.
+import json
+import os
+import re
+import sys
+from dataclasses import asdict, fields, is_dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
+
+from models import TA, Question, compact_question, shallow_copy_question  # noqa: E402
+from serialization import question_field_from_dict, question_from_dict, question_to_dict  # noqa: E402
+from storage import EXTENSION, open_ta, save_ta  # noqa: E402
+from shared_bank import SharedTA, is_session_ta, load_session_ta, load_shared_ta, save_session_ta  # noqa: E402
+
+JOURNAL_EXTENSION = ".journal"
+# Registos acumulados que disparam uma compactação
+COMPACT_EVERY = 5000
+
+_QUESTION_FIELDS = tuple(f.name for f in fields(Question))
+# Campos da ficha registados pelas operações "header". O estado e a última validação são
+# recalculados a cada validação: registá-los faria de cada abertura da exportação uma edição
+HEADER_FIELDS = tuple(f.name for f in fields(TA) if f.name not in ("ta_id", "questions", "status", "last_validation"))
+_SAFE_ID_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+_DECODER = json.JSONDecoder()
+_fsync = getattr(os, "fdatasync", os.fsync)
+
+
+class JournalError(ValueError):
+    """Registo do diário que não se pode repetir: mal formado ou sobre uma questão que não existe."""
+
+
+def snapshot_path(folder: str, ta_id: str) -> str:
+    """Caminho da fotografia de uma ficha (o ta_id vem do URL, por isso é validado)."""
+    if not _SAFE_ID_RE.match(ta_id or ""):
+        raise ValueError(f"Identificador de ficha inválido: {ta_id!r}")
+    return os.path.join(folder, f"{ta_id}{EXTENSION}")
+
+
+def _journal_path(snapshot: str) -> str:
+    return snapshot[: -len(EXTENSION)] + JOURNAL_EXTENSION if snapshot.endswith(EXTENSION) else snapshot + JOURNAL_EXTENSION
+
+
+def _to_json(value: Any) -> Any:
+    if is_dataclass(value):
+        return asdict(value)
+    if isinstance(value, (list, tuple)):
+        return [asdict(v) if is_dataclass(v) else v for v in value]
+    return value
+
+
+def _same(a: Any, b: Any) -> bool:
+    if a is b:
+        return True
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(x is y or x == y for x, y in zip(a, b))
+    return a == b
+
+
+def question_delta(old: Question, new: Question) -> Dict[str, Any]:
+    """Campos de `new` diferentes de `old`, já em JSON (os objetos partilhados comparam-se por identidade)."""
+    return {name: _to_json(getattr(new, name)) for name in _QUESTION_FIELDS
+            if not _same(getattr(old, name), getattr(new, name))}
+
+
+def _header_of(ta: TA) -> Dict[str, Any]:
+    return {name: getattr(ta, name) for name in HEADER_FIELDS}
+
+
+# ==============================================================================
+# REPETIÇÃO (REPLAY)
+# ==============================================================================
+
+def _qid_at(questions, i: int) -> str:
+    qid = getattr(questions, "qid", None)
+    return qid(i) if qid is not None else questions[i].qid
+
+
+_OPS = ("update", "create", "delete", "move", "reorder", "header")
+# Operações sobre uma questão que já tem de existir
+_QID_OPS = ("update", "delete", "move")
+
+
+def apply_records(ta: TA, records: List[Dict[str, Any]]) -> None:
+    """
+    Aplica os registos à ficha, por ordem. Durante a repetição as questões ficam num dicionário
+    por qid (os updates, a maioria, não mexem na ordem) e a ordem numa lista de qids; a lista de
+    questões só é refeita no fim. Numa LazyQuestionList as questões não tocadas ficam por ler.
+    Um registo inválido (mal formado, ou sobre uma questão que não existe) dá JournalError.
+    """
+    questions = ta.questions
+    # qid -> posição original (int) ou questão já alterada/criada
+    current: Dict[str, Any] = {}
+    # qids internados: list.index compara primeiro por identidade, sem comparar os caracteres
+    order: List[str] = []
+    for i in range(len(questions)):
+        qid = sys.intern(_qid_at(questions, i))
+        current[qid] = i
+        order.append(qid)
+
+    for rec in records:
+        try:
+            order = _apply_record(ta, questions, current, order, rec)
+        except JournalError:
+            raise
+        except (KeyError, IndexError, TypeError, ValueError, AttributeError) as e:
+            raise JournalError(f"Registo {_describe(rec)} inválido: {type(e).__name__}: {e}") from e
+
+    items = [current[qid] for qid in order]
+    if hasattr(questions, "rebuild"):
+        questions.rebuild(items)
+    else:
+        questions[:] = [questions[x] if type(x) is int else x for x in items]
+
+
+def _describe(rec: Any) -> str:
+    if not isinstance(rec, dict):
+        return repr(rec)[:60]
+    return f"nº {rec.get('seq', '?')} ({rec.get('op', '?')})"
+
+
+def _apply_record(ta: TA, questions, current: Dict[str, Any], order: List[str], rec: Dict[str, Any]) -> List[str]:
+    # Um registo; devolve a ordem (o reorder cria uma lista nova)
+    op = rec.get("op") if isinstance(rec, dict) else None
+    if op not in _OPS:
+        raise JournalError(f"Registo {_describe(rec)}: operação desconhecida.")
+    if op in _QID_OPS and rec.get("qid") not in current:
+        raise JournalError(f"Registo {_describe(rec)}: a questão {rec.get('qid')!r} não existe na ficha.")
+    if op == "update":
+        qid = rec["qid"]
+        q = current[qid]
+        q = shallow_copy_question(questions[q] if type(q) is int else q)
+        for name, value in rec["delta"].items():
+            if name in _QUESTION_FIELDS:
+                setattr(q, name, question_field_from_dict(name, value))
+        current[qid] = compact_question(q)
+    elif op == "create":
+        q = question_from_dict(rec["q"])
+        qid = sys.intern(q.qid)
+        if qid in current:
+            raise JournalError(f"Registo {_describe(rec)}: a questão {qid!r} já existe na ficha.")
+        current[qid] = q
+        order.insert(min(rec.get("pos", len(order)), len(order)), qid)
+    elif op == "delete":
+        qid = sys.intern(rec["qid"])
+        order.remove(qid)
+        del current[qid]
+    elif op == "move":
+        qid = sys.intern(rec["qid"])
+        order.remove(qid)
+        order.insert(rec["to"], qid)
+    elif op == "reorder":
+        # Mesma regra de QuestionList.reorder: as que não vêm no registo ficam no fim
+        listed = list(dict.fromkeys(sys.intern(qid) for qid in rec["qids"] if qid in current))
+        seen = set(listed)
+        order = listed + [qid for qid in order if qid not in seen]
+    elif op == "header":
+        for name, value in rec["fields"].items():
+            if name in HEADER_FIELDS:
+                setattr(ta, name, value)
+    return order
+
+
+def read_records(path: str, after_seq: int = 0, repair: bool = True) -> List[Dict[str, Any]]:
+    """
+    Registos do diário com número > after_seq. Pára na primeira linha incompleta ou inválida
+    e, com repair=True, corta o ficheiro nesse ponto (as linhas seguintes não são de confiança).
+    Um registo completo sem número inteiro ("seq") dá JournalError.
+    """
+    records: List[Dict[str, Any]] = []
+    if not os.path.exists(path):
+        return records
+    with open(path, "rb") as f:
+        data = f.read()
+    # Só as linhas completas; uma linha com UTF-8 cortado ao meio é tratada como inválida
+    complete = data[:data.rfind(b"\n") + 1]
+    try:
+        lines = complete.decode("utf-8").split("\n")[:-1]
+    except UnicodeDecodeError:
+        lines = [raw.decode("utf-8", errors="replace") for raw in complete.split(b"\n")[:-1]]
+    decode = _DECODER.decode
+    n_good = 0
+    for line in lines:
+        try:
+            rec = decode(line)
+        except ValueError:
+            break
+        if not isinstance(rec, dict):
+            break
+        seq = rec.get("seq")
+        if type(seq) is not int:
+            raise JournalError(f"Registo {_describe(rec)}: número de registo inválido ({seq!r}).")
+        if seq > after_seq:
+            records.append(rec)
+        n_good += 1
+    good_end = len(complete) if n_good == len(lines) else sum(len(x.encode("utf-8")) + 1 for x in lines[:n_good])
+    if repair and good_end < len(data):
+        with open(path, "r+b") as f:
+            f.truncate(good_end)
+            f.flush()
+            _fsync(f.fileno())
+    return records
+
+
+# ==============================================================================
+# DIÁRIO
+# ==============================================================================
+
+class Journal:
+    """
+    Diário de uma ficha. As operações log_* são chamadas depois de a alteração ser feita em
+    memória; o primeiro registo grava a fotografia inicial (assim fichas novas que nunca
+    foram editadas não deixam ficheiros).
+    """
+
+    def __init__(self, snapshot: str, ta: TA, seq: int = 0, pending: int = 0,
+                 fsync: bool = True, compact_every: int = COMPACT_EVERY):
+        self.snapshot = snapshot
+        self.path = _journal_path(snapshot)
+        self.ta = ta
+        self.seq = seq
+        self.pending = pending
+        self.fsync = fsync
+        self.compact_every = compact_every
+        self._header = _header_of(ta)
+        self._f = None
+
+    @classmethod
+    def for_ta(cls, folder: str, ta: TA, **kwargs) -> "Journal":
+        return cls(snapshot_path(folder, ta.ta_id), ta, **kwargs)
+
+    @classmethod
+    def recover(cls, snapshot: str, load_bank: Callable[[str], SharedTA] = load_shared_ta,
+                repair: bool = True, **kwargs) -> "Journal":
+        """
+        Reconstrói a ficha: fotografia + registos do diário posteriores a ela. Uma sessão sobre
+        o banco partilhado é reposta sobre o banco devolvido por load_bank(caminho).
+        Com repair=False o diário não é cortado numa linha incompleta (ver read_records).
+        """
+        stored = open_ta(snapshot)
+        extra = stored.header.get("extra", {})
+        ta = load_session_ta(stored, load_bank) if "bank" in extra else stored.to_ta(lazy=True)
+        seq = extra.get("journal_seq", 0)
+        records = read_records(_journal_path(snapshot), after_seq=seq, repair=repair)
+        apply_records(ta, records)
+        if records:
+            seq = records[-1]["seq"]
+        return cls(snapshot, ta, seq=seq, pending=len(records), **kwargs)
+
+    @property
+    def started(self) -> bool:
+        return os.path.exists(self.snapshot)
+
+    # --- Escrita ---
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        if not self.started:
+            # Primeira operação: a fotografia já inclui a alteração
+            self.compact()
+            return
+        self.seq += 1
+        record["seq"] = self.seq
+        if self._f is None:
+            self._f = open(self.path, "ab")
+        self._f.write((_ENCODER.encode(record) + "\n").encode("utf-8"))
+        self._f.flush()
+        if self.fsync:
+            _fsync(self._f.fileno())
+        self.pending += 1
+        if self.pending >= self.compact_every:
+            self.compact()
+
+    def log_create(self, pos: int, q: Question) -> None:
+        self._append({"op": "create", "pos": pos, "q": question_to_dict(q)})
+
+    def log_update(self, old: Question, new: Question) -> None:
+        delta = question_delta(old, new)
+        if delta:
+            self._append({"op": "update", "qid": new.qid, "delta": delta})
+
+    def log_delete(self, qid: str) -> None:
+        self._append({"op": "delete", "qid": qid})
+
+    def log_move(self, qid: str, to: int) -> None:
+        self._append({"op": "move", "qid": qid, "to": to})
+
+    def log_reorder(self, qids: List[str]) -> None:
+        self._append({"op": "reorder", "qids": list(qids)})
+
+    def log_header(self) -> None:
+        """Regista os campos da ficha que mudaram desde o último registo (nada, se nenhum mudou)."""
+        current = _header_of(self.ta)
+        changed = {k: v for k, v in current.items() if self._header.get(k) != v}
+        if changed:
+            self._header = current
+            self._append({"op": "header", "fields": changed})
+
+    # --- Compactação ---
+
+    def compact(self) -> None:
+        """Grava a fotografia da ficha (numa sessão sobre o banco, só a camada) e esvazia o diário."""
+        os.makedirs(os.path.dirname(self.snapshot) or ".", exist_ok=True)
+        save = save_session_ta if is_session_ta(self.ta) else save_ta
+        save(self.ta, self.snapshot, extra={"journal_seq": self.seq})
+        self.close()
+        with open(self.path, "wb") as f:
+            _fsync(f.fileno())
+        self.pending = 0
+        self._header = _header_of(self.ta)
+
+    def close(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+
+def read_ficha(snapshot: str) -> TA:
+    """
+    A ficha gravada pela aplicação (fotografia .babta + diário), só para leitura: para as
+    ferramentas de linha de comandos, que podem correr com a aplicação a escrever no diário.
+    """
+    return Journal.recover(snapshot, repair=False).ta
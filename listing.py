@@ -0,0 +1,109 @@
+# listing.py
+# Filtros e paginação da lista de questões do editor de ficha.
+#
+# A vista só desenha a página visível. Sem filtros, as posições da página são calculadas sem
+# tocar nas questões (o custo de um rerun não depende do tamanho da ficha). Com filtros,
+# a ficha é percorrida uma vez, da forma mais barata possível:
+#   - tipo, secção e título de questões ainda não lidas de um .babta vêm do índice do ficheiro
+#     (LazyQuestionList.entry), sem descodificar a questão;
+#   - a pesquisa de texto só descodifica a questão se o título não bastar;
+#   - o estado de validação usa a cache de validação (só revalida as questões alteradas).
+import os
+import sys
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
+
+from models import Question  # noqa: E402
+from validators import VALIDATION_CACHE, ValidationCache, check_question  # noqa: E402
+
+# Estado de validação: rótulo mostrado -> nível procurado ("" = sem problemas, None = todas)
+STATUS_FILTERS = {
+    "Todas": None,
+    "Com erros": "ERRO",
+    "Com avisos": "AVISO",
+    "Sem problemas": "",
+}
+PAGE_SIZES = (10, 25, 50, 100)
+
+
+@dataclass(frozen=True)
+class ListFilter:
+    types: Tuple[str, ...] = ()
+    sections: Tuple[str, ...] = ()
+    text: str = ""
+    status: str = "Todas"
+
+    def active(self) -> bool:
+        return bool(self.types or self.sections or self.text.strip() or STATUS_FILTERS.get(self.status) is not None)
+
+
+def _row(questions: Sequence[Question], i: int) -> Tuple[str, str, str]:
+    """(ui_type, section, title) da questão i, do índice do ficheiro se ainda não foi lida."""
+    entry = getattr(questions, "entry", None)
+    e = entry(i) if entry is not None else None
+    if e is not None:
+        return e.ui_type, e.section, e.title
+    q = questions[i]
+    return q.ui_type, q.section, q.title
+
+
+def question_status(q: Question, cache: Optional[ValidationCache] = VALIDATION_CACHE) -> str:
+    """"ERRO", "AVISO" ou "" (sem problemas): o nível mais grave das regras da questão."""
+    templates = cache.issues_for(q) if cache is not None else check_question(q)
+    levels = {t[0] for t in templates}
+    if "ERRO" in levels:
+        return "ERRO"
+    return "AVISO" if levels else ""
+
+
+def list_facets(questions: Sequence[Question]) -> Tuple[List[str], List[str]]:
+    """(tipos, secções) presentes na ficha, pela ordem em que aparecem (opções dos filtros)."""
+    types, sections = {}, {}
+    for i in range(len(questions)):
+        ui_type, section, _ = _row(questions, i)
+        types.setdefault(ui_type, None)
+        sections.setdefault(section, None)
+    return list(types), list(sections)
+
+
+def filter_positions(questions: Sequence[Question], flt: ListFilter,
+                     cache: Optional[ValidationCache] = VALIDATION_CACHE) -> Sequence[int]:
+    """Posições (em ta.questions) das questões que passam o filtro, pela ordem da ficha."""
+    if not flt.active():
+        return range(len(questions))
+    types = frozenset(flt.types)
+    sections = frozenset(flt.sections)
+    needle = flt.text.strip().casefold()
+    level = STATUS_FILTERS.get(flt.status)
+
+    out: List[int] = []
+    for i in range(len(questions)):
+        ui_type, section, title = _row(questions, i)
+        if types and ui_type not in types:
+            continue
+        if sections and section not in sections:
+            continue
+        if needle and needle not in title.casefold() and needle not in questions[i].prompt.casefold():
+            continue
+        if level is not None and question_status(questions[i], cache) != level:
+            continue
+        out.append(i)
+    return out
+
+
+def page_bounds(n: int, page: int, page_size: int) -> Tuple[int, int, int]:
+    """(início, fim, nº de páginas) da página `page` (0-based), ajustada ao intervalo válido."""
+    n_pages = max(1, -(-n // page_size))
+    page = min(max(page, 0), n_pages - 1)
+    start = page * page_size
+    return start, min(start + page_size, n), n_pages
+
+
+def page_of(positions: Sequence[int], page: int, page_size: int) -> Tuple[Sequence[int], int, int]:
+    """(posições da página, página efetiva, nº de páginas)."""
+    start, stop, n_pages = page_bounds(len(positions), page, page_size)
+    return positions[start:stop], start // page_size, n_pages
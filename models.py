@@ -1,91 +1,411 @@
-from __future__ import annotations
-from dataclasses import dataclass, field
-from typing import List, Optional
-import datetime as dt
-import uuid
-
-# Função auxiliar para gerar IDs (necessária para os valores default)
-def new_id_default(prefix: str) -> str:
-    return f"{prefix}_{uuid.uuid4().hex[:10]}"
-
-@dataclass
-class ValidationIssue:
-    level: str  # "ERRO" | "AVISO"
-    where: str
-    message: str
-    qid: Optional[str] = None
-    field_key: Optional[str] = None
-
-@dataclass
-class Blank:
-    bid: str
-    label: str  # L1, L2...
-    answers: List[str] = field(default_factory=list)
-    distractors: List[str] = field(default_factory=list) # Lista de erradas (para o Dropdown)
-    case_sensitive: bool = False
-    feedback: str = ""
-
-@dataclass
-class ChoiceOption:
-    oid: str
-    text: str
-    is_correct: bool = False
-    feedback: str = ""
-
-@dataclass
-class MatchPair:
-    pid: str
-    left: str
-    right: str
-
-@dataclass
-class QuestionMeta:
-    category: str = ""
-    difficulty: str = "A2"
-    points: float = 1.0
-    feedback_general: str = ""
-
-@dataclass
-class Question:
-    qid: str
-    ui_type: str
-    moodle_type: str
-    title: str = ""
-    section: str = "Sem secção"
-    prompt: str = ""
-    meta: QuestionMeta = field(default_factory=QuestionMeta)
-
-    # Cloze
-    blanks: List[Blank] = field(default_factory=list)
-
-    # Multichoice / V/F Múltiplo
-    options: List[ChoiceOption] = field(default_factory=list)
-    shuffle_options: bool = True
-
-    # True/False Simples (Legado ou Único)
-    truefalse_answer: Optional[bool] = None
-    tf_require_correction: bool = False # Opção de pedir correção das falsas
-
-    # Matching
-    pairs: List[MatchPair] = field(default_factory=list)
-    distractors_right: List[str] = field(default_factory=list)
-    shuffle_pairs: bool = True
-
-    # Shortanswer
-    accepted_answers: List[str] = field(default_factory=list)
-    sa_case_sensitive: bool = False
-
-    # Essay
-    rubric: str = ""
-    word_limit: Optional[int] = None
-
-@dataclass
-class TA:
-    ta_id: str
-    course: str = "PLE A2"
-    theme: str = "Tema 1"
-    ta_name: str = "Ficha 1"
-    created_at: str = field(default_factory=lambda: dt.datetime.now().isoformat(timespec="seconds"))
-    status: str = "RASCUNHO"  # RASCUNHO | VALIDADO | EXPORTADO | COM ERROS
-    questions: List[Question] = field(default_factory=list)
-    last_validation: List[ValidationIssue] = field(default_factory=list)
+from __future__ import annotations
+from collections.abc import MutableSequence
+from dataclasses import dataclass, field, fields
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import datetime as dt
+import sys
+import uuid
+
+# Função auxiliar para gerar IDs (necessária para os valores default)
+def new_id_default(prefix: str) -> str:
+    return f"{prefix}_{uuid.uuid4().hex[:10]}"
+
+# Tipos de pergunta da interface (rótulo visível -> tipo interno / Moodle)
+UI_TYPES = {
+    "Texto com lacunas (Escrever)": "cloze",
+    "Texto com lacunas (Menu/Seleção)": "cloze_mc",
+    "Escolha múltipla (1 correta)": "multichoice_single",
+    "Escolha múltipla (várias corretas)": "multichoice_multi",
+    "Verdadeiro/Falso": "truefalse",
+    "Associação (Matching)": "matching",
+    "Resposta Curta": "shortanswer",
+    "Ensaio (Texto livre)": "essay",
+    "Texto de Apoio / Instrução (sem resposta)": "description"
+}
+
+# Inverter o dicionário para lookups fáceis
+TYPE_TO_LABEL = {v: k for k, v in UI_TYPES.items()}
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+@dataclass(slots=True)
+class ValidationIssue:
+    level: str  # "ERRO" | "AVISO"
+    where: str
+    message: str
+    qid: Optional[str] = None
+    field_key: Optional[str] = None
+
+@dataclass(slots=True)
+class Blank:
+    bid: str
+    label: str  # L1, L2...
+    answers: List[str] = field(default_factory=list)
+    distractors: List[str] = field(default_factory=list) # Lista de erradas (para o Dropdown)
+    case_sensitive: bool = False
+    feedback: str = ""
+
+@dataclass(slots=True)
+class ChoiceOption:
+    oid: str
+    text: str
+    is_correct: bool = False
+    feedback: str = ""
+
+@dataclass(slots=True)
+class MatchPair:
+    pid: str
+    left: str
+    right: str
+
+@dataclass(slots=True)
+class QuestionMeta:
+    category: str = ""
+    difficulty: str = "A2"
+    points: float = 1.0
+    feedback_general: str = ""
+
+    def __post_init__(self):
+        # Poucos valores diferentes, repetidos em milhares de questões: uma só cópia de cada
+        self.category = _intern(self.category)
+        self.difficulty = _intern(self.difficulty)
+
+@dataclass(slots=True)
+class Question:
+    qid: str
+    ui_type: str
+    moodle_type: str
+    title: str = ""
+    section: str = "Sem secção"
+    prompt: str = ""
+    meta: QuestionMeta = field(default_factory=QuestionMeta)
+
+    # Cloze
+    blanks: List[Blank] = field(default_factory=list)
+
+    # Multichoice / V/F Múltiplo
+    options: List[ChoiceOption] = field(default_factory=list)
+    shuffle_options: bool = True
+
+    # True/False Simples (Legado ou Único)
+    truefalse_answer: Optional[bool] = None
+    tf_require_correction: bool = False # Opção de pedir correção das falsas
+
+    # Matching
+    pairs: List[MatchPair] = field(default_factory=list)
+    distractors_right: List[str] = field(default_factory=list)
+    shuffle_pairs: bool = True
+
+    # Shortanswer
+    accepted_answers: List[str] = field(default_factory=list)
+    sa_case_sensitive: bool = False
+
+    # Essay
+    rubric: str = ""
+    word_limit: Optional[int] = None
+
+    def __post_init__(self):
+        self.ui_type = _intern(self.ui_type)
+        self.moodle_type = _intern(self.moodle_type)
+        self.section = _intern(self.section)
+
+# ==============================================================================
+# LISTA DE QUESTÕES DA FICHA (ordenada, com índice por qid)
+# ==============================================================================
+class QuestionList(MutableSequence):
+    """
+    Lista de questões de uma ficha com um índice qid -> posição. Indexa e itera como uma lista
+    (export.py, validators.py...) e acrescenta operações por qid: index_of/get sem percorrer a
+    lista, pop_qid, replace, move para qualquer posição e reordenação da ficha inteira numa só
+    operação (sort_by, reorder).
+
+    Inserir ou apagar a meio desloca as posições seguintes; em vez de as corrigir todas, cada
+    entrada do índice guarda a posição e o ponto do registo de deslocamentos em que era certa,
+    e a procura aplica-lhe só os deslocamentos posteriores. Quando o registo fica comprido
+    o índice é refeito (custo amortizado). Cada resultado é confirmado contra a lista.
+    As subclasses (storage.LazyQuestionList, shared_bank.OverlayQuestions) guardam as questões
+    à sua maneira e redefinem _qid_at, _move_item, _permute e os métodos de acesso.
+
+    `version` aumenta a cada alteração da lista (as questões guardadas não são alteradas no
+    lugar, são substituídas), por isso serve de chave para resultados derivados da ficha.
+    """
+
+    version = 0
+
+    def __init__(self, questions: Iterable[Question] = ()):
+        self._items: List[Any] = list(questions)
+        self._reset_index()
+
+    # --- Índice ---
+
+    def _reset_index(self) -> None:
+        self.version += 1
+        # qid -> (posição, nº de deslocamentos do registo já aplicados)
+        self._index: Dict[str, Tuple[int, int]] = {}
+        # Deslocamentos desde que o índice foi feito: +i (inserção em i) ou -(i+1) (remoção de i)
+        self._shifts: List[int] = []
+        self._complete = False
+
+    def _build_index(self) -> None:
+        qid_at = self._qid_at
+        self._index = {qid_at(i): (i, 0) for i in range(len(self))}
+        self._shifts = []
+        self._complete = True
+
+    def _qid_at(self, i: int) -> str:
+        return self._items[i].qid
+
+    def _replaced(self, i: int, old_qid: str, new_qid: str) -> None:
+        """A posição i passou a ter outra questão (sem mexer nas restantes)."""
+        self.version += 1
+        if new_qid != old_qid and self._complete:
+            self._index.pop(old_qid, None)
+            self._index[new_qid] = (i, len(self._shifts))
+
+    def _deleted(self, i: int, qid: str) -> None:
+        self.version += 1
+        if self._complete:
+            self._index.pop(qid, None)
+            self._shifts.append(-(i + 1))
+
+    def _inserted(self, i: int, qid: str) -> None:
+        self.version += 1
+        if self._complete:
+            if i < len(self) - 1:
+                self._shifts.append(i)
+            self._index[qid] = (i, len(self._shifts))
+
+    def _lookup(self, qid: str) -> Optional[int]:
+        if not self._complete or len(self._shifts) > 32 + len(self) // 256:
+            self._build_index()
+        entry = self._index.get(qid)
+        if entry is None:
+            return None
+        pos, seen = entry
+        shifts = self._shifts
+        for s in shifts[seen:] if seen < len(shifts) else ():
+            if s >= 0:
+                if pos >= s:
+                    pos += 1
+            elif pos > -s - 1:
+                pos -= 1
+        if pos < len(self) and self._qid_at(pos) == qid:
+            self._index[qid] = (pos, len(shifts))
+            return pos
+        # Lista alterada por fora das operações acima: refaz e tenta de novo
+        self._build_index()
+        entry = self._index.get(qid)
+        return None if entry is None else entry[0]
+
+    def index_of(self, qid: str) -> int:
+        """Posição da questão `qid` (ValueError se não existir, como list.index)."""
+        pos = self._lookup(qid)
+        if pos is None:
+            raise ValueError(f"Questão não encontrada: {qid!r}")
+        return pos
+
+    def get(self, qid: str, default: Optional[Question] = None) -> Optional[Question]:
+        pos = self._lookup(qid)
+        return default if pos is None else self[pos]
+
+    def has_qid(self, qid: str) -> bool:
+        return self._lookup(qid) is not None
+
+    def qids(self) -> List[str]:
+        return [self._qid_at(i) for i in range(len(self))]
+
+    # --- Lista ---
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getitem__(self, i):
+        return self._items[i]
+
+    def __iter__(self) -> Iterator[Question]:
+        return iter(self._items)
+
+    def __setitem__(self, i, value) -> None:
+        if isinstance(i, slice):
+            self._items[i] = list(value)
+            self._reset_index()
+            return
+        if i < 0:
+            i += len(self)
+        old = self._qid_at(i)
+        self._items[i] = value
+        self._replaced(i, old, value.qid)
+
+    def __delitem__(self, i) -> None:
+        if isinstance(i, slice):
+            del self._items[i]
+            self._reset_index()
+            return
+        if i < 0:
+            i += len(self)
+        qid = self._qid_at(i)
+        del self._items[i]
+        self._deleted(i, qid)
+
+    def insert(self, i: int, value: Question) -> None:
+        n = len(self)
+        i = min(max(i + n, 0) if i < 0 else i, n)
+        self._items.insert(i, value)
+        self._inserted(i, value.qid)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (list, tuple, QuestionList)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"QuestionList({list(self)!r})"
+
+    # --- Operações por qid ---
+
+    def pop_qid(self, qid: str) -> Question:
+        pos = self.index_of(qid)
+        q = self[pos]
+        del self[pos]
+        return q
+
+    def replace(self, q: Question) -> int:
+        """Substitui a questão com o mesmo qid de `q`; devolve a sua posição."""
+        pos = self.index_of(q.qid)
+        self[pos] = q
+        return pos
+
+    def move(self, qid: str, to: int) -> int:
+        """Move a questão para a posição `to` (ajustada ao intervalo); devolve a posição final."""
+        pos = self.index_of(qid)
+        to = min(max(to, 0), len(self) - 1)
+        if to != pos:
+            self._move_item(pos, to)
+            self._deleted(pos, qid)
+            self._inserted(to, qid)
+        return to
+
+    def reorder(self, qids: Sequence[str]) -> None:
+        """Põe as questões pela ordem de `qids` (as que faltarem ficam no fim, pela ordem atual)."""
+        order, seen = [], set()
+        for qid in qids:
+            pos = self._lookup(qid)
+            if pos is not None and pos not in seen:
+                seen.add(pos)
+                order.append(pos)
+        order.extend(i for i in range(len(self)) if i not in seen)
+        self._permute(order)
+
+    def sort_by(self, key: Callable[[Question], Any], reverse: bool = False) -> None:
+        """Ordena a ficha (ordenação estável: questões com a mesma chave mantêm a ordem)."""
+        keys = [key(q) for q in self]
+        self._permute(sorted(range(len(keys)), key=keys.__getitem__, reverse=reverse))
+
+    def _move_item(self, pos: int, to: int) -> None:
+        self._items.insert(to, self._items.pop(pos))
+
+    def _permute(self, order: List[int]) -> None:
+        """A lista passa a ter as questões destas posições, por esta ordem."""
+        items = self._items
+        self._items = [items[i] for i in order]
+        self._reset_index()
+
+
+@dataclass(slots=True)
+class TA:
+    ta_id: str
+    course: str = "PLE A2"
+    theme: str = "Tema 1"
+    ta_name: str = "Ficha 1"
+    created_at: str = field(default_factory=lambda: dt.datetime.now().isoformat(timespec="seconds"))
+    status: str = "RASCUNHO"  # RASCUNHO | VALIDADO | EXPORTADO | COM ERROS
+    questions: QuestionList = field(default_factory=QuestionList)
+    last_validation: List[ValidationIssue] = field(default_factory=list)
+
+    def __post_init__(self):
+        if not isinstance(self.questions, QuestionList):
+            self.questions = QuestionList(self.questions)
+
+
+# ==============================================================================
+# REPRESENTAÇÃO COMPACTA (questões guardadas, só de leitura)
+# ==============================================================================
+# Uma questão usa só 1 ou 2 das suas listas (blanks, options, pairs...); as restantes ficam
+# vazias mas custam um objeto cada. Nas questões compactas as listas vazias passam a ser este
+# tuplo partilhado e os QuestionMeta iguais passam a ser o mesmo objeto. A leitura (iterar,
+# len, índices, "if q.options") funciona igual; para editar usa-se um rascunho (drafts.py) ou
+# thaw_question numa cópia.
+EMPTY: Tuple = ()
+
+_QUESTION_LIST_FIELDS = ("blanks", "options", "pairs", "distractors_right", "accepted_answers")
+_BLANK_LIST_FIELDS = ("answers", "distractors")
+
+# Metas partilhados: (category, difficulty, points, feedback_general) -> QuestionMeta
+_META_POOL: Dict[tuple, QuestionMeta] = {}
+_META_POOL_MAX = 4096
+
+
+def shared_meta(m: QuestionMeta) -> QuestionMeta:
+    """O QuestionMeta partilhado com os mesmos valores (ou o próprio, se o conjunto já estiver cheio)."""
+    key = (m.category, m.difficulty, m.points, m.feedback_general)
+    shared = _META_POOL.get(key)
+    if shared is None:
+        if len(_META_POOL) >= _META_POOL_MAX:
+            return m
+        shared = _META_POOL[key] = QuestionMeta(*key)
+    return shared
+
+
+def compact_blank(b: Blank) -> Blank:
+    for name in _BLANK_LIST_FIELDS:
+        if not getattr(b, name):
+            setattr(b, name, EMPTY)
+    return b
+
+
+def compact_question(q: Question, blanks: bool = True) -> Question:
+    """
+    Compacta a questão (no próprio objeto) e devolve-a. Não a alteres depois: edita uma cópia
+    descongelada. Com blanks=False as lacunas não são visitadas (já estão compactas).
+    """
+    for name in _QUESTION_LIST_FIELDS:
+        if not getattr(q, name):
+            setattr(q, name, EMPTY)
+    if blanks:
+        for b in q.blanks:
+            compact_blank(b)
+    q.meta = shared_meta(q.meta)
+    return q
+
+
+def compact_ta(ta: TA) -> TA:
+    for q in ta.questions:
+        compact_question(q)
+    return ta
+
+
+_QUESTION_VALUES = attrgetter(*(f.name for f in fields(Question)))
+
+
+def shallow_copy_question(q: Question) -> Question:
+    """Cópia rasa (listas, lacunas, opções e meta partilhados), bem mais rápida do que copy.copy."""
+    return Question(*_QUESTION_VALUES(q))
+
+
+def thaw_question(q: Question) -> Question:
+    """Desfaz a compactação (no próprio objeto): listas próprias e um QuestionMeta só seu."""
+    for name in _QUESTION_LIST_FIELDS:
+        value = getattr(q, name)
+        if type(value) is not list:
+            setattr(q, name, list(value))
+    for b in q.blanks:
+        for name in _BLANK_LIST_FIELDS:
+            value = getattr(b, name)
+            if type(value) is not list:
+                setattr(b, name, list(value))
+    m = q.meta
+    q.meta = QuestionMeta(m.category, m.difficulty, m.points, m.feedback_general)
+    return q
@@ -0,0 +1,170 @@
+# profiling.py
+# Tempos por fase de cada rerun da aplicação (painel na barra lateral + registo JSONL)
+# e captura opcional de um rerun com cProfile.
+#
+# As fases são marcadas com span("nome") ou com o decorador @timed(). Só contam dentro de
+# record_rerun(): fora dele (o caso normal, com o painel desligado) um span é um único
+# ContextVar.get e não mede nada. Os reruns de fragmentos (st.fragment) correm sem o script
+# principal e por isso não são medidos.
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+# Fase que mede o rerun inteiro (acrescentada por record_rerun)
+RERUN = "rerun"
+# Reruns guardados por sessão para os percentis
+HISTORY = 200
+PERCENTILES = (50, 90, 99)
+
+_CURRENT: ContextVar[Optional["RerunTimer"]] = ContextVar("babelium_rerun_timer", default=None)
+_NULL_SPAN = nullcontext()
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+class RerunTimer:
+    """Segundos acumulados por fase durante um rerun (uma fase chamada duas vezes soma)."""
+
+    __slots__ = ("spans", "t0")
+
+    def __init__(self):
+        self.spans: Dict[str, float] = {}
+        self.t0 = time.perf_counter()
+
+    def add(self, name: str, secs: float) -> None:
+        self.spans[name] = self.spans.get(name, 0.0) + secs
+
+
+class _Span:
+    __slots__ = ("timer", "name", "t0")
+
+    def __init__(self, timer: RerunTimer, name: str):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.add(self.name, time.perf_counter() - self.t0)
+        return False
+
+
+def span(name: str):
+    """Mede o bloco `with` como a fase `name` do rerun atual (se estiver a ser medido)."""
+    timer = _CURRENT.get()
+    if timer is None:
+        return _NULL_SPAN
+    return _Span(timer, name)
+
+
+def timed(name: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """Decorador: cada chamada da função conta como a fase `name` (por omissão, o nome da função)."""
+    def decorator(func: Callable) -> Callable:
+        label = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            timer = _CURRENT.get()
+            if timer is None:
+                return func(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timer.add(label, time.perf_counter() - t0)
+        return wrapper
+    return decorator
+
+
+class LatencyStats:
+    """Tempos dos últimos `maxlen` reruns de uma sessão, por fase."""
+
+    def __init__(self, maxlen: int = HISTORY):
+        self.maxlen = maxlen
+        self.samples: Dict[str, Deque[float]] = {}
+        self.reruns = 0
+
+    def add(self, spans: Dict[str, float]) -> None:
+        self.reruns += 1
+        for name, secs in spans.items():
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = deque(maxlen=self.maxlen)
+            samples.append(secs)
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """Uma linha por fase (percentis em ms), da mais lenta (p50) para a mais rápida."""
+        rows = []
+        for name, samples in self.samples.items():
+            ordered = sorted(samples)
+            row: Dict[str, Any] = {"fase": name, "n": len(ordered)}
+            for p in PERCENTILES:
+                row[f"p{p} (ms)"] = round(_percentile(ordered, p) * 1e3, 2)
+            row["máx (ms)"] = round(ordered[-1] * 1e3, 2)
+            rows.append(row)
+        rows.sort(key=lambda r: r[f"p{PERCENTILES[0]} (ms)"], reverse=True)
+        return rows
+
+    def clear(self) -> None:
+        self.samples.clear()
+        self.reruns = 0
+
+
+def _percentile(ordered: List[float], p: float) -> float:
+    # Nearest-rank: o menor valor com pelo menos p% das amostras até ele
+    k = max(0, -(-len(ordered) * p // 100) - 1)
+    return ordered[int(k)]
+
+
+@contextmanager
+def record_rerun(stats: LatencyStats, log_path: Optional[str] = None,
+                 profiler: Optional[cProfile.Profile] = None,
+                 extra: Optional[Dict[str, Any]] = None) -> Iterator[RerunTimer]:
+    """
+    Mede as fases do rerun que corre dentro do bloco e junta-as a `stats`; com `log_path`
+    acrescenta uma linha JSON ao registo. Com `profiler`, o bloco corre sob cProfile.
+    Um st.rerun()/st.stop() a meio também é registado (sai por exceção).
+    """
+    timer = RerunTimer()
+    token = _CURRENT.set(timer)
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield timer
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        _CURRENT.reset(token)
+        timer.add(RERUN, time.perf_counter() - timer.t0)
+        stats.add(timer.spans)
+        if log_path:
+            append_log(log_path, timer.spans, extra)
+
+
+def append_log(path: str, spans: Dict[str, float], extra: Optional[Dict[str, Any]] = None) -> None:
+    """Acrescenta um rerun ao registo JSONL (tempos em ms)."""
+    record: Dict[str, Any] = {"ts": round(time.time(), 3)}
+    if extra:
+        record.update(extra)
+    record["spans_ms"] = {name: round(secs * 1e3, 3) for name, secs in spans.items()}
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(_ENCODER.encode(record) + "\n")
+
+
+def profile_report(profiler: cProfile.Profile, limit: int = 40, sort: str = "cumulative") -> str:
+    """As `limit` funções com mais tempo acumulado, em texto (formato do pstats)."""
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
@@ -0,0 +1,397 @@
+# question_editor.py
+# Editor de Questão (vista 2 da aplicação), dividido em fragmentos do Streamlit.
+#
+# Cada bloco (configurações, enunciado, respostas, pré-visualização) é um st.fragment: mexer
+# num widget de um bloco volta a correr só esse bloco, e não a página toda. Numa questão de
+# associação com 100 pares ou num Cloze com 150 lacunas, escrever numa opção deixa de
+# reconstruir os restantes blocos e as abas de pré-visualização.
+#
+# Quando uma alteração afeta outros blocos, pede-se um rerun da página inteira:
+#   - mudar o tipo de pergunta (as respostas mudam de forma);
+#   - mudar o enunciado (número de lacunas do Cloze e pré-visualização).
+# Acrescentar ou apagar opções só volta a correr o bloco das respostas. A pré-visualização é
+# atualizada em cada rerun da página; enquanto não mostrar as últimas edições das respostas,
+# o bloco das respostas avisa e oferece o botão "Atualizar" (que volta a correr a página).
+import copy
+import os
+import sys
+
+import streamlit as st
+from streamlit.errors import StreamlitAPIException
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
+
+from models import Blank, ChoiceOption, MatchPair, Question, UI_TYPES, compact_question  # noqa: E402
+from utils import new_id, count_gaps  # noqa: E402
+from cloze import compile_cloze, sync_cloze_blanks  # noqa: E402
+from validators import invalidate_question  # noqa: E402
+from drafts import QuestionDraft  # noqa: E402
+from profiling import timed  # noqa: E402
+
+# Texto de exemplo da caixa do enunciado, por tipo
+PLACEHOLDERS = {
+    "cloze": "Ex: O gato [ ] (beber) leite ontem.",
+    "multichoice_single": "Ex: Define ",
+    "truefalse": "Ex: Classifique as afirmações sobre o texto:",
+    "matching": "Ex: Associe os países às capitais:",
+    "essay": "Ex: Escreva um texto sobre as suas férias."
+}
+
+
+def _rerun_block():
+    """Volta a correr só o bloco atual (ou a página, se este rerun já é da página inteira)."""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        # scope="fragment" só é aceite quando o rerun em curso é o do próprio fragmento
+        st.rerun()
+
+
+# --- BLOCO 1: CONFIGURAÇÕES ---
+@st.fragment
+def render_settings(draft: QuestionDraft):
+    q = draft.q
+    with st.container(border=True):
+        c1, c2, c3 = st.columns([2, 1, 1])
+
+        # Tipo de Pergunta
+        new_ui_type = c1.selectbox("Tipo de Pergunta", options=list(UI_TYPES.keys()),
+                                   index=list(UI_TYPES.keys()).index(q.ui_type) if q.ui_type in UI_TYPES else 0)
+
+        if new_ui_type != q.ui_type:
+            q.ui_type = new_ui_type
+            q.moodle_type = UI_TYPES[new_ui_type]
+            # Resets de segurança
+            if q.moodle_type == "truefalse":
+                q.options = [ChoiceOption(new_id("o"), "Verdadeiro", True), ChoiceOption(new_id("o"), "Falso", False)]
+            elif "multichoice" in q.moodle_type:
+                q.options = [ChoiceOption(new_id("o"), ""), ChoiceOption(new_id("o"), "")]
+            elif q.moodle_type == "matching":
+                q.pairs = [MatchPair(new_id("p"), "", "")]
+            # O resto do editor depende do tipo: página inteira
+            st.rerun()
+
+        # Pontos
+        if q.moodle_type == "description":
+            c2.text_input("Pontos", value="0.0", disabled=True)
+        else:
+            draft.set_meta("points", c2.number_input("Pontos", value=q.meta.points, min_value=0.1, step=0.5))
+
+        # Secção
+        q.section = c3.text_input("Secção", value=q.section, placeholder="Ex: Gramática")
+        q.title = st.text_input("Título Interno (Opcional)", value=q.title, placeholder="Ex: Q1 - Passado Perfeito")
+
+
+# --- BLOCO 2: ENUNCIADO (EM CIMA) ---
+@st.fragment
+def render_prompt(draft: QuestionDraft):
+    q = draft.q
+    mt = q.moodle_type
+    st.markdown("### 1. Enunciado")
+
+    # AJUDA E EXEMPLOS (Só para Cloze)
+    if mt in ["cloze", "cloze_mc"]:
+        col_btn, col_help = st.columns([1, 3])
+        # Botão de inserir lacuna
+        if col_btn.button("➕ Inserir [ ]", help="Adiciona uma lacuna ao fim do texto", use_container_width=True):
+            q.prompt += " [ ] "
+            st.rerun()
+
+        # Menu de Exemplos
+        with col_help.expander("Ver exemplos prontos"):
+            # --- A LINHA ABAIXO É A EXPLICAÇÃO QUE QUERIAS ---
+            st.info("Clique num dos botões abaixo para preencher a caixa de texto com um modelo pronto:")
+
+            ce1, ce2 = st.columns(2)
+            if ce1.button("📝 Gramática (Verbos)"):
+                q.prompt = "Ontem, o gato [ ] (beber) leite."
+                st.rerun()
+            if ce2.button("🌍 Vocabulário"):
+                q.prompt = "O céu é [ ] (azul/verde)."
+                st.rerun()
+
+    # Área de Texto
+    new_prompt = st.text_area(
+        "Escreva a pergunta aqui:",
+        value=q.prompt,
+        height=150,
+        placeholder=PLACEHOLDERS.get(mt, ""),
+        label_visibility="collapsed"
+    )
+    if new_prompt != q.prompt:
+        q.prompt = new_prompt
+        # Lacunas e pré-visualização dependem do enunciado: página inteira
+        st.rerun()
+
+
+def _preview_key(q: Question) -> tuple:
+    # O que a pré-visualização mostra: se mudar, a que está no ecrã está desatualizada
+    return (
+        q.moodle_type, q.prompt,
+        tuple((o.text, o.is_correct) for o in q.options),
+        tuple((p.left, p.right) for p in q.pairs),
+        tuple(b.answers[0] if b.answers else None for b in q.blanks),
+    )
+
+
+# --- BLOCO 3: RESPOSTAS (EM BAIXO) ---
+@st.fragment
+def render_answers(draft: QuestionDraft):
+    q = draft.q
+    mt = q.moodle_type
+    st.markdown("### 2. Definição das Respostas")
+
+    # A. CLOZE
+    if mt in ["cloze", "cloze_mc"]:
+        n_gaps = count_gaps(q.prompt)
+        if n_gaps == 0:
+            st.warning("⚠️ O texto não tem lacunas. Use o botão **Inserir [ ]** ou escreva parêntesis retos.")
+        else:
+            if len(q.blanks) != n_gaps:
+                draft.mutable_list("blanks")
+                sync_cloze_blanks(q, lambda i: Blank(new_id("b"), f"L{i+1}", [""], []))
+
+            is_mc = (mt == "cloze_mc")
+            cols = st.columns(2 if is_mc else 3)
+
+            for i, b in enumerate(q.blanks):
+                with cols[i % len(cols)]:
+                    with st.container(border=True):
+                        st.markdown(f"**Lacuna {i+1}**")
+                        current = b.answers[0] if b.answers else ""
+                        answer = st.text_input("Correta", value=current, key=f"ans_{b.bid}")
+                        if answer != current:
+                            draft.set_item("blanks", i, "answers", [answer, *b.answers[1:]])
+                        if is_mc:
+                            dist_str = "; ".join(b.distractors)
+                            dists = st.text_input("Erradas (sep. por ';')", value=dist_str, key=f"dist_{b.bid}", placeholder="Ex: op1; op2")
+                            draft.set_item("blanks", i, "distractors", [d.strip() for d in dists.split(";") if d.strip()])
+
+    # B. ESCOLHA MÚLTIPLA (Lógica Corrigida)
+    elif mt.startswith("multichoice"):
+        for i, opt in enumerate(q.options):
+            c1, c2, c3 = st.columns([0.5, 4, 1])
+
+            # Botão Apagar
+            if c1.button("🗑️", key=f"d_mc_{opt.oid}"):
+                draft.mutable_list("options").pop(i)
+                _rerun_block()
+
+            # Texto da Opção
+            draft.set_item("options", i, "text", c2.text_input(f"Opção {i+1}", value=opt.text, label_visibility="collapsed", key=f"t_mc_{opt.oid}"))
+
+            # Checkbox de Correção
+            # Nota: Usamos o session_state diretamente para forçar a atualização visual se necessário
+            chk_key = f"c_mc_{opt.oid}"
+            is_chk = c3.checkbox("Correta", value=opt.is_correct, key=chk_key)
+
+            if mt == "multichoice_single":
+                # Lógica Exclusiva (Só uma pode ser verdadeira)
+                if is_chk and not opt.is_correct:
+                    # O utilizador acabou de marcar esta caixa.
+                    # 1. Marca esta como verdadeira
+                    draft.set_item("options", i, "is_correct", True)
+                    # 2. Desmarca TODAS as outras (no Modelo e na Visualização)
+                    for j, o in enumerate(q.options):
+                        if o.oid != opt.oid:
+                            draft.set_item("options", j, "is_correct", False)
+                            # Forçar o visual a desmarcar
+                            if f"c_mc_{o.oid}" in st.session_state:
+                                st.session_state[f"c_mc_{o.oid}"] = False
+                    _rerun_block()
+                elif not is_chk and opt.is_correct:
+                    # O utilizador desmarcou a opção ativa
+                    draft.set_item("options", i, "is_correct", False)
+            else:
+                # Lógica Simples (Várias podem ser verdadeiras)
+                draft.set_item("options", i, "is_correct", is_chk)
+
+        if st.button("➕ Adicionar Opção"):
+            draft.mutable_list("options").append(ChoiceOption(new_id("o"), ""))
+            _rerun_block()
+
+    # C. VERDADEIRO / FALSO
+    elif mt == "truefalse":
+        q.tf_require_correction = st.toggle("Pedir correção das Falsas?", value=q.tf_require_correction)
+        for i, opt in enumerate(q.options):
+            with st.container(border=True):
+                c1, c2, c3 = st.columns([0.5, 4, 2])
+                if c1.button("🗑️", key=f"d_vf_{opt.oid}"):
+                    draft.mutable_list("options").pop(i)
+                    _rerun_block()
+                draft.set_item("options", i, "text", c2.text_input("Frase", value=opt.text, label_visibility="collapsed", key=f"t_vf_{opt.oid}"))
+                sel = c3.radio("Gabarito", ["V", "F"], index=0 if opt.is_correct else 1, horizontal=True, label_visibility="collapsed", key=f"r_vf_{opt.oid}")
+                draft.set_item("options", i, "is_correct", sel == "V")
+        if st.button("➕ Adicionar Frase"):
+            draft.mutable_list("options").append(ChoiceOption(new_id("o"), "", True))
+            _rerun_block()
+
+    # D. MATCHING
+    elif mt == "matching":
+        for i, p in enumerate(q.pairs):
+            c1, c2, c3 = st.columns([0.5, 2.5, 2.5])
+            if c1.button("🗑️", key=f"d_mat_{p.pid}"):
+                draft.mutable_list("pairs").pop(i)
+                _rerun_block()
+            draft.set_item("pairs", i, "left", c2.text_input("A", value=p.left, label_visibility="collapsed", key=f"pl_{p.pid}", placeholder="Pergunta"))
+            draft.set_item("pairs", i, "right", c3.text_input("B", value=p.right, label_visibility="collapsed", key=f"pr_{p.pid}", placeholder="Resposta"))
+        if st.button("➕ Adicionar Par"):
+            draft.mutable_list("pairs").append(MatchPair(new_id("p"), "", ""))
+            _rerun_block()
+
+    elif mt == "shortanswer":
+        st.info("Insira as respostas aceites (ex: 'Lisboa', 'lisboa').")
+        current = "; ".join(q.accepted_answers)
+        new_val = st.text_area("Respostas (separar por ;)", value=current)
+        q.accepted_answers = [x.strip() for x in new_val.split(";") if x.strip()]
+
+    # Num rerun só deste bloco a pré-visualização não volta a correr (None: vai ser desenhada
+    # neste rerun da página)
+    drawn = st.session_state.get("preview_key")
+    if drawn is not None and drawn != _preview_key(q):
+        c_msg, c_refresh = st.columns([4, 1])
+        c_msg.info("A pré-visualização ainda não mostra as últimas alterações das respostas.")
+        if c_refresh.button("🔄 Atualizar", key="answers_refresh_preview", use_container_width=True):
+            st.rerun()
+
+
+# --- BLOCO 4: PRÉ-VISUALIZAÇÃO (CLEAN) ---
+@st.fragment
+def render_preview(draft: QuestionDraft):
+    q = draft.q
+    mt = q.moodle_type
+    c_head, c_refresh = st.columns([4, 1])
+    c_head.subheader("Pré-visualização")
+    # Volta a correr a página, para que o aviso do bloco das respostas também desapareça
+    if c_refresh.button("🔄 Atualizar", key="preview_refresh", use_container_width=True):
+        st.rerun()
+    st.session_state.preview_key = _preview_key(q)
+
+    # Container com borda para simular "papel" branco
+    with st.container(border=True):
+        tab1, tab2 = st.tabs(["Vista do Aluno", "Vista do Professor"])
+
+        with tab1:
+            if mt == "cloze":
+                preview_text = compile_cloze(q.prompt).fill_all(" `[ ________ ]` ")
+                st.markdown(preview_text)
+            elif mt == "cloze_mc":
+                preview_text = compile_cloze(q.prompt).fill_all(" `[ Selecionar... 🔽 ]` ")
+                st.markdown(preview_text)
+            elif "multichoice" in mt:
+                st.markdown(q.prompt)
+                for o in q.options:
+                    st.markdown(f"- ⚪ {o.text}")
+            elif mt == "truefalse":
+                st.markdown(q.prompt)
+                st.write("---")
+                for o in q.options:
+                    st.markdown(f"- {o.text} **(V / F)**")
+            elif mt == "matching":
+                st.markdown(q.prompt)
+                st.write("---")
+                c_a, c_b = st.columns(2)
+                with c_a:
+                    for p in q.pairs: st.markdown(f"- {p.left}")
+                with c_b:
+                    st.markdown("*(Menu de opções)*")
+            else:
+                st.markdown(q.prompt)
+
+        with tab2:
+            if mt in ["cloze", "cloze_mc"]:
+                st.markdown("**Soluções:**")
+                for i, b in enumerate(q.blanks):
+                    st.markdown(f"{i+1}. **{b.answers[0] if b.answers else '?'}**")
+            elif "multichoice" in mt:
+                for o in q.options:
+                    mark = "✅" if o.is_correct else "❌"
+                    st.markdown(f"{mark} {o.text}")
+            elif mt == "truefalse":
+                for o in q.options:
+                    ans = "VERDADEIRO" if o.is_correct else "FALSO"
+                    st.markdown(f"- {o.text} -> **{ans}**")
+            elif mt == "matching":
+                for p in q.pairs:
+                    st.markdown(f"- {p.left} 🔗 **{p.right}**")
+
+
+def _store(draft: QuestionDraft, ta, journal) -> None:
+    # Só os objetos alterados são novos; o resto é partilhado com a questão guardada
+    saved = draft.commit()
+    if st.session_state.active_qid:
+        existing_q = ta.questions.get(st.session_state.active_qid)
+        if existing_q is not None and existing_q is not saved:
+            ta.questions.replace(saved)
+            invalidate_question(saved.qid)
+            journal.log_update(existing_q, saved)
+    else:
+        ta.questions.append(compact_question(saved))
+        journal.log_create(len(ta.questions) - 1, saved)
+
+
+@timed()
+def render_question_editor(ta, journal):
+    # 1. Carregar ou Criar Questão
+    if "draft_q" not in st.session_state:
+        if st.session_state.active_qid:
+            # Rascunho com cópia na escrita: a questão guardada (compacta, só de leitura) não é
+            # copiada; só os objetos que o editor alterar passam a ser do rascunho
+            st.session_state.draft_q = QuestionDraft(ta.questions.get(st.session_state.active_qid))
+        else:
+            st.session_state.draft_q = QuestionDraft(Question(
+                qid=new_id("q"), ui_type="Escolha múltipla (1 correta)",
+                moodle_type="multichoice_single", prompt=""
+            ))
+
+    draft = st.session_state.draft_q
+    q = draft.q  # campos da própria questão podem ser atribuídos; o resto passa pelo draft
+
+    # --- CABEÇALHO ---
+    c_back, c_title = st.columns([1, 5])
+    if c_back.button("🔙 Voltar"):
+        del st.session_state.draft_q
+        st.session_state.active_view = "Editor de Ficha"
+        st.rerun()
+    c_title.subheader("Editar Questão")
+
+    st.session_state.preview_key = None
+    render_settings(draft)
+    render_prompt(draft)
+    render_answers(draft)
+    st.divider()
+    render_preview(draft)
+
+    # --- AÇÕES FINAIS ---
+    st.divider()
+    col_save, col_next = st.columns(2)
+
+    # 1. Guardar e Sair
+    if col_save.button("💾 Guardar e Sair", type="primary", use_container_width=True):
+        _store(draft, ta, journal)
+        del st.session_state.draft_q
+        st.session_state.active_view = "Editor de Ficha"
+        st.session_state.active_qid = None
+        st.rerun()
+
+    # 2. Guardar e Criar Seguinte
+    if col_next.button("⏩ Guardar e Criar Seguinte", help="Guarda e abre nova do mesmo tipo", use_container_width=True):
+        _store(draft, ta, journal)
+
+        # PREPARAR A PRÓXIMA
+        next_q = Question(
+            qid=new_id("q"), ui_type=q.ui_type, moodle_type=q.moodle_type,
+            prompt="", section=q.section, meta=copy.copy(q.meta)
+        )
+        if "multichoice" in q.moodle_type:
+            next_q.options = [ChoiceOption(new_id("o"), ""), ChoiceOption(new_id("o"), "")]
+        elif q.moodle_type == "truefalse":
+            next_q.options = [ChoiceOption(new_id("o"), "Verdadeiro", True), ChoiceOption(new_id("o"), "Falso", False)]
+        elif q.moodle_type == "matching":
+            next_q.pairs = [MatchPair(new_id("p"), "", "")]
+
+        st.session_state.draft_q = QuestionDraft(next_q)
+        st.session_state.active_qid = None
+        st.rerun()
@@ -0,0 +1,72 @@
+# serialization.py
+# Conversão TA <-> dict/JSON, para guardar fichas em disco e processá-las fora do Streamlit.
+from dataclasses import asdict, fields
+from typing import Any, Dict
+import json
+
+from models import TA, Question, QuestionList, QuestionMeta, Blank, ChoiceOption, MatchPair, ValidationIssue, compact_question
+
+
+# Nomes dos campos de cada classe (fields() é lento para chamar em cada objeto lido)
+_KNOWN_FIELDS: Dict[type, frozenset] = {}
+
+
+def _build(cls, data: Dict[str, Any]):
+    # Ignora chaves desconhecidas (ficheiros de versões mais novas/antigas continuam a abrir)
+    known = _KNOWN_FIELDS.get(cls)
+    if known is None:
+        known = _KNOWN_FIELDS[cls] = frozenset(f.name for f in fields(cls))
+    return cls(**{k: v for k, v in data.items() if k in known})
+
+
+def question_to_dict(q: Question) -> Dict[str, Any]:
+    # asdict mantém os tuplos das questões compactas como tuplos: o JSON escreve-os como listas
+    return asdict(q)
+
+
+# Campos compostos da questão: nome -> (classe, é lista)
+_NESTED_FIELDS = {"meta": (QuestionMeta, False), "blanks": (Blank, True), "options": (ChoiceOption, True), "pairs": (MatchPair, True)}
+
+
+def question_field_from_dict(name: str, value: Any) -> Any:
+    """Valor de um campo da questão lido de JSON (meta, blanks, options e pairs voltam a ser dataclasses)."""
+    spec = _NESTED_FIELDS.get(name)
+    if spec is None:
+        return value
+    cls, is_list = spec
+    return [_build(cls, v) for v in value or []] if is_list else _build(cls, value or {})
+
+
+def question_from_dict(data: Dict[str, Any]) -> Question:
+    q = _build(Question, data)
+    for name in _NESTED_FIELDS:
+        setattr(q, name, question_field_from_dict(name, data.get(name)))
+    # As fichas lidas do disco ficam na forma compacta (listas vazias e metas partilhados)
+    return compact_question(q)
+
+
+def ta_to_dict(ta: TA) -> Dict[str, Any]:
+    # Campo a campo (e não asdict(ta)): ta.questions pode ser uma LazyQuestionList (storage.py)
+    data = {f.name: getattr(ta, f.name) for f in fields(TA) if f.name not in ("questions", "last_validation")}
+    data["questions"] = [question_to_dict(q) for q in ta.questions]
+    data["last_validation"] = [asdict(i) for i in ta.last_validation]
+    return data
+
+
+def ta_from_dict(data: Dict[str, Any]) -> TA:
+    ta = _build(TA, data)
+    ta.questions = QuestionList(question_from_dict(q) for q in data.get("questions", []))
+    ta.last_validation = [_build(ValidationIssue, i) for i in data.get("last_validation", [])]
+    return ta
+
+
+def save_ta_json(ta: TA, path: str) -> None:
+    """Guarda a ficha num ficheiro JSON (UTF-8, legível)."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(ta_to_dict(ta), f, ensure_ascii=False, indent=1)
+
+
+def load_ta_json(path: str) -> TA:
+    """Lê uma ficha guardada com save_ta_json."""
+    with open(path, "r", encoding="utf-8") as f:
+        return ta_from_dict(json.load(f))
@@ -0,0 +1,287 @@
+# shared_bank.py
+# Banco de referência partilhado por todas as sessões, com uma camada própria por sessão.
+#
+# O banco é lido uma só vez por processo (na aplicação, através de st.cache_resource) e fica
+# imutável: as questões são compactas e guardadas num tuplo. Cada sessão trabalha sobre uma
+# OverlayQuestions, que lê do banco e regista só o que a sessão mudou:
+#   - questões substituídas (editadas):   posição no banco -> questão nova
+#   - questões acrescentadas:             lista própria
+#   - apagar/inserir/reordenar:           só então é criada a ordem da sessão (array de inteiros,
+#                                         4 bytes por questão, sem copiar nenhuma questão)
+# A leitura junta as duas camadas de forma transparente: a aplicação, a validação e a exportação
+# usam ta.questions como uma lista normal. As questões do banco nunca são alteradas no lugar:
+# o editor usa rascunhos com cópia na escrita (drafts.py).
+#
+# A gravação de uma sessão (save_session_ta, usada pelo diário) também guarda só a camada: as
+# questões substituídas e acrescentadas, a ordem própria e o caminho do banco.
+import os
+import sys
+from array import array
+from dataclasses import fields
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
+
+from models import TA, Question, QuestionList, compact_ta  # noqa: E402
+from storage import StoredTA, load_ta, save_ta  # noqa: E402
+from utils import new_id  # noqa: E402
+
+_TA_FIELDS = tuple(f.name for f in fields(TA) if f.name not in ("questions", "last_validation"))
+
+
+class SharedTA:
+    """Ficha só de leitura partilhada entre sessões: dados da ficha + tuplo de questões compactas."""
+
+    __slots__ = ("info", "questions", "path")
+
+    def __init__(self, ta: TA, path: str = ""):
+        compact_ta(ta)
+        self.info: Dict[str, Any] = {name: getattr(ta, name) for name in _TA_FIELDS}
+        self.questions: Tuple[Question, ...] = tuple(ta.questions)
+        self.path = path
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+
+def load_shared_ta(path: str) -> SharedTA:
+    """Lê um banco (.babta) por inteiro para ser partilhado."""
+    return SharedTA(load_ta(path, lazy=False), path)
+
+
+class OverlayQuestions(QuestionList):
+    """
+    Questões do banco partilhado vistas por uma sessão, com as alterações dessa sessão por cima.
+    O índice por qid de QuestionList é só da sessão (o banco não guarda posições).
+    """
+
+    def __init__(self, base: Sequence[Question], base_path: str = ""):
+        self.base = base
+        # Ficheiro do banco (para gravar só a camada da sessão; vazio = banco sem ficheiro)
+        self.base_path = base_path
+        # Posição no banco -> questão que a substitui nesta sessão
+        self.replaced: Dict[int, Question] = {}
+        self.added: List[Question] = []
+        # Ordem da sessão (None = a do banco seguida das acrescentadas). Valores >= 0 são posições
+        # no banco; -k-1 é a k-ésima questão acrescentada.
+        self._order: Optional[array] = None
+        self._reset_index()
+
+    def _slot(self, i: int) -> int:
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("índice de questão fora do intervalo")
+        if self._order is not None:
+            return self._order[i]
+        nb = len(self.base)
+        return i if i < nb else -(i - nb) - 1
+
+    def _materialize_order(self) -> array:
+        if self._order is None:
+            self._order = array("i", range(len(self.base)))
+            self._order.extend(-k - 1 for k in range(len(self.added)))
+        return self._order
+
+    def __len__(self) -> int:
+        if self._order is not None:
+            return len(self._order)
+        return len(self.base) + len(self.added)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        slot = self._slot(i)
+        if slot < 0:
+            return self.added[-slot - 1]
+        q = self.replaced.get(slot)
+        return self.base[slot] if q is None else q
+
+    def __iter__(self):
+        base, replaced, added = self.base, self.replaced, self.added
+        if self._order is None:
+            if replaced:
+                for slot, q in enumerate(base):
+                    yield replaced.get(slot, q)
+            else:
+                yield from base
+            yield from added
+            return
+        for slot in self._order:
+            yield added[-slot - 1] if slot < 0 else replaced.get(slot, base[slot])
+
+    def __setitem__(self, i, value) -> None:
+        if isinstance(i, slice):
+            raise TypeError("OverlayQuestions não suporta atribuição por fatias")
+        slot = self._slot(i)
+        old = self[i].qid
+        if slot < 0:
+            self.added[-slot - 1] = value
+        elif value is self.base[slot]:
+            self.replaced.pop(slot, None)
+        else:
+            self.replaced[slot] = value
+        self._replaced(i if i >= 0 else i + len(self), old, value.qid)
+
+    def __delitem__(self, i) -> None:
+        if isinstance(i, slice):
+            for j in sorted(range(*i.indices(len(self))), reverse=True):
+                del self[j]
+            return
+        slot = self._slot(i)
+        if i < 0:
+            i += len(self)
+        qid = self[i].qid
+        if slot >= 0:
+            del self._materialize_order()[i]
+            self.replaced.pop(slot, None)
+        elif self._order is None:
+            # Sem ordem própria as acrescentadas estão no fim, pela ordem de `added`
+            del self.added[-slot - 1]
+        else:
+            del self._order[i]
+            self._order = self._drop_added(self._order, [-slot - 1])
+        self._deleted(i, qid)
+
+    def _drop_added(self, slots: Sequence[int], gone: List[int]) -> array:
+        # Retira de `added` as posições `gone` (já sem lugar em `slots`) e corrige os índices
+        # negativos das restantes: a sessão não guarda questões que já não estão na ficha
+        gone_set = set(gone)
+        new_k: Dict[int, int] = {}
+        kept: List[Question] = []
+        for k, q in enumerate(self.added):
+            if k not in gone_set:
+                new_k[k] = len(kept)
+                kept.append(q)
+        self.added = kept
+        return array("i", [s if s >= 0 else -new_k[-s - 1] - 1 for s in slots])
+
+    def insert(self, i: int, value: Question) -> None:
+        n = len(self)
+        i = min(max(i + n, 0) if i < 0 else i, n)
+        if self._order is None and i == n:
+            self.added.append(value)
+        else:
+            order = self._materialize_order()
+            self.added.append(value)
+            order.insert(i, -len(self.added))
+        self._inserted(i, value.qid)
+
+    def _qid_at(self, i: int) -> str:
+        return self[i].qid
+
+    # Mover e reordenar só mudam a ordem da sessão; nenhuma questão é copiada
+    def _move_item(self, pos: int, to: int) -> None:
+        order = self._materialize_order()
+        order.insert(to, order.pop(pos))
+
+    def _permute(self, order: List[int]) -> None:
+        slots = self._materialize_order()
+        self._order = array("i", [slots[i] for i in order])
+        self._reset_index()
+
+    def rebuild(self, items: List[Any]) -> None:
+        """
+        Substitui o conteúdo (repetição do diário, journal.apply_records): cada elemento é uma
+        posição atual da lista ou uma Question. Uma Question com o qid de uma questão atual fica
+        no lugar dela (se for do banco, como substituída); as restantes são acrescentadas.
+        """
+        base, added = self.base, list(self.added)
+        replaced: Dict[int, Question] = {}
+        slots = []
+        for item in items:
+            if type(item) is int:
+                slot = self._slot(item)
+                if slot in self.replaced:
+                    replaced[slot] = self.replaced[slot]
+            else:
+                pos = self._lookup(item.qid)
+                if pos is None:
+                    added.append(item)
+                    slot = -len(added)
+                else:
+                    slot = self._slot(pos)
+                    if slot < 0:
+                        added[-slot - 1] = item
+                    elif item is not base[slot]:
+                        replaced[slot] = item
+            slots.append(slot)
+        self.replaced, self.added = replaced, added
+        used = {-s - 1 for s in slots if s < 0}
+        if len(used) < len(added):
+            slots = list(self._drop_added(slots, [k for k in range(len(added)) if k not in used]))
+        nb = len(base)
+        natural = (len(slots) == nb + len(added) and all(s == i for i, s in enumerate(slots[:nb]))
+                   and all(s == -k - 1 for k, s in enumerate(slots[nb:])))
+        self._order = None if natural else array("i", slots)
+        self._reset_index()
+
+    def overlay_size(self) -> Tuple[int, int, int]:
+        """(substituídas, acrescentadas, posições na ordem própria): o que a sessão guarda."""
+        return len(self.replaced), len(self.added), 0 if self._order is None else len(self._order)
+
+    def __repr__(self) -> str:
+        r, a, o = self.overlay_size()
+        return f"<OverlayQuestions {len(self)} questões: {r} alteradas, {a} novas, ordem própria: {'sim' if o else 'não'}>"
+
+
+def session_ta(shared: SharedTA) -> TA:
+    """
+    Ficha da sessão sobre o banco partilhado. Tem um ta_id novo (guardá-la cria um ficheiro
+    próprio) e só os dados da ficha são copiados; as questões são lidas do banco.
+    """
+    info = dict(shared.info)
+    info["ta_id"] = new_id("ta")
+    ta = TA(**info)
+    ta.questions = OverlayQuestions(shared.questions, shared.path)
+    return ta
+
+
+def is_session_ta(ta: TA) -> bool:
+    """True se a ficha é uma sessão sobre um banco gravado em ficheiro (ver save_session_ta)."""
+    return isinstance(ta.questions, OverlayQuestions) and bool(ta.questions.base_path)
+
+
+def save_session_ta(ta: TA, path: str, extra: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Grava só a camada da sessão (formato .babta): dados da ficha, questões substituídas e
+    acrescentadas, e no cabeçalho (extra["bank"]) o caminho do banco, as posições substituídas
+    e a ordem própria. As questões do banco não são copiadas.
+    """
+    overlay: OverlayQuestions = ta.questions
+    slots = sorted(overlay.replaced)
+    layer = TA(**{name: getattr(ta, name) for name in _TA_FIELDS})
+    layer.questions = QuestionList([overlay.replaced[s] for s in slots] + overlay.added)
+    bank = {
+        "path": overlay.base_path,
+        "n_base": len(overlay.base),
+        "n_questions": len(overlay),
+        "replaced": slots,
+        "order": None if overlay._order is None else overlay._order.tolist(),
+    }
+    save_ta(layer, path, extra={**(extra or {}), "bank": bank})
+
+
+def load_session_ta(stored: StoredTA, load_bank: Callable[[str], SharedTA] = load_shared_ta) -> TA:
+    """
+    Reconstrói uma sessão gravada por save_session_ta sobre o banco devolvido por
+    load_bank(caminho). ValueError se o banco já não corresponder ao da gravação.
+    """
+    bank = stored.header["extra"]["bank"]
+    shared = load_bank(bank["path"])
+    ta = stored.to_ta(lazy=False)
+    slots = bank["replaced"]
+    layer = list(ta.questions)
+    if len(shared) != bank["n_base"] or any(shared.questions[s].qid != q.qid for s, q in zip(slots, layer)):
+        raise ValueError(f"O banco '{bank['path']}' mudou desde que a ficha '{ta.ta_name}' foi gravada.")
+    overlay = OverlayQuestions(shared.questions, shared.path)
+    overlay.replaced = dict(zip(slots, layer))
+    overlay.added = layer[len(slots):]
+    if bank["order"] is not None:
+        overlay._order = array("i", bank["order"])
+    overlay._reset_index()
+    ta.questions = overlay
+    return ta
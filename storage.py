@@ -0,0 +1,424 @@
+# storage.py
+# Formato binário versionado para guardar fichas em disco (extensão .babta).
+#
+# Disposição do ficheiro:
+#   preâmbulo   "BABELIUM" + versão (uint16) + tamanho do cabeçalho + tamanho do índice (uint32)
+#   cabeçalho   JSON: dados da ficha (nome, curso, estado...), última validação, nº de questões
+#               e o esquema (nomes dos campos de cada classe, pela ordem em que são gravados)
+#   índice      JSON: uma linha por questão (qid, tipos, título, secção, pontos, offset, tamanho,
+#               categoria, nível)
+#   corpo       uma questão por registo: JSON posicional (o tuplo de cache.content_key)
+#
+# A lista de fichas lê só o preâmbulo e o cabeçalho; abrir uma ficha lê também o índice, e cada
+# questão só é descodificada quando é usada (LazyQuestionList). Os registos são posicionais
+# (sem nomes de campos), por isso a escrita reutiliza as funções compiladas de cache.py e a
+# leitura usa construtores gerados a partir dos dataclasses.
+#
+# Compatibilidade: se o esquema do ficheiro for diferente do atual (campos novos ou removidos)
+# ou a versão for antiga, as questões passam por dicionários, pelas migrações registadas com
+# register_migration e por serialization.question_from_dict (que ignora campos desconhecidos).
+import json
+import os
+import struct
+import sys
+import time
+from dataclasses import asdict, dataclass, fields, is_dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple, get_args, get_origin, get_type_hints
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
+
+from models import TA, Question, QuestionList, QuestionMeta, Blank, ChoiceOption, MatchPair, ValidationIssue, compact_question  # noqa: E402
+from cache import content_key  # noqa: E402
+from serialization import question_from_dict  # noqa: E402
+
+# Versões: 1 - formato inicial; 2 - o índice guarda também a categoria e o nível (as linhas
+# de ficheiros v1 ficam com None nesses campos)
+FORMAT_VERSION = 2
+EXTENSION = ".babta"
+MAGIC = b"BABELIUM"
+_PREAMBLE = struct.Struct("<8sHII")
+
+# Classes gravadas no corpo (o esquema do ficheiro guarda os nomes dos campos de cada uma)
+_RECORD_CLASSES = {cls.__name__: cls for cls in (Question, QuestionMeta, Blank, ChoiceOption, MatchPair)}
+# Campos da ficha que vão para o cabeçalho (as questões vão para o corpo)
+_TA_FIELDS = tuple(f.name for f in fields(TA) if f.name not in ("questions", "last_validation"))
+
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def current_schema() -> Dict[str, List[str]]:
+    return {name: [f.name for f in fields(cls)] for name, cls in _RECORD_CLASSES.items()}
+
+
+@dataclass(slots=True)
+class IndexEntry:
+    """Uma linha do índice: o suficiente para listar a questão sem a descodificar."""
+    qid: str
+    ui_type: str
+    moodle_type: str
+    title: str
+    section: str
+    points: float
+    offset: int
+    length: int
+    category: Optional[str] = None
+    difficulty: Optional[str] = None
+
+
+# ==============================================================================
+# MIGRAÇÕES
+# ==============================================================================
+# Uma migração converte dados da versão `from_version` para from_version + 1: "header" recebe o
+# dicionário do cabeçalho, "question" o dicionário de uma questão (como o de question_to_dict).
+# Ao ler um ficheiro antigo aplicam-se, por ordem, todas as migrações até FORMAT_VERSION.
+
+@dataclass
+class Migration:
+    from_version: int
+    header: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None
+    question: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None
+
+
+MIGRATIONS: Dict[int, Migration] = {}
+
+
+def register_migration(from_version: int, kind: str = "question"):
+    """Decorador: regista a função como migração de cabeçalho ou de questão a partir de `from_version`."""
+    if kind not in ("header", "question"):
+        raise ValueError(f"Tipo de migração inválido: {kind!r} (use 'header' ou 'question')")
+
+    def decorator(fn):
+        migration = MIGRATIONS.setdefault(from_version, Migration(from_version))
+        setattr(migration, kind, fn)
+        return fn
+    return decorator
+
+
+def _migrate(data: Dict[str, Any], version: int, kind: str) -> Dict[str, Any]:
+    for v in range(version, FORMAT_VERSION):
+        migration = MIGRATIONS.get(v)
+        fn = getattr(migration, kind) if migration else None
+        if fn is not None:
+            data = fn(data)
+    return data
+
+
+# ==============================================================================
+# CODIFICAÇÃO DAS QUESTÕES
+# ==============================================================================
+
+def _nested_fields(cls: type) -> Dict[str, Tuple[type, bool]]:
+    # Campos que são dataclasses (meta) ou listas de dataclasses (blanks...): nome -> (classe, é lista)
+    nested = {}
+    for name, tp in get_type_hints(cls).items():
+        if get_origin(tp) is list:
+            elem = (get_args(tp) or (Any,))[0]
+            if is_dataclass(elem):
+                nested[name] = (elem, True)
+        elif is_dataclass(tp):
+            nested[name] = (tp, False)
+    return nested
+
+
+def _compile_decoder(cls: type) -> Callable[[list], Any]:
+    # Inverso de content_key para o esquema atual: constrói o objeto a partir da lista posicional
+    # (cls(*valores)), convertendo antes só os campos compostos (meta, listas de lacunas...)
+    nested = _nested_fields(cls)
+    converters: List[Tuple[int, Callable[[Any], Any]]] = []
+    for i, f in enumerate(fields(cls)):
+        if f.name in nested:
+            elem, is_list = nested[f.name]
+            decode_elem = _decoder_for(elem)
+            converters.append((i, _list_decoder(decode_elem) if is_list else decode_elem))
+
+    if not converters:
+        return lambda values: cls(*values)
+
+    def decode(values: list) -> Any:
+        # A lista vem do json.loads do registo: pode ser alterada no próprio objeto
+        for i, convert in converters:
+            values[i] = convert(values[i])
+        return cls(*values)
+
+    return decode
+
+
+def _list_decoder(decode_elem: Callable[[list], Any]) -> Callable[[list], List[Any]]:
+    def decode(items: list) -> List[Any]:
+        return [decode_elem(x) for x in items]
+    return decode
+
+
+_DECODERS: Dict[type, Callable[[list], Any]] = {}
+
+
+def _decoder_for(cls: type) -> Callable[[list], Any]:
+    func = _DECODERS.get(cls)
+    if func is None:
+        func = _DECODERS[cls] = _compile_decoder(cls)
+    return func
+
+
+def encode_question(q: Question) -> bytes:
+    """Registo de uma questão (JSON posicional, UTF-8)."""
+    return _ENCODER.encode(content_key(q, Question)).encode("utf-8")
+
+
+def _record_to_dict(values: list, cls_name: str, schema: Dict[str, List[str]]) -> Dict[str, Any]:
+    # Caminho lento (esquema diferente do atual): lista posicional -> dicionário com nomes
+    cls = _RECORD_CLASSES.get(cls_name)
+    data = dict(zip(schema[cls_name], values))
+    for name, (elem, is_list) in (_nested_fields(cls).items() if cls else ()):
+        if name in data and elem.__name__ in schema:
+            if is_list:
+                data[name] = [_record_to_dict(x, elem.__name__, schema) for x in data[name]]
+            else:
+                data[name] = _record_to_dict(data[name], elem.__name__, schema)
+    return data
+
+
+def decode_question(raw: bytes, schema: Optional[Dict[str, List[str]]] = None, version: int = FORMAT_VERSION) -> Question:
+    """Descodifica um registo. Sem esquema (ou com o atual) usa o construtor compilado."""
+    values = json.loads(raw)
+    if version == FORMAT_VERSION and (schema is None or schema == _CURRENT_SCHEMA):
+        return compact_question(_decoder_for(Question)(values))
+    data = _migrate(_record_to_dict(values, "Question", schema or _CURRENT_SCHEMA), version, "question")
+    return question_from_dict(data)
+
+
+_CURRENT_SCHEMA = current_schema()
+
+
+# ==============================================================================
+# ESCRITA
+# ==============================================================================
+
+def save_ta(ta: TA, path: str, extra: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Guarda a ficha no formato .babta (escrita atómica: ficheiro temporário + fsync + rename).
+    `extra` vai para o cabeçalho (ex: o número do último registo do diário já incluído).
+    """
+    records: List[bytes] = []
+    index: List[list] = []
+    offset = 0
+    for q in ta.questions:
+        raw = encode_question(q)
+        m = q.meta
+        index.append([q.qid, q.ui_type, q.moodle_type, q.title, q.section, m.points, offset, len(raw),
+                      m.category, m.difficulty])
+        records.append(raw)
+        offset += len(raw)
+
+    header = {
+        "ta": {name: getattr(ta, name) for name in _TA_FIELDS},
+        "last_validation": [asdict(i) for i in ta.last_validation],
+        "n_questions": len(index),
+        "saved_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "schema": _CURRENT_SCHEMA,
+        "extra": extra or {},
+    }
+    header_raw = _ENCODER.encode(header).encode("utf-8")
+    index_raw = _ENCODER.encode(index).encode("utf-8")
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_raw), len(index_raw)))
+        f.write(header_raw)
+        f.write(index_raw)
+        f.write(b"".join(records))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# ==============================================================================
+# LEITURA
+# ==============================================================================
+
+def _read_preamble(f) -> Tuple[int, int, int]:
+    raw = f.read(_PREAMBLE.size)
+    if len(raw) < _PREAMBLE.size:
+        raise ValueError("Ficheiro de ficha truncado ou vazio.")
+    magic, version, header_len, index_len = _PREAMBLE.unpack(raw)
+    if magic != MAGIC:
+        raise ValueError("Não é um ficheiro de ficha BabeliUM (.babta).")
+    if version > FORMAT_VERSION:
+        raise ValueError(f"Ficha gravada numa versão mais recente do formato ({version} > {FORMAT_VERSION}).")
+    return version, header_len, index_len
+
+
+def _read_header(f, version: int, header_len: int) -> Dict[str, Any]:
+    return _migrate(json.loads(f.read(header_len)), version, "header")
+
+
+def read_header(path: str) -> Dict[str, Any]:
+    """Só o cabeçalho (dados da ficha e nº de questões): para listar fichas sem ler as questões."""
+    with open(path, "rb") as f:
+        version, header_len, _ = _read_preamble(f)
+        return _read_header(f, version, header_len)
+
+
+def list_fichas(folder: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """[(caminho, cabeçalho)] das fichas .babta da pasta, da gravada mais recentemente."""
+    out = []
+    if not os.path.isdir(folder):
+        return out
+    for name in os.listdir(folder):
+        if name.endswith(EXTENSION):
+            path = os.path.join(folder, name)
+            try:
+                out.append((path, read_header(path)))
+            except (OSError, ValueError):
+                continue
+    out.sort(key=lambda item: item[1].get("saved_at", ""), reverse=True)
+    return out
+
+
+class StoredTA:
+    """
+    Ficha aberta a partir do disco: cabeçalho e índice em memória, questões lidas a pedido.
+    `entries` é o índice lido ao abrir (as posições não mudam). Se o ficheiro for gravado de
+    novo entretanto (ex: a mesma ficha aberta noutra sessão foi compactada), o índice novo é
+    relido e as questões ainda por ler são procuradas pelo qid; uma questão que já não exista
+    no ficheiro dá ValueError.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self.entries = self._read_layout(f)
+        # Posição -> (offset, tamanho) no ficheiro atual (None se a questão já lá não está)
+        self._where: List[Optional[Tuple[int, int]]] = [(e.offset, e.length) for e in self.entries]
+
+    def _read_layout(self, f) -> List[IndexEntry]:
+        # Preâmbulo, cabeçalho e índice do ficheiro aberto em `f`
+        self.version, header_len, index_len = _read_preamble(f)
+        self.header = _read_header(f, self.version, header_len)
+        entries = [IndexEntry(*row) for row in json.loads(f.read(index_len))]
+        self._stamp = self._file_stamp(f)
+        self.schema = self.header.get("schema") or _CURRENT_SCHEMA
+        # None = esquema atual (descodificação direta); caso contrário passa pelas migrações
+        self._decode_schema = None if (self.version == FORMAT_VERSION and self.schema == _CURRENT_SCHEMA) else self.schema
+        self._body_offset = _PREAMBLE.size + header_len + index_len
+        return entries
+
+    @staticmethod
+    def _file_stamp(f) -> Tuple[int, int]:
+        st = os.fstat(f.fileno())
+        return st.st_mtime_ns, st.st_size
+
+    def _open_body(self):
+        f = open(self.path, "rb")
+        try:
+            if self._file_stamp(f) != self._stamp:
+                f.seek(0)
+                current = {e.qid: (e.offset, e.length) for e in self._read_layout(f)}
+                self._where = [current.get(e.qid) for e in self.entries]
+        except BaseException:
+            f.close()
+            raise
+        return f
+
+    def _locate(self, pos: int) -> Tuple[int, int]:
+        where = self._where[pos]
+        if where is None:
+            raise ValueError(f"A questão {self.entries[pos].qid} já não existe na ficha '{self.path}'.")
+        return where
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def question(self, pos: int) -> Question:
+        """Descodifica a questão na posição `pos` do ficheiro."""
+        with self._open_body() as f:
+            offset, length = self._locate(pos)
+            f.seek(self._body_offset + offset)
+            raw = f.read(length)
+        return decode_question(raw, self._decode_schema, self.version)
+
+    def questions_at(self, positions: List[int]) -> List[Question]:
+        """Questões nas posições dadas, com uma só abertura do ficheiro."""
+        out = []
+        with self._open_body() as f:
+            for pos in positions:
+                offset, length = self._locate(pos)
+                f.seek(self._body_offset + offset)
+                out.append(decode_question(f.read(length), self._decode_schema, self.version))
+        return out
+
+    def questions(self) -> List[Question]:
+        """Todas as questões (uma só leitura do corpo)."""
+        with self._open_body() as f:
+            f.seek(self._body_offset)
+            body = f.read()
+            where = [self._locate(pos) for pos in range(len(self.entries))]
+        schema, version = self._decode_schema, self.version
+        return [decode_question(body[offset:offset + length], schema, version) for offset, length in where]
+
+    def to_ta(self, lazy: bool = True) -> TA:
+        ta = TA(**{k: v for k, v in self.header.get("ta", {}).items() if k in _TA_FIELDS})
+        ta.last_validation = [ValidationIssue(**i) for i in self.header.get("last_validation", [])]
+        ta.questions = LazyQuestionList(self) if lazy else QuestionList(self.questions())
+        return ta
+
+
+class LazyQuestionList(QuestionList):
+    """
+    Lista de questões de uma StoredTA em que cada questão só é descodificada no primeiro acesso.
+    Suporta tudo o que a aplicação faz com ta.questions (índices, append, pop, trocas, iteração)
+    e as operações por qid de QuestionList, que usam os qids do índice sem descodificar nada.
+    """
+
+    def __init__(self, stored: StoredTA):
+        self.stored = stored
+        # int = posição no ficheiro (ainda por ler); Question = já descodificada ou nova
+        self._items: List[Any] = list(range(len(stored)))
+        self._reset_index()
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self._items)))]
+        item = self._items[i]
+        if type(item) is int:
+            item = self._items[i] = self.stored.question(item)
+        return item
+
+    def __iter__(self):
+        for i in range(len(self._items)):
+            yield self[i]
+
+    def rebuild(self, items: List[Any]) -> None:
+        """Substitui o conteúdo: cada elemento é uma posição atual da lista (não lida) ou uma Question."""
+        self._items = [self._items[x] if type(x) is int else x for x in items]
+        self._reset_index()
+
+    def qid(self, i: int) -> str:
+        """qid da questão i (do índice, se ainda não foi descodificada)."""
+        item = self._items[i]
+        return self.stored.entries[item].qid if type(item) is int else item.qid
+
+    _qid_at = qid
+
+    def entry(self, i: int) -> Optional[IndexEntry]:
+        """Linha do índice da questão i, se ainda não foi descodificada (None caso contrário)."""
+        item = self._items[i]
+        return self.stored.entries[item] if type(item) is int else None
+
+    @property
+    def n_loaded(self) -> int:
+        return sum(1 for item in self._items if type(item) is not int)
+
+    def __repr__(self) -> str:
+        return f"<LazyQuestionList {len(self)} questões, {self.n_loaded} descodificadas>"
+
+
+def open_ta(path: str) -> StoredTA:
+    """Abre a ficha lendo só o cabeçalho e o índice."""
+    return StoredTA(path)
+
+
+def load_ta(path: str, lazy: bool = True) -> TA:
+    """Lê a ficha; com lazy=True as questões só são descodificadas quando usadas."""
+    return open_ta(path).to_ta(lazy=lazy)
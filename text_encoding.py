@@ -0,0 +1,159 @@
+# text_encoding.py
+# Camada única de codificação de texto para o export.
+#
+# Cada contexto (texto XML, bloco CDATA, resposta Cloze, texto GIFT) tem a sua tabela de tradução e é
+# resolvido numa só passagem por string (uma expressão regular gerada a partir da tabela).
+# Strings curtas e repetidas ("Verdadeiro", "Falso", feedbacks partilhados, nomes de
+# categoria...) ficam memorizadas, por isso na maioria das chamadas nem há passagem
+# nenhuma: é só uma consulta a um dicionário.
+from typing import Callable, Dict
+import re
+
+# --- Tabelas por contexto ---
+
+# Texto/atributos XML: & < > " '
+XML_TABLE: Dict[str, str] = {
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    '"': "&quot;",
+    "'": "&apos;",
+}
+
+# Respostas Cloze: caracteres com significado na sintaxe {1:TIPO:=a~b#fb}, escapados com "\\"
+# (o conjunto que o Moodle reconhece). O "=" também: no início de uma alternativa marca a
+# resposta certa, e um distrator "=z" sem escape seria importado como resposta certa.
+CLOZE_TABLE: Dict[str, str] = {
+    "\\": "\\\\",
+    "}": "\\}",
+    "~": "\\~",
+    "=": "\\=",
+    "#": "\\#",
+    "/": "\\/",
+    '"': '\\"',
+}
+
+# Texto GIFT: caracteres de controlo escapados com "\\"; as quebras de linha viram "\\n"
+# (uma linha em branco terminaria a questão)
+GIFT_TABLE: Dict[str, str] = {
+    "\\": "\\\\",
+    "~": "\\~",
+    "=": "\\=",
+    "#": "\\#",
+    "{": "\\{",
+    "}": "\\}",
+    ":": "\\:",
+    "\n": "\\n",
+    "\r": "",
+}
+
+# Dentro de CDATA só "]]>" é problemático: parte-se em dois blocos CDATA seguidos
+CDATA_END = "]]>"
+CDATA_END_SPLIT = "]]]]><![CDATA[>"
+
+
+def _table_encoder(table: Dict[str, str]) -> Callable[[str], str]:
+    # Uma classe de caracteres com todas as chaves da tabela: uma só passagem (em C) para
+    # encontrar o primeiro carácter especial; a maioria dos textos não tem nenhum e sai logo.
+    # (str.translate seria a escolha óbvia, mas é muito lento em texto não-ASCII como o português.)
+    pattern = re.compile("[" + "".join(re.escape(c) for c in table) + "]")
+
+    def replace(m: "re.Match[str]") -> str:
+        return table[m.group()]
+
+    def encode_with_table(s: str) -> str:
+        m = pattern.search(s)
+        if m is None:
+            return s
+        start = m.start()
+        return s[:start] + pattern.sub(replace, s[start:])
+
+    return encode_with_table
+
+
+_encode_xml_table = _table_encoder(XML_TABLE)
+_encode_cloze_table = _table_encoder(CLOZE_TABLE)
+_encode_gift_table = _table_encoder(GIFT_TABLE)
+
+# --- Memorização ---
+
+# Só strings até este tamanho são memorizadas (as longas raramente se repetem e ocupam memória)
+MEMO_MAX_LEN = 256
+# Número máximo de entradas por contexto; ao encher, a tabela é simplesmente limpa
+MEMO_MAX_ENTRIES = 65_536
+
+_XML_MEMO: Dict[str, str] = {}
+_CLOZE_MEMO: Dict[str, str] = {}
+_GIFT_MEMO: Dict[str, str] = {}
+
+
+def _remember(memo: Dict[str, str], s: str, out: str) -> None:
+    if len(memo) >= MEMO_MAX_ENTRIES:
+        memo.clear()
+    memo[s] = out
+
+
+def xml_text(s: str) -> str:
+    """Texto seguro dentro de um elemento/atributo XML: xml_text("A & B") -> "A &amp; B"."""
+    out = _XML_MEMO.get(s)
+    if out is None:
+        if s is None:
+            return ""
+        out = _encode_xml_table(s if type(s) is str else str(s))
+        if type(s) is str and len(s) <= MEMO_MAX_LEN:
+            _remember(_XML_MEMO, s, out)
+    return out
+
+
+def cdata(s: str) -> str:
+    """Bloco CDATA seguro mesmo que o texto contenha "]]>": cdata("<p>x</p>") -> "<![CDATA[<p>x</p>]]>"."""
+    # Não é memorizado: a concatenação custa o mesmo que a consulta à tabela
+    if s is None:
+        s = ""
+    elif CDATA_END in s:
+        s = s.replace(CDATA_END, CDATA_END_SPLIT)
+    return "<![CDATA[" + s + "]]>"
+
+
+def cloze_answer(s: str) -> str:
+    """Resposta dentro de um código Cloze: cloze_answer("a~b") -> "a\\~b"."""
+    out = _CLOZE_MEMO.get(s)
+    if out is None:
+        if s is None:
+            return ""
+        out = _encode_cloze_table(s if type(s) is str else str(s))
+        if type(s) is str and len(s) <= MEMO_MAX_LEN:
+            _remember(_CLOZE_MEMO, s, out)
+    return out
+
+
+def gift_text(s: str) -> str:
+    """Texto dentro de uma questão GIFT: gift_text("a=b") -> "a\\=b"."""
+    out = _GIFT_MEMO.get(s)
+    if out is None:
+        if s is None:
+            return ""
+        out = _encode_gift_table(s if type(s) is str else str(s))
+        if type(s) is str and len(s) <= MEMO_MAX_LEN:
+            _remember(_GIFT_MEMO, s, out)
+    return out
+
+
+# Todos os contextos disponíveis, para quem precise de os escolher dinamicamente
+ENCODERS: Dict[str, Callable[[str], str]] = {
+    "xml": xml_text,
+    "cdata": cdata,
+    "cloze": cloze_answer,
+    "gift": gift_text,
+}
+
+
+def encode(s: str, context: str) -> str:
+    """Codifica `s` para o contexto indicado ("xml", "cdata", "cloze" ou "gift")."""
+    return ENCODERS[context](s)
+
+
+def clear_memo() -> None:
+    _XML_MEMO.clear()
+    _CLOZE_MEMO.clear()
+    _GIFT_MEMO.clear()
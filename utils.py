@@ -1,19 +1,16 @@
-import uuid
-
-# Gera um ID único (ex: "q_a1b2c3d4")
-def new_id(prefix: str) -> str:
-    return f"{prefix}_{uuid.uuid4().hex[:10]}"
-
-# Conta quantos espaços [ ] existem no texto
-def count_gaps(text: str) -> int:
-    return text.count("[ ]")
-
-# Prepara texto para XML (substitui & < > " ')
-def escape_xml(s: str) -> str:
-    if s is None:
-        return ""
-    return (str(s).replace("&", "&amp;")
-            .replace("<", "&lt;")
-            .replace(">", "&gt;")
-            .replace('"', "&quot;")
-            .replace("'", "&apos;"))
\ No newline at end of file
+import uuid
+from text_encoding import xml_text
+from cloze import compile_cloze
+
+# Gera um ID único (ex: "q_a1b2c3d4")
+def new_id(prefix: str) -> str:
+    return f"{prefix}_{uuid.uuid4().hex[:10]}"
+
+# Conta quantos espaços [ ] existem no texto (aceita também "[]" e "[   ]")
+def count_gaps(text: str) -> int:
+    return compile_cloze(text).gap_count
+
+# Prepara texto para XML (substitui & < > " ')
+# (mantida por compatibilidade: delega na camada de codificação em text_encoding.py)
+def escape_xml(s: str) -> str:
+    return xml_text(s)
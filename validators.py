@@ -1,105 +1,382 @@
-# validators.py
-from typing import List
-# Importa as classes que definimos no models.py
-from models import TA, Question, ValidationIssue 
-
-def validate_ficha(ta: TA) -> List[ValidationIssue]:
-    """
-    Analisa a ficha inteira e devolve uma lista de problemas (Erros ou Avisos).
-    """
-    issues: List[ValidationIssue] = []
-
-    # 1. Validação Global da Ficha
-    if len(ta.questions) == 0:
-        issues.append(
-            ValidationIssue("ERRO", "Ficha", "A ficha não tem questões. Adiciona pelo menos uma.")
-        )
-        return issues
-
-    if not ta.ta_name.strip():
-        issues.append(ValidationIssue("ERRO", "Ficha", "Nome da ficha em falta."))
-
-    # 2. Validação Pergunta a Pergunta
-    for i, q in enumerate(ta.questions, start=1):
-        base_where = f"Questão {i}"
-        mt = q.moodle_type
-
-        # Enunciado (obrigatório para todos)
-        if not q.prompt.strip():
-            issues.append(ValidationIssue("ERRO", base_where, "Enunciado em falta.", qid=q.qid, field_key="prompt"))
-
-        # Pontuação (exceto Description que vale 0)
-        if mt != "description":
-            if q.meta.points is None or q.meta.points <= 0:
-                issues.append(ValidationIssue("ERRO", base_where, "Pontuação inválida (tem de ser > 0).", qid=q.qid, field_key="points"))
-
-        # --- REGRAS ESPECÍFICAS POR TIPO ---
-
-        if mt == "description":
-            pass # Texto de apoio não requer validação extra
-
-        elif mt == "cloze" or mt == "cloze_mc":
-            if len(q.blanks) < 1:
-                issues.append(ValidationIssue("ERRO", base_where, "Cloze sem lacunas. Use [ ] no texto.", qid=q.qid))
-            for b_idx, b in enumerate(q.blanks, start=1):
-                # Verifica se existe pelo menos uma resposta preenchida
-                ans = [a.strip() for a in b.answers if a.strip()]
-                if not ans:
-                    issues.append(ValidationIssue("ERRO", f"{base_where} > Lacuna {b_idx}", "Lacuna sem resposta correta definida.", qid=q.qid))
-
-        elif mt.startswith("multichoice"):
-            # Verifica se há texto nas opções
-            opts_with_text = [o for o in q.options if o.text.strip()]
-            if len(opts_with_text) < 2:
-                issues.append(ValidationIssue("ERRO", base_where, "A questão precisa de pelo menos 2 opções com texto.", qid=q.qid))
-            
-            # Verifica quais estão marcadas como corretas (mesmo sem texto)
-            marked_correct = [o for o in q.options if o.is_correct]
-            
-            if not marked_correct:
-                 issues.append(ValidationIssue("ERRO", base_where, "Nenhuma opção marcada como correta.", qid=q.qid))
-            else:
-                # Se tem marcadas, verificamos se essas marcadas têm texto
-                correct_with_text = [o for o in marked_correct if o.text.strip()]
-                if not correct_with_text:
-                    issues.append(ValidationIssue("ERRO", base_where, "A opção correta não tem texto.", qid=q.qid))
-                
-                # Validação específica de Single/Multi
-                if mt == "multichoice_single" and len(marked_correct) > 1:
-                     issues.append(ValidationIssue("ERRO", base_where, "Neste tipo só pode haver 1 correta.", qid=q.qid))
-                     
-        elif mt == "truefalse":
-            # Agora valida a lista de frases (V/F Múltiplo)
-            valid_opts = [o for o in q.options if o.text.strip()]
-            if not valid_opts:
-                issues.append(ValidationIssue("ERRO", base_where, "Adicione pelo menos uma afirmação V/F.", qid=q.qid))
-
-        elif mt == "matching":
-            complete_pairs = [p for p in q.pairs if p.left.strip() and p.right.strip()]
-            if len(complete_pairs) < 2:
-                issues.append(ValidationIssue("ERRO", base_where, "Associação requer pelo menos 2 pares completos.", qid=q.qid))
-            
-            # Aviso de repetição na coluna da direita
-            rights = [p.right.strip() for p in complete_pairs]
-            if len(set(rights)) != len(rights):
-                issues.append(ValidationIssue("AVISO", base_where, "Há respostas (coluna B) repetidas. Confirma se é intencional.", qid=q.qid))
-
-        elif mt == "shortanswer":
-            ans = [a.strip() for a in q.accepted_answers if a.strip()]
-            if not ans:
-                issues.append(ValidationIssue("ERRO", base_where, "Indique pelo menos uma resposta aceite.", qid=q.qid))
-
-        elif mt == "essay":
-            if not q.rubric.strip():
-                issues.append(ValidationIssue("AVISO", base_where, "Sem rubrica/critério. (Recomendado)", qid=q.qid))
-
-    return issues
-
-def update_ficha_status(ta: TA, issues: List[ValidationIssue]):
-    """Atualiza o estado da ficha (RASCUNHO/VALIDADO/COM ERROS) com base nos problemas encontrados."""
-    ta.last_validation = issues
-    has_errors = any(i.level == "ERRO" for i in issues)
-    if has_errors:
-        ta.status = "COM ERROS"
-    else:
+# validators.py
+# Validação da ficha. As regras por questão estão num registo declarativo: cada regra diz a
+# que tipos se aplica, a gravidade e a mensagem, e pode ser ligada/desligada. A escolha das
+# regras a correr é feita por uma tabela tipo -> regras (sem cadeia de if/elif).
+import json
+import time
+from dataclasses import dataclass
+from typing import IO, Any, Callable, Dict, FrozenSet, Iterator, List, Optional, Tuple
+# Importa as classes que definimos no models.py
+from models import TA, Question, ValidationIssue, UI_TYPES
+from cache import LRUCache, question_fingerprint
+from profiling import timed
+
+# Cada problema de uma questão fica guardado sem a posição ("Questão 3"), que muda quando a
+# ficha é reordenada: (nível, sufixo do "where", mensagem, field_key)
+IssueTemplate = Tuple[str, str, str, Optional[str]]
+
+
+# ==============================================================================
+# REGISTO DE REGRAS
+# ==============================================================================
+# Factos de uma questão (nome -> valor), calculados uma vez e passados a todas as regras
+Facts = Dict[str, Any]
+
+
+@dataclass
+class Rule:
+    """
+    Uma regra de validação de questões.
+
+    `check(q, facts)` devolve um valor "falso" se a questão está bem. `facts` traz os factos
+    registados em FACTS que a regra declara em `facts` (ex: ("opts_with_text",)), calculados
+    uma só vez por questão. Com `per_item=True` o valor é uma lista de sufixos do "where"
+    (ex: [" > Lacuna 2"]), um problema por elemento; senão é um só problema na questão.
+    `types=None` aplica a regra a todos os tipos (exceto `skip_types`).
+    """
+
+    name: str
+    severity: str  # "ERRO" | "AVISO"
+    message: str
+    check: Callable[[Question, Facts], Any]
+    types: Optional[FrozenSet[str]] = None
+    field_key: Optional[str] = None
+    skip_types: FrozenSet[str] = frozenset()
+    per_item: bool = False
+    enabled: bool = True
+    facts: Tuple[str, ...] = ()
+
+
+# Ordem de registo = ordem dos problemas no relatório
+RULES: Dict[str, Rule] = {}
+
+# Factos partilhados pelas regras (nome -> função de `q`), calculados uma só vez por questão
+# e só nos tipos cujas regras os usam (ex: as opções com texto, usadas por várias regras)
+FACTS: Dict[str, Callable[[Question], Any]] = {}
+
+# Entrada da tabela de um tipo: (factos a calcular, regras ativas) e, por regra,
+# (check, per_item, problema sem posição)
+_Checker = Tuple[Tuple[Tuple[str, Callable[[Question], Any]], ...],
+                 Tuple[Tuple[Callable[[Question, Facts], Any], bool, IssueTemplate], ...]]
+
+# Tabela moodle_type -> factos e regras ativas desse tipo
+# (montada quando o tipo aparece pela primeira vez; limpa quando o registo muda)
+_DISPATCH: Dict[str, _Checker] = {}
+# Incrementado a cada alteração do registo: invalida os resultados em cache
+_rules_version = 0
+
+
+def _rules_changed() -> None:
+    global _rules_version
+    _rules_version += 1
+    _DISPATCH.clear()
+
+
+def register_fact(name: str, func: Callable[[Question], Any]) -> None:
+    FACTS[name] = func
+    _rules_changed()
+
+
+def register_rule(rule: Rule) -> Rule:
+    unknown = [name for name in rule.facts if name not in FACTS]
+    if unknown:
+        raise ValueError(f"Regra {rule.name!r} usa factos não registados: {', '.join(unknown)}")
+    RULES[rule.name] = rule
+    _rules_changed()
+    return rule
+
+
+def _get_rule(name: str) -> Rule:
+    try:
+        return RULES[name]
+    except KeyError:
+        raise ValueError(f"Regra de validação desconhecida: {name!r}")
+
+
+def set_rule_enabled(name: str, enabled: bool = True) -> None:
+    _get_rule(name).enabled = enabled
+    _rules_changed()
+
+
+def set_rule_severity(name: str, severity: str) -> None:
+    if severity not in ("ERRO", "AVISO"):
+        raise ValueError(f"Gravidade inválida: {severity!r} (use 'ERRO' ou 'AVISO')")
+    _get_rule(name).severity = severity
+    _rules_changed()
+
+
+def _rules_for(mt: str) -> Tuple[Rule, ...]:
+    return tuple(r for r in RULES.values() if r.enabled and (r.types is None or mt in r.types) and mt not in r.skip_types)
+
+
+# Factos dos tipos cujas regras não usam nenhum (só de leitura)
+_NO_FACTS: Facts = {}
+
+
+def _build_checker(mt: str) -> _Checker:
+    rules = _rules_for(mt)
+    needed = {name for r in rules for name in r.facts}
+    facts = tuple((name, func) for name, func in FACTS.items() if name in needed)
+    table = tuple((r.check, r.per_item, (r.severity, "", r.message, r.field_key)) for r in rules)
+    return facts, table
+
+
+# --- Tempos por regra (para profiling; desligado por omissão, não custa nada) ---
+
+_timing_enabled = False
+# nome da regra -> [chamadas, problemas encontrados, segundos]
+RULE_TIMINGS: Dict[str, List[float]] = {}
+
+
+def enable_rule_timing(enabled: bool = True) -> None:
+    global _timing_enabled
+    _timing_enabled = enabled
+
+
+def reset_rule_timings() -> None:
+    RULE_TIMINGS.clear()
+
+
+def dump_rule_timings(fileobj: Optional[IO[str]] = None) -> List[Dict[str, Any]]:
+    """Tempos acumulados por regra, da mais lenta para a mais rápida (e em JSON, se `fileobj`)."""
+    rows = [
+        {"rule": name, "calls": int(calls), "hits": int(hits), "total_ms": secs * 1000,
+         "us_per_call": secs * 1e6 / calls if calls else 0.0}
+        for name, (calls, hits, secs) in RULE_TIMINGS.items()
+    ]
+    rows.sort(key=lambda r: r["total_ms"], reverse=True)
+    if fileobj is not None:
+        json.dump(rows, fileobj, indent=2)
+    return rows
+
+
+class ValidationCache:
+    """
+    Resultados da validação por questão, para só revalidar as que mudaram.
+
+    Cada entrada guarda a questão validada, o seu fingerprint de conteúdo e os problemas
+    encontrados. Se o objeto é o mesmo da última vez, o resultado é reutilizado sem mais
+    contas (o editor nunca altera uma questão guardada: substitui-a por uma cópia nova ao
+    guardar). Se o objeto mudou mas o conteúdo é igual (ex: ficha recarregada), o fingerprint
+    evita revalidar. Quem alterar uma questão no próprio objeto deve chamar invalidate(qid).
+    Ligar/desligar regras ou mudar a gravidade invalida tudo (versão do registo).
+    """
+
+    def __init__(self, maxsize: int = 20_000):
+        self._entries = LRUCache(maxsize=maxsize)
+
+    def issues_for(self, q: Question) -> Tuple[IssueTemplate, ...]:
+        entry = self._entries.get(q.qid)
+        if entry is not None and entry[0] is q and entry[2] == _rules_version:
+            return entry[3]
+        fp = question_fingerprint(q)
+        if entry is not None and entry[1] == fp and entry[2] == _rules_version:
+            templates = entry[3]
+        else:
+            templates = check_question(q)
+        self._entries.put(q.qid, (q, fp, _rules_version, templates))
+        return templates
+
+    def invalidate(self, qid: str) -> None:
+        self._entries.discard(qid)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+VALIDATION_CACHE = ValidationCache()
+
+
+def invalidate_question(qid: str) -> None:
+    """Esquece o resultado em cache de uma questão (chamado pelo editor ao guardar)."""
+    VALIDATION_CACHE.invalidate(qid)
+
+
+@timed()
+def validate_ficha(ta: TA, cache: Optional[ValidationCache] = VALIDATION_CACHE) -> List[ValidationIssue]:
+    """
+    Analisa a ficha inteira e devolve uma lista de problemas (Erros ou Avisos).
+    Com `cache`, só as questões alteradas desde a última validação são verificadas de novo
+    (cache=None valida tudo do zero).
+    """
+    return list(iter_validation(ta, cache=cache))
+
+
+def iter_validation(
+    ta: TA,
+    fail_fast: bool = False,
+    max_issues: Optional[int] = None,
+    errors_only: bool = False,
+    cache: Optional[ValidationCache] = VALIDATION_CACHE,
+) -> Iterator[ValidationIssue]:
+    """
+    Gera os problemas da ficha à medida que são encontrados (mesma ordem de validate_ficha).
+
+    fail_fast: pára logo a seguir ao primeiro ERRO.
+    max_issues: pára depois de gerar este número de problemas.
+    errors_only: ignora os AVISOs.
+    Como é um gerador, quem só quer saber se há erros pode parar a qualquer momento
+    (ver has_blocking_errors) sem percorrer o resto da ficha.
+    """
+    if max_issues is not None and max_issues <= 0:
+        return
+    emitted = 0
+
+    # 1. Validação Global da Ficha
+    if len(ta.questions) == 0:
+        yield ValidationIssue("ERRO", "Ficha", "A ficha não tem questões. Adiciona pelo menos uma.")
+        return
+
+    if not ta.ta_name.strip():
+        yield ValidationIssue("ERRO", "Ficha", "Nome da ficha em falta.")
+        emitted += 1
+        if fail_fast or emitted == max_issues:
+            return
+
+    # 2. Validação Pergunta a Pergunta
+    check = cache.issues_for if cache is not None else check_question
+    for i, q in enumerate(ta.questions, start=1):
+        templates = check(q)
+        if not templates:
+            continue
+        base_where = f"Questão {i}"
+        for level, suffix, message, field_key in templates:
+            if errors_only and level != "ERRO":
+                continue
+            yield ValidationIssue(level, base_where + suffix, message, qid=q.qid, field_key=field_key)
+            emitted += 1
+            if (fail_fast and level == "ERRO") or emitted == max_issues:
+                return
+
+
+def has_blocking_errors(ta: TA, cache: Optional[ValidationCache] = VALIDATION_CACHE) -> bool:
+    """True se a ficha tem pelo menos um ERRO (pára no primeiro que encontrar)."""
+    return next(iter_validation(ta, fail_fast=True, errors_only=True, cache=cache), None) is not None
+
+
+def check_question(q: Question) -> Tuple[IssueTemplate, ...]:
+    """
+    Problemas de uma questão isolada (não depende da posição na ficha), sem cache.
+    Devolve os moldes (nível, sufixo do local, mensagem, campo); ver ValidationCache.issues_for.
+    """
+    if _timing_enabled:
+        return _check_question_timed(q)
+    checker = _DISPATCH.get(q.moodle_type)
+    if checker is None:
+        checker = _DISPATCH[q.moodle_type] = _build_checker(q.moodle_type)
+    fact_funcs, table = checker
+    facts = _NO_FACTS
+    if fact_funcs:
+        facts = {}
+        for name, func in fact_funcs:
+            facts[name] = func(q)
+    found: Optional[List[IssueTemplate]] = None
+    for check, per_item, template in table:
+        hit = check(q, facts)
+        if hit:
+            if found is None:
+                found = []
+            if per_item:
+                found.extend([(template[0], suffix, template[2], template[3]) for suffix in hit])
+            else:
+                found.append(template)
+    return tuple(found) if found else ()
+
+
+def _check_question_timed(q: Question) -> Tuple[IssueTemplate, ...]:
+    # Versão lenta, regra a regra, usada só quando os tempos estão ligados
+    # (cada regra calcula os factos de que precisa, por isso o seu custo entra no tempo da regra)
+    found: List[IssueTemplate] = []
+    clock = time.perf_counter
+    for rule in _rules_for(q.moodle_type):
+        t0 = clock()
+        hit = rule.check(q, {name: FACTS[name](q) for name in rule.facts})
+        elapsed = clock() - t0
+        stats = RULE_TIMINGS.get(rule.name)
+        if stats is None:
+            stats = RULE_TIMINGS[rule.name] = [0, 0, 0.0]
+        stats[0] += 1
+        stats[2] += elapsed
+        if hit:
+            stats[1] += 1
+            for suffix in (hit if rule.per_item else [""]):
+                found.append((rule.severity, suffix, rule.message, rule.field_key))
+    return tuple(found)
+
+
+# ==============================================================================
+# REGRAS
+# ==============================================================================
+ALL_TYPES = frozenset(UI_TYPES.values())
+CLOZE_TYPES = frozenset({"cloze", "cloze_mc"})
+MULTICHOICE_TYPES = frozenset(t for t in ALL_TYPES if t.startswith("multichoice"))
+
+
+# Factos partilhados (cada .strip() é feito uma vez por questão)
+register_fact("opts_with_text", lambda q: [o for o in q.options if o.text.strip()])
+register_fact("marked_correct", lambda q: [o for o in q.options if o.is_correct])
+register_fact("complete_rights", lambda q: [p.right.strip() for p in q.pairs if p.left.strip() and p.right.strip()])
+
+# Enunciado (obrigatório para todos)
+register_rule(Rule("prompt_required", "ERRO", "Enunciado em falta.",
+                   lambda q, facts: not q.prompt.strip(), field_key="prompt"))
+# Pontuação (exceto Description que vale 0)
+register_rule(Rule("points_positive", "ERRO", "Pontuação inválida (tem de ser > 0).",
+                   lambda q, facts: q.meta.points is None or q.meta.points <= 0,
+                   skip_types=frozenset({"description"}), field_key="points"))
+
+# --- Cloze ---
+register_rule(Rule("cloze_has_blanks", "ERRO", "Cloze sem lacunas. Use [ ] no texto.",
+                   lambda q, facts: not q.blanks, types=CLOZE_TYPES))
+# "".join(...).strip() vazio <=> nenhuma resposta com texto (uma só passagem por lacuna)
+register_rule(Rule("cloze_blank_answer", "ERRO", "Lacuna sem resposta correta definida.",
+                   lambda q, facts: [f" > Lacuna {b_idx}" for b_idx, b in enumerate(q.blanks, start=1) if not "".join(b.answers).strip()],
+                   types=CLOZE_TYPES, per_item=True))
+
+# --- Escolha múltipla ---
+register_rule(Rule("mc_min_options", "ERRO", "A questão precisa de pelo menos 2 opções com texto.",
+                   lambda q, facts: len(facts["opts_with_text"]) < 2, types=MULTICHOICE_TYPES, facts=("opts_with_text",)))
+register_rule(Rule("mc_correct_marked", "ERRO", "Nenhuma opção marcada como correta.",
+                   lambda q, facts: not facts["marked_correct"], types=MULTICHOICE_TYPES, facts=("marked_correct",)))
+# Só se há opções marcadas: se nenhuma está marcada já há o erro anterior
+register_rule(Rule("mc_correct_has_text", "ERRO", "A opção correta não tem texto.",
+                   lambda q, facts: facts["marked_correct"] and not [o for o in facts["marked_correct"] if o.text.strip()],
+                   types=MULTICHOICE_TYPES, facts=("marked_correct",)))
+register_rule(Rule("mc_single_one_correct", "ERRO", "Neste tipo só pode haver 1 correta.",
+                   lambda q, facts: len(facts["marked_correct"]) > 1, types=frozenset({"multichoice_single"}), facts=("marked_correct",)))
+
+# --- Verdadeiro/Falso (lista de afirmações) ---
+register_rule(Rule("tf_has_statement", "ERRO", "Adicione pelo menos uma afirmação V/F.",
+                   lambda q, facts: not facts["opts_with_text"], types=frozenset({"truefalse"}), facts=("opts_with_text",)))
+
+# --- Associação ---
+register_rule(Rule("matching_min_pairs", "ERRO", "Associação requer pelo menos 2 pares completos.",
+                   lambda q, facts: len(facts["complete_rights"]) < 2, types=frozenset({"matching"}), facts=("complete_rights",)))
+register_rule(Rule("matching_repeated_answers", "AVISO", "Há respostas (coluna B) repetidas. Confirma se é intencional.",
+                   lambda q, facts: len(set(facts["complete_rights"])) != len(facts["complete_rights"]),
+                   types=frozenset({"matching"}), facts=("complete_rights",)))
+
+# --- Resposta curta ---
+register_rule(Rule("shortanswer_has_answer", "ERRO", "Indique pelo menos uma resposta aceite.",
+                   lambda q, facts: not "".join(q.accepted_answers).strip(), types=frozenset({"shortanswer"})))
+
+# --- Ensaio ---
+register_rule(Rule("essay_rubric", "AVISO", "Sem rubrica/critério. (Recomendado)",
+                   lambda q, facts: not q.rubric.strip(), types=frozenset({"essay"})))
+
+
+def update_ficha_status(ta: TA, issues: List[ValidationIssue], has_errors: Optional[bool] = None):
+    """
+    Atualiza o estado da ficha (RASCUNHO/VALIDADO/COM ERROS) com base nos problemas encontrados.
+    Se `issues` é só parte do relatório (max_issues), `has_errors` diz se há erros na ficha toda.
+    """
+    ta.last_validation = issues
+    if has_errors is None:
+        has_errors = any(i.level == "ERRO" for i in issues)
+    if has_errors:
+        ta.status = "COM ERROS"
+    else:
         ta.status = "VALIDADO" if ta.questions else "RASCUNHO"
\ No newline at end of file